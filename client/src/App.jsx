@@ -7,6 +7,14 @@ import Visualizer from './components/Visualizer';
 
 import { CommandController } from './utils/CommandController';
 
+// Snapshots kept per loop on Run; longer loops are sampled around their keyframes
+const RUN_MAX_FRAMES = 200;
+
+// Request options of Run. The live preview sends none: it only replays the
+// first iterations and skips the line trace, so it stays cheap while typing
+// (and is cached separately from Run, whose ETag covers these options).
+const runOptions = (watch) => ({ trace: true, watch: watch ?? undefined, maxFrames: RUN_MAX_FRAMES });
+
 function App() {
   const [editorCode, setEditorCode] = useState('# Define an array to visualize it\narr = [1, 2, 3, 4, 5]\n\n# Print check\nprint("Hello visualizer")\nprint(arr)');
   const [visualData, setVisualData] = useState(null);
@@ -17,6 +25,13 @@ function App() {
     visualDataRef.current = visualData;
   }, [visualData]);
 
+  // Variables snapshotted in full on Run (null = all), chosen in the Visualizer
+  const [watchList, setWatchList] = useState(null);
+
+  // Monaco editor instance + active line highlight decorations
+  const editorRef = useRef(null);
+  const lineDecorationsRef = useRef(null);
+
   // Terminal Output
   const [terminalOutput, setTerminalOutput] = useState([]);
   const [userInput, setUserInput] = useState('');
@@ -70,14 +85,14 @@ function App() {
     fetchData();
   }, [editorCode]);
 
-  const handleRun = async () => {
+  const runCode = async (watch) => {
     // Clear terminal and parse code
     setTerminalOutput(['Terminal']);
 
     // Clear printed iterations tracking for new run
     printedIterationsRef.current.clear();
 
-    const visualDataResult = await CommandController.parse(editorCode);
+    const visualDataResult = await CommandController.parse(editorCode, runOptions(watch));
 
     // Add timestamp to trigger updates even if structure is identical
     visualDataResult.lastRun = Date.now();
@@ -90,6 +105,16 @@ function App() {
     }
   };
 
+  const handleRun = () => runCode(watchList);
+
+  // Re-run with the new watch list so the snapshots match the selection
+  const handleWatchChange = (nextWatchList) => {
+    setWatchList(nextWatchList);
+    if (visualData?.lastRun) {
+      runCode(nextWatchList);
+    }
+  };
+
   const handleInputChange = (e) => {
     setUserInput(e.target.value);
   };
@@ -104,21 +129,41 @@ function App() {
   // Track which iterations have already been printed to prevent duplicates
   const printedIterationsRef = useRef(new Set());
 
-  const handleIterationChange = useCallback((index) => {
-    // Backend uses string keys for iterationOutputs
-    const key = String(index);
+  // Highlight every source line executed during the given loop iteration
+  const highlightIterationLines = (lineTrace, index) => {
+    if (!editorRef.current || !lineDecorationsRef.current || !lineTrace) return;
+
+    const decorations = [];
+    lineTrace.iteration.forEach((iteration, k) => {
+      if (iteration !== index) return;
+      decorations.push({
+        range: { startLineNumber: lineTrace.line[k], startColumn: 1, endLineNumber: lineTrace.line[k], endColumn: 1 },
+        options: { isWholeLine: true, className: 'executed-line' }
+      });
+    });
+    lineDecorationsRef.current.set(decorations);
+  };
 
-    // Check if we've already printed this iteration
-    if (printedIterationsRef.current.has(key)) {
-      return;
-    }
+  const handleIterationChange = useCallback((index) => {
+    highlightIterationLines(visualDataRef.current?.lineTrace, index);
 
-    if (visualDataRef.current && visualDataRef.current.iterationOutputs && visualDataRef.current.iterationOutputs[key]) {
-      setTerminalOutput(prev => [...prev, ...visualDataRef.current.iterationOutputs[key]]);
+    // Backend uses string keys for iterationOutputs
+    const outputs = visualDataRef.current?.iterationOutputs || {};
+    // Sampled loops skip iterations: print theirs when the next kept one is reached
+    const keys = visualDataRef.current?.loopFrames
+      ? Object.keys(outputs).filter(k => Number(k) <= index).sort((a, b) => a - b)
+      : [String(index)];
+
+    keys.forEach(key => {
+      // Check if we've already printed this iteration
+      if (printedIterationsRef.current.has(key) || !outputs[key]) {
+        return;
+      }
+      setTerminalOutput(prev => [...prev, ...outputs[key]]);
 
       // Mark this iteration as printed
       printedIterationsRef.current.add(key);
-    }
+    });
   }, []);
 
   return (
@@ -129,6 +174,8 @@ function App() {
         <Visualizer
           visualData={visualData}
           onIterationChange={handleIterationChange}
+          watchList={watchList}
+          onWatchChange={handleWatchChange}
         />
       </div>
 
@@ -167,6 +214,10 @@ function App() {
               theme="vs-dark"
               value={editorCode}
               onChange={(value) => setEditorCode(value)}
+              onMount={(editor) => {
+                editorRef.current = editor;
+                lineDecorationsRef.current = editor.createDecorationsCollection();
+              }}
               options={{
                 minimap: { enabled: false },
                 fontSize: 14,
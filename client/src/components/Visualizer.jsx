@@ -171,19 +171,121 @@ const DictionaryElement = ({ position, k, v, isHighlighted }) => {
     );
 };
 
-const DraggableStructure = ({ structure, highlightIndex, initialY, overrideValue, indexHighlights = [] }) => {
-    const { name, data, type } = structure; // type is 'array' or 'set' or 'variable' or 'dictionary'
+// Whether `index` falls inside a slice range [start, stop, step] (resolved by the backend)
+const inRange = (index, [start, stop, step]) => {
+    if (step > 0) {
+        return index >= start && index < stop && (index - start) % step === 0;
+    }
+    return index <= start && index > stop && (start - index) % -step === 0;
+};
+
+// Sampled loops over range() get their range_<i> structure as [start, stop, step]
+// (type 'range') instead of one value per iteration
+const rangeLength = ([start, stop, step]) => Math.max(0, Math.ceil((stop - start) / step));
+
+// Value of the loop target at iteration `index`
+const loopTargetValue = (structure, index) =>
+    structure.type === 'range' ? structure.data[0] + index * structure.data[2] : structure.data[index];
+
+// Large grids are clipped to a window of this many rows/columns
+const MAX_MATRIX_CELLS = 12;
+
+// Rebuild a matrix for iteration `index` from the nearest keyframe ({ rows })
+// plus the per-iteration changed cells ({ cells: [[row, col, value], ...] }).
+// Stepping forward one iteration only applies that iteration's cells.
+const resolveMatrixFrame = (iterationState, name, index, cache) => {
+    const cached = cache[name];
+    let grid = null;
+    let start = 0;
+    if (cached && cached.index <= index) {
+        grid = cached.grid;
+        start = cached.index + 1;
+    }
+
+    for (let k = start; k <= index; k++) {
+        const frame = iterationState[k]?.[name];
+        if (!frame) continue;
+        if (frame.rows) {
+            grid = frame.rows;
+        } else if (frame.cells && grid) {
+            grid = grid.slice();
+            const copiedRows = new Set();
+            frame.cells.forEach(([r, c, v]) => {
+                if (!copiedRows.has(r)) {
+                    grid[r] = grid[r].slice();
+                    copiedRows.add(r);
+                }
+                grid[r][c] = v;
+            });
+        }
+    }
+
+    cache[name] = { index, grid };
+    return grid;
+};
+
+// Nodes listed for a linked structure (the rest is elided), as on the server
+const MAX_LINKED_NODES = 50;
+
+// Objects of user-defined classes as of iteration `index`: each frame's
+// "$objects" holds only the objects whose attributes changed, so the states
+// are accumulated from the first frame (stepping forward applies one delta;
+// stepping back rebuilds into a fresh map).
+const resolveObjects = (iterationState, index, cache) => {
+    const cached = cache.$objects;
+    let objects = {};
+    let start = 0;
+    if (cached && cached.index <= index) {
+        objects = cached.objects;
+        start = cached.index + 1;
+    }
+    for (let k = start; k <= index; k++) {
+        const changes = iterationState[k]?.$objects;
+        if (changes) Object.assign(objects, changes);
+    }
+    cache.$objects = { index, objects };
+    return objects;
+};
+
+// The value shown for a node: its first plain attribute (e.g. val), else its class name
+const nodeLabel = (node) => {
+    if (!node) return '?';
+    const plain = Object.values(node.attrs).find(v => v !== null && typeof v !== 'object');
+    return plain !== undefined ? plain : node.class;
+};
+
+// Labels of the nodes reachable from `ref`, breadth first, each node once (cycles stop the walk)
+const linkedLabels = (objects, ref) => {
+    const seen = new Set([ref]);
+    const queue = [ref];
+    const labels = [];
+    while (queue.length && labels.length < MAX_LINKED_NODES) {
+        const node = objects[queue.shift()];
+        labels.push(nodeLabel(node));
+        Object.values(node?.attrs || {}).forEach(v => {
+            if (v?.ref !== undefined && !seen.has(v.ref)) {
+                seen.add(v.ref);
+                queue.push(v.ref);
+            }
+        });
+    }
+    return labels;
+};
+
+const DraggableStructure = ({ structure, highlightIndex, initialY, overrideValue, indexHighlights = [], rangeHighlights = [], cellHighlights = [] }) => {
+    const { name, data, type } = structure; // type is 'array', 'matrix', 'set', 'variable', 'dictionary', 'linked' or 'range'
     const { viewport } = useThree();
 
     // Use the overridden value if provided (for animation), otherwise original data
-    const displayValue = overrideValue !== undefined ? overrideValue : data;
+    const displayValue = overrideValue !== undefined ? overrideValue
+        : type === 'range' ? `range(${data.join(', ')})` : data;
 
     const [position, setPosition] = useState([0, 0, 0]);
 
     useEffect(() => {
         // Center the structure initially but apply Y offset
         // Variables don't have length, so center them simpler
-        const len = type === 'variable' ? 1 : data.length;
+        const len = type === 'variable' || type === 'linked' || type === 'range' ? 1 : data.length;
         const initialX = -((len * 1.5) / 2) + 0.75;
         setPosition([initialX, initialY, 0]);
     }, [data.length, type, initialY]);
@@ -218,8 +320,92 @@ const DraggableStructure = ({ structure, highlightIndex, initialY, overrideValue
     };
 
     const isSet = type === 'set';
-    const isVar = type === 'variable';
+    const isVar = type === 'variable' || type === 'range';
     const isDict = type === 'dictionary';
+    const isMatrix = type === 'matrix';
+    const isLinked = type === 'linked';
+
+    if (isLinked) {
+        const nodes = Array.isArray(displayValue) ? displayValue : [];
+        return (
+            <>
+                <group
+                    position={position}
+                    onPointerDown={onDown}
+                    onPointerMove={onMove}
+                    onPointerUp={onUp}
+                >
+                    <mesh visible={false}>
+                        <planeGeometry args={[nodes.length * 2.4 + 4, 4]} />
+                    </mesh>
+
+                    <Text position={[-1.5, 0, 0]} fontSize={0.8} color="white" anchorX="right" anchorY="middle">
+                        {name} =
+                    </Text>
+
+                    {nodes.map((value, index) => (
+                        <React.Fragment key={index}>
+                            <ArrayElement
+                                position={[index * 2.4, 0, 0]}
+                                value={value}
+                                index={index}
+                                isHighlighted={false}
+                            />
+                            {index < nodes.length - 1 && (
+                                <Text position={[index * 2.4 + 1.2, 0, 0]} fontSize={0.6} color="#aaa" anchorX="center" anchorY="middle">
+                                    →
+                                </Text>
+                            )}
+                        </React.Fragment>
+                    ))}
+                </group>
+                <OrbitControls enableRotate={false} enablePan={!isDragging} />
+            </>
+        );
+    }
+
+    if (isMatrix) {
+        const grid = Array.isArray(displayValue) ? displayValue : data;
+        const rows = grid.slice(0, MAX_MATRIX_CELLS);
+        const cols = grid.length > 0 ? Math.max(...rows.map(row => row.length)) : 0;
+        const clipped = grid.length > MAX_MATRIX_CELLS || cols > MAX_MATRIX_CELLS;
+
+        return (
+            <>
+                <group
+                    position={position}
+                    onPointerDown={onDown}
+                    onPointerMove={onMove}
+                    onPointerUp={onUp}
+                >
+                    <mesh visible={false}>
+                        <planeGeometry args={[Math.min(cols, MAX_MATRIX_CELLS) * 1.6 + 4, rows.length * 1.2 + 2]} />
+                    </mesh>
+
+                    <Text position={[-1.5, 0, 0]} fontSize={0.8} color="white" anchorX="right" anchorY="middle">
+                        {name} =
+                    </Text>
+
+                    {rows.map((row, r) => row.slice(0, MAX_MATRIX_CELLS).map((value, c) => (
+                        <ArrayElement
+                            key={`${r}-${c}`}
+                            position={[c * 1.6, -r * 1.2, 0]}
+                            value={value}
+                            index={r === 0 ? c : ''}
+                            isHighlighted={cellHighlights.includes(`${r},${c}`)}
+                        />
+                    )))}
+
+                    {clipped && (
+                        <Text position={[0, -rows.length * 1.2, 0]} fontSize={0.4} color="#aaa" anchorX="left" anchorY="middle">
+                            {`${grid.length} x ${cols} (showing ${MAX_MATRIX_CELLS} x ${MAX_MATRIX_CELLS})`}
+                        </Text>
+                    )}
+                </group>
+                <OrbitControls enableRotate={false} enablePan={!isDragging} />
+            </>
+        );
+    }
 
     if (isVar) {
         return (
@@ -280,7 +466,8 @@ const DraggableStructure = ({ structure, highlightIndex, initialY, overrideValue
 
                 {data.map((value, index) => {
                     const xPos = index * 1.6; // Slightly wider spacing
-                    const isIndexHighlighted = indexHighlights.includes(index);
+                    // Slice ranges are only expanded for the cells actually rendered
+                    const isIndexHighlighted = indexHighlights.includes(index) || rangeHighlights.some(r => inRange(index, r));
                     const isLoopHighlighted = highlightIndex === index;
                     const isHighlighted = isIndexHighlighted || isLoopHighlighted;
 
@@ -328,7 +515,7 @@ const DraggableStructure = ({ structure, highlightIndex, initialY, overrideValue
     );
 };
 
-const Visualizer = ({ visualData, onIterationChange }) => {
+const Visualizer = ({ visualData, onIterationChange, watchList = null, onWatchChange }) => {
     const [highlightIndex, setHighlightIndex] = useState(-1);
     const [isLooping, setIsLooping] = useState(false);
 
@@ -353,21 +540,32 @@ const Visualizer = ({ visualData, onIterationChange }) => {
 
     // Index Highlighting State
     const [indexHighlights, setIndexHighlights] = useState({});
+    const [rangeHighlights, setRangeHighlights] = useState({});
+
+    // Last reconstructed frame per matrix (see resolveMatrixFrame) and of the objects (see resolveObjects)
+    const matrixFramesRef = useRef({});
 
     // Process index operations only when Run is pressed (lastRun exists)
     useEffect(() => {
         if (visualData?.lastRun && visualData?.indexOperations && visualData.indexOperations.length > 0) {
             const highlights = {};
+            const ranges = {};
             visualData.indexOperations.forEach(op => {
                 if (!highlights[op.varName]) {
                     highlights[op.varName] = [];
+                    ranges[op.varName] = [];
                 }
-                highlights[op.varName] = [...highlights[op.varName], ...op.indices];
+                // Matrix cells are keyed as "row,col"
+                const cells = (op.cells || []).map(cell => cell.join(','));
+                highlights[op.varName] = [...highlights[op.varName], ...op.indices, ...cells];
+                ranges[op.varName] = [...ranges[op.varName], ...(op.ranges || [])];
             });
             setIndexHighlights(highlights);
+            setRangeHighlights(ranges);
         } else if (!visualData?.lastRun) {
             // Clear highlights when not running
             setIndexHighlights({});
+            setRangeHighlights({});
         }
     }, [visualData?.indexOperations, visualData?.lastRun]);
 
@@ -376,8 +574,19 @@ const Visualizer = ({ visualData, onIterationChange }) => {
         if (isLooping && loopTargetStructure) {
             interval = setInterval(() => {
                 setHighlightIndex((prev) => {
-                    const next = prev + 1;
-                    if (next >= loopTargetStructure.data.length) {
+                    // Sampled loops only step through the iterations that kept a snapshot
+                    const frames = visualData.loopFrames;
+                    let next = prev + 1;
+                    if (frames) {
+                        const position = frames.indexOf(prev) + 1;
+                        next = position < frames.length ? frames[position] : Infinity;
+                    }
+                    // Stop at the iterations that actually ran (break / while loops)
+                    const targetLength = loopTargetStructure.type === 'range'
+                        ? rangeLength(loopTargetStructure.data)
+                        : loopTargetStructure.data?.length ?? Infinity;
+                    const iterationCount = Math.min(targetLength, visualData.loopIterations ?? Infinity);
+                    if (next >= iterationCount) {
                         // Loop finished
                         setIsLooping(false);
                         setVariableOverrides({});
@@ -386,7 +595,7 @@ const Visualizer = ({ visualData, onIterationChange }) => {
 
                     // Update the iterator variable value
                     if (visualData.loopIterator) {
-                        const currentVal = loopTargetStructure.data[next];
+                        const currentVal = loopTargetValue(loopTargetStructure, next);
 
                         console.log(`Loop iteration ${next}: currentVal = ${currentVal}`);
 
@@ -462,6 +671,7 @@ const Visualizer = ({ visualData, onIterationChange }) => {
 
     // Handle reset when new data comes in
     useEffect(() => {
+        matrixFramesRef.current = {};
         setIsLooping(false);
         setHighlightIndex(-1);
         setVariableOverrides({});
@@ -469,6 +679,7 @@ const Visualizer = ({ visualData, onIterationChange }) => {
         // Clear index highlights unless this is a Run trigger
         if (!visualData?.lastRun) {
             setIndexHighlights({});
+            setRangeHighlights({});
         }
 
         // If lastRun timestamp exists and hasLoop is true, start loop animation
@@ -518,9 +729,27 @@ const Visualizer = ({ visualData, onIterationChange }) => {
                 {visualData.structures.map((structure, idx) => {
                     // Check if we have an override for this structure in the current iteration
                     let override = undefined;
+                    let shown = structure;
+                    let cellHighlights = indexHighlights[structure.name] || [];
                     if (highlightIndex >= 0 && visualData.iterationState && visualData.iterationState[highlightIndex]) {
                         const state = visualData.iterationState[highlightIndex];
-                        if (state[structure.name] !== undefined) {
+                        const value = state[structure.name];
+                        if (value?.summarized) {
+                            // Not watched: only its type/length was snapshotted, keep the base data
+                        } else if (value?.ref !== undefined) {
+                            // A node of a linked structure: follow the pointers as of this iteration
+                            const objects = resolveObjects(visualData.iterationState, highlightIndex, matrixFramesRef.current);
+                            override = linkedLabels(objects, value.ref);
+                            shown = { ...structure, type: 'linked' };
+                        } else if (Array.isArray(value) && value.some(v => v?.ref !== undefined)) {
+                            // A list of nodes (e.g. a BFS queue): show each node's label
+                            const objects = resolveObjects(visualData.iterationState, highlightIndex, matrixFramesRef.current);
+                            override = value.map(v => (v?.ref !== undefined ? nodeLabel(objects[v.ref]) : v));
+                        } else if (structure.type === 'matrix' && state[structure.name] !== undefined) {
+                            override = resolveMatrixFrame(visualData.iterationState, structure.name, highlightIndex, matrixFramesRef.current);
+                            // Highlight the cells written in this iteration
+                            cellHighlights = (state[structure.name].cells || []).map(([r, c]) => `${r},${c}`);
+                        } else if (state[structure.name] !== undefined) {
                             override = state[structure.name];
                         }
                     }
@@ -528,11 +757,13 @@ const Visualizer = ({ visualData, onIterationChange }) => {
                     return (
                         <DraggableStructure
                             key={`${structure.name}-${idx}`}
-                            structure={structure}
+                            structure={shown}
                             highlightIndex={highlightIndex}
                             initialY={startingY - (idx * structureSpacing)}
                             overrideValue={override}
                             indexHighlights={indexHighlights[structure.name] || []}
+                            rangeHighlights={rangeHighlights[structure.name] || []}
+                            cellHighlights={cellHighlights}
                         />
                     );
                 })}
@@ -542,6 +773,65 @@ const Visualizer = ({ visualData, onIterationChange }) => {
                 Scroll to Zoom • Pan to Move • Drag Array to Reposition
             </div>
 
+            {/* Watch List - choose which variables get full per-iteration snapshots */}
+            {hasLoop && onWatchChange && (
+                <div style={{
+                    position: 'absolute',
+                    top: 10,
+                    right: 10,
+                    backgroundColor: 'rgba(0,0,0,0.5)',
+                    padding: '8px 10px',
+                    borderRadius: '8px',
+                    color: '#ccc',
+                    fontSize: '0.8rem',
+                    maxHeight: '40%',
+                    overflowY: 'auto'
+                }}>
+                    <div style={{ marginBottom: 4, color: '#888' }}>Watch</div>
+                    {structures.map(structure => (
+                        <label key={structure.name} style={{ display: 'block', cursor: 'pointer' }}>
+                            <input
+                                type="checkbox"
+                                checked={watchList === null || watchList.includes(structure.name)}
+                                onChange={() => {
+                                    const names = structures.map(s => s.name);
+                                    const current = watchList === null ? names : watchList;
+                                    const next = current.includes(structure.name)
+                                        ? current.filter(name => name !== structure.name)
+                                        : [...current, structure.name];
+                                    // Watching everything again goes back to the default (no filter)
+                                    onWatchChange(names.every(name => next.includes(name)) ? null : next);
+                                }}
+                            />
+                            {' '}{structure.name}
+                        </label>
+                    ))}
+                </div>
+            )}
+
+            {/* Sampled loop: which iteration is shown, what was skipped and why it was kept */}
+            {hasLoop && visualData.loopFrames && highlightIndex >= 0 && (() => {
+                const position = visualData.loopFrames.indexOf(highlightIndex);
+                const skipped = position > 0 ? highlightIndex - visualData.loopFrames[position - 1] - 1 : 0;
+                const reason = visualData.keyframes?.[highlightIndex];
+                return (
+                    <div style={{
+                        position: 'absolute',
+                        top: 10,
+                        left: 10,
+                        backgroundColor: 'rgba(0,0,0,0.5)',
+                        padding: '6px 10px',
+                        borderRadius: '8px',
+                        color: '#ccc',
+                        fontSize: '0.8rem'
+                    }}>
+                        Iteration {highlightIndex + 1} of {visualData.loopIterations}
+                        {skipped > 0 && <span style={{ color: '#888' }}> • {skipped} skipped</span>}
+                        {reason && <span style={{ color: '#e0b050' }}> • {reason}</span>}
+                    </div>
+                );
+            })()}
+
             {/* Looping Controls - Only show if loop detected */}
             {hasLoop && (
                 <div style={{
@@ -1,32 +1,55 @@
+// Recent results by request body, revalidated with If-None-Match (oldest evicted first)
+const RESULT_CACHE_SIZE = 32;
+const resultCache = new Map();
+
 export class CommandController {
 
     /**
      * Parses raw code string into an Intermediate Representation (IR) by calling the backend.
      * @param {string} code - The source code from the editor.
+     * @param {Object} [options] - Optional request flags.
+     * @param {boolean} [options.trace] - Request a statement-level line trace.
+     * @param {string[]} [options.watch] - Only snapshot these variables in full (others are summarized).
+     * @param {number} [options.maxBytes] - Summarize variables larger than this in iteration snapshots.
+     * @param {number} [options.maxFrames] - Run loops to the end and keep at most this many sampled iterations.
+     * @param {string} [options.engine] - 'interpreter' (default) or 'cpython' (full language, sandboxed; only on servers started with VISUALEYES_CPYTHON_ENGINE=1).
      * @returns {Promise<Object>} IR - The structured intermediate representation.
      */
-    static async parse(code) {
+    static async parse(code, options = {}) {
         try {
             // Debug: Log the exact URL being fetched
             const url = '/api/parse';
             console.log(`[CommandController] Fetching: ${new URL(url, window.location.origin).href}`);
 
-            const response = await fetch(url, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ code }),
-            });
+            const body = JSON.stringify({ code, trace: !!options.trace, watch: options.watch, maxBytes: options.maxBytes, maxFrames: options.maxFrames, engine: options.engine });
+            const cached = resultCache.get(body);
+            const headers = { 'Content-Type': 'application/json' };
+            if (cached) {
+                headers['If-None-Match'] = cached.etag;
+            }
+
+            const response = await fetch(url, { method: 'POST', headers, body });
 
-            if (!response.ok) {
+            let data;
+            if (response.status === 304 && cached) {
+                // Unchanged source: the server skipped interpretation, reuse our copy
+                data = cached.data;
+            } else if (!response.ok) {
                 const errorText = await response.text();
                 console.error(`[CommandController] Error ${response.status}: ${response.statusText}`, errorText);
                 throw new Error(`Network response was not ok: ${response.status} ${response.statusText} - ${errorText}`);
+            } else {
+                data = await response.json();
+                const etag = response.headers.get('ETag');
+                if (etag) {
+                    resultCache.delete(body);
+                    resultCache.set(body, { etag, data });
+                    if (resultCache.size > RESULT_CACHE_SIZE) {
+                        resultCache.delete(resultCache.keys().next().value);
+                    }
+                }
             }
 
-            const data = await response.json();
-
             if (data.error) {
                 console.error("[CommandController] Backend Error:", data.error);
                 // We can also throw if we want to stop execution
@@ -40,10 +63,15 @@ export class CommandController {
                 loopTarget: data.target || null,
                 loopIterator: data.iterator || null,
                 loopDependencies: data.loopDependencies || [],
+                loopCarried: data.loopCarried || [],
+                loopIterations: data.loopIterations ?? null,
+                loopFrames: data.loopFrames || null,
+                keyframes: data.keyframes || {},
                 indexOperations: data.indexOperations || [],
                 output: data.output || [],
                 iterationOutputs: data.iterationOutputs || {},
-                iterationState: data.iterationState || {}
+                iterationState: data.iterationState || {},
+                lineTrace: data.lineTrace || null
             };
         } catch (error) {
             console.error("Parsing error:", error);
@@ -1,33 +1,66 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import json
 import os
 import sys
 
-print("Current Directory:", os.getcwd())
-print("Files in Dir:", os.listdir(os.getcwd()))
-print("Sys Path:", sys.path)
+# Ensure the server directory is importable when started from the repo root (e.g. Vercel)
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
 
-# Ensure the server directory is in python path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from code_parser import CodeParser
+from snapshot_store import MIN_FRAMES
+from trace_cache import cache_from_url, cache_key
 
-try:
-    from code_parser import CodeParser
-except ImportError as e:
-    print(f"Import Error: {e}")
-    # Fallback to prevent crash so /api/health still works
-    class CodeParser:
-        def parse(self, code):
-            return {"structures": [], "error": "Parser module failed to load"}
+class TraceJSONProvider(DefaultJSONProvider):
+    """Serializes trace containers (e.g. SnapshotStore) via their to_dict()."""
+
+    @staticmethod
+    def default(o):
+        if hasattr(o, 'to_dict'):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
 
 app = Flask(__name__)
-CORS(app) # Enable CORS for frontend communication
+app.json = TraceJSONProvider(app)
+CORS(app, expose_headers=['ETag', 'X-Cache']) # Enable CORS for frontend communication
 
 parser = CodeParser()
 
+# Shared result cache (e.g. sqlite:////tmp/visualeyes.db or redis://host:6379/0); disabled when unset
+cache = cache_from_url(os.environ.get('VISUALEYES_CACHE'))
+
+# The 'cpython' engine runs untrusted code for real (sandboxed, see settrace_engine); servers opt in
+CPYTHON_ENGINE = os.environ.get('VISUALEYES_CPYTHON_ENGINE') == '1'
+
+# Small program touching the common interpreter paths (assignments, containers,
+# loop replay, snapshots, serialization) so their first-call costs are paid
+# before the first real request.
+WARMUP_CODE = """nums = [2, 7, 11, 15]
+seen = {}
+grid = [[0] * 2 for _ in range(2)]
+for i, num in enumerate(nums):
+    if 9 - num in seen:
+        print(i, seen[9 - num])
+    seen[num] = i
+    grid[i % 2][0] = num
+"""
+
+def warm_up():
+    """Send one traced request through the app (routing, parsing, JSON). Safe to call repeatedly."""
+    app.test_client().post('/api/parse', json={'code': WARMUP_CODE, 'trace': True, 'cache': False})
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "ok", "message": "Server is running"})
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Cache hit/miss counters for this process and across all workers sharing the cache."""
+    return jsonify({"cache": cache.metrics() if cache is not None else None})
+
 @app.route('/api/parse', methods=['POST'])
 def parse_code():
     data = request.json
@@ -36,13 +69,107 @@ def parse_code():
     if not code:
         return jsonify({"structures": [], "hasLoop": False})
 
+    trace = bool(data.get('trace', False))
+    # Optional snapshot policy: only these names in full, and/or a per-variable size limit
+    watch = data.get('watch')
+    max_bytes = data.get('maxBytes')
+    # Optional frame budget: sample long loops instead of replaying the first 100 iterations
+    max_frames = data.get('maxFrames')
+    if watch is not None and not (isinstance(watch, list) and all(isinstance(name, str) for name in watch)):
+        return jsonify({"error": "'watch' must be a list of variable names"}), 400
+    if max_bytes is not None and (not isinstance(max_bytes, int) or max_bytes < 0):
+        return jsonify({"error": "'maxBytes' must be a non-negative integer"}), 400
+    if max_frames is not None and (not isinstance(max_frames, int) or max_frames < MIN_FRAMES):
+        return jsonify({"error": f"'maxFrames' must be an integer of at least {MIN_FRAMES}"}), 400
+    # 'interpreter' (CodeParser) or 'cpython' (real execution in a sandboxed child process)
+    engine = data.get('engine', 'interpreter')
+    if engine not in ('interpreter', 'cpython'):
+        return jsonify({"error": "'engine' must be 'interpreter' or 'cpython'"}), 400
+    if engine == 'cpython' and not CPYTHON_ENGINE:
+        return jsonify({"error": "The 'cpython' engine is disabled on this server"}), 403
+
+    # Same key for the ETag and the shared cache: source, options and parser version
+    key = cache_key(code, {"trace": trace, "watch": sorted(watch) if watch is not None else None,
+                           "maxBytes": max_bytes, "maxFrames": max_frames, "engine": engine})
+    if request.if_none_match.contains(key):
+        # The client already has this result: skip interpretation and the body
+        response = Response(status=304)
+        response.set_etag(key)
+        return response
+
+    use_cache = cache is not None and data.get('cache', True) is not False
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            response = Response(cached, mimetype='application/json', headers={'X-Cache': 'HIT'})
+            response.set_etag(key)
+            return response
+
     try:
-        result = parser.parse(code)
-        return jsonify(result)
+        if engine == 'cpython':
+            # Imported lazily so the subprocess engine stays off the cold-start path
+            from settrace_engine import trace_cpython
+            result = trace_cpython(code, trace=trace, watch=watch, max_bytes=max_bytes, max_frames=max_frames)
+        else:
+            result = parser.parse(code, trace=trace, watch=watch, max_bytes=max_bytes, max_frames=max_frames)
+        response = jsonify(result)
+        response.set_etag(key)
+        if use_cache:
+            cache.set(key, response.get_data(as_text=True))
+            response.headers['X-Cache'] = 'MISS'
+        return response
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
+# Upper bound on programs per /api/parse/batch request
+MAX_BATCH_SIZE = 500
+
+@app.route('/api/parse/batch', methods=['POST'])
+def parse_batch():
+    """Trace many programs across CPU cores.
+
+    Body: {"programs": [{"id": ..., "code": ..., "trace": false}, ...], "maxSteps": n}
+    (plain code strings are accepted too). Streams one NDJSON line
+    {"id": ..., "result": {...}} per program as soon as it completes.
+    """
+    # Imported lazily so the process pool stays off the cold-start path
+    from batch import BATCH_MAX_STEPS, trace_batch
+
+    data = request.json or {}
+    programs = data.get('programs')
+    if not isinstance(programs, list):
+        return jsonify({"error": "'programs' must be a list"}), 400
+    if len(programs) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} programs per batch"}), 400
+
+    normalized = []
+    for i, program in enumerate(programs):
+        if isinstance(program, str):
+            program = {"code": program}
+        normalized.append({
+            "id": program.get("id", i),
+            "code": program.get("code", ""),
+            "trace": bool(program.get("trace", False)),
+        })
+    max_steps = data.get('maxSteps', BATCH_MAX_STEPS)
+    if not isinstance(max_steps, int) or max_steps < 1:
+        return jsonify({"error": "'maxSteps' must be a positive integer"}), 400
+    # Clients may lower the per-program budget, never raise it
+    max_steps = min(max_steps, BATCH_MAX_STEPS)
+
+    def generate():
+        for ids, payload in trace_batch(normalized, max_steps=max_steps):
+            for program_id in ids:
+                yield '{"id": %s, "result": %s}\n' % (json.dumps(program_id), payload)
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+# Opt-in: serverless platforms that pre-initialize instances benefit, plain
+# cold starts would just pay the cost earlier.
+if os.environ.get('VISUALEYES_WARMUP') == '1':
+    warm_up()
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
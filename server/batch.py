@@ -0,0 +1,136 @@
+"""
+Parallel tracing of many programs across CPU cores.
+
+Used by the /api/parse/batch endpoint to pre-generate visualizations for a
+whole problem set or a class's submissions in one request.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from code_parser import PARSER_VERSION, CodeParser
+
+# Per-program execution budget applied to every batch entry
+BATCH_MAX_STEPS = 1_000_000
+BATCH_MAX_SECONDS = 10.0
+
+# Hard wall-clock limit per program. The parser only checks max_seconds between
+# steps, so a single long builtin call can overrun it; past this limit the
+# worker is killed and replaced.
+BATCH_TIMEOUT = 3 * BATCH_MAX_SECONDS
+
+_parser = None  # One CodeParser per worker process
+
+
+def json_default(o):
+    """json.dumps hook for trace containers (e.g. SnapshotStore)."""
+    if hasattr(o, 'to_dict'):
+        return o.to_dict()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def parse_program(code, trace=False, max_steps=BATCH_MAX_STEPS, max_seconds=BATCH_MAX_SECONDS):
+    """Parse one program with this process's CodeParser under the given budget."""
+    global _parser
+    if _parser is None:
+        _parser = CodeParser()
+    _parser.max_steps = max_steps
+    _parser.max_seconds = max_seconds
+    return _parser.parse(code, trace=trace)
+
+
+def trace_program(code, trace=False, max_steps=BATCH_MAX_STEPS, max_seconds=BATCH_MAX_SECONDS):
+    """Parse one program and return the result as a JSON string.
+
+    Runs inside a worker process; serializing there keeps the parent from
+    having to unpickle and re-encode every result.
+    """
+    return json.dumps(parse_program(code, trace, max_steps, max_seconds), default=json_default)
+
+
+def source_key(code, trace=False):
+    """Content hash identifying a program (whether it is traced, and by which parser version)."""
+    return hashlib.sha256(f"{PARSER_VERSION}:{int(bool(trace))}:{code}".encode('utf-8')).hexdigest()
+
+
+def new_executor(size):
+    """Return a process pool for `size` programs (at most one worker per core)."""
+    return ProcessPoolExecutor(max_workers=max(1, min(os.cpu_count() or 1, size)))
+
+
+def _recycle(executor):
+    """Kill the pool's workers; a hung parse cannot be interrupted any other way."""
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _error_payload(message):
+    return json.dumps({"structures": [], "error": message, "output": []})
+
+
+def trace_batch(programs, executor=None, max_steps=BATCH_MAX_STEPS, max_seconds=BATCH_MAX_SECONDS,
+                timeout=BATCH_TIMEOUT):
+    """Trace `programs` in parallel, yielding results in completion order.
+
+    `programs` is a list of {"id", "code", "trace"} dicts. Identical sources
+    are traced once and their result is yielded for every id that submitted
+    them. A program still running after `timeout` seconds gets an error
+    result; the pool is killed and the unfinished programs are resubmitted
+    to a new one. Yields (ids, result_json) tuples.
+
+    Each call runs on a pool of its own (`executor`, if given, must not be
+    shared with other calls): killing workers would otherwise fail other
+    requests' programs, and only with a private pool are the first
+    max_workers unfinished programs the ones executing.
+    """
+    # De-duplicate identical sources
+    groups = {}
+    for program in programs:
+        key = source_key(program["code"], program.get("trace", False))
+        group = groups.setdefault(key, {"code": program["code"], "trace": program.get("trace", False), "ids": []})
+        group["ids"].append(program["id"])
+
+    pending = list(groups.values())
+    owned = executor is None
+    try:
+        while pending:
+            if executor is None:
+                executor, owned = new_executor(len(pending)), True
+            futures = {
+                executor.submit(trace_program, group["code"], group["trace"], max_steps, max_seconds): group
+                for group in pending
+            }
+            pending = []
+            waiting = set(futures)
+            started = {}
+            while waiting:
+                done, waiting = wait(waiting, timeout=1.0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    group = futures[future]
+                    try:
+                        payload = future.result()
+                    except Exception as e:  # Worker crashed (e.g., out of memory)
+                        payload = _error_payload(f"Worker error: {e}")
+                    yield group["ids"], payload
+
+                # Workers take programs in submission order, so the first
+                # max_workers unfinished ones are the ones executing
+                now = time.monotonic()
+                executing = [future for future in futures if future in waiting][:executor._max_workers]
+                for future in executing:
+                    started.setdefault(future, now)
+                hung = [future for future in executing if now - started[future] > timeout]
+                if hung:
+                    for future in hung:
+                        yield futures[future]["ids"], _error_payload(f"Timed out after {timeout:g}s")
+                    pending = [futures[future] for future in futures if future in waiting and future not in hung]
+                    _recycle(executor)
+                    executor = None
+                    break
+    finally:
+        # Also reached when the client disconnects mid-stream
+        if owned and executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
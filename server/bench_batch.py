@@ -0,0 +1,52 @@
+"""
+Batch tracing throughput vs. number of worker processes.
+
+Traces the benchmark corpus (made unique per copy so de-duplication does not
+kick in) with 1, 2, 4, ... workers up to the core count and reports programs
+per second and speedup over a single worker.
+
+Usage: python bench_batch.py [--copies 50]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import trace_batch
+from bench_corpus import CORPUS
+
+
+def make_programs(copies):
+    programs = []
+    for k in range(copies):
+        for name, code in CORPUS.items():
+            programs.append({"id": f"{name}-{k}", "code": f"{code}# copy {k}\n"})
+    return programs
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--copies', type=int, default=50)
+    args = arg_parser.parse_args()
+
+    programs = make_programs(args.copies)
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, *[2 ** k for k in range(1, cores.bit_length()) if 2 ** k <= cores], cores})
+
+    print(f"{len(programs)} programs, {cores} cores")
+    print(f"{'workers':>8} {'seconds':>9} {'programs/s':>11} {'speedup':>8}")
+    baseline = None
+    for workers in worker_counts:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(trace_batch(programs[:workers], executor=executor))  # Spin up workers first
+            start = time.perf_counter()
+            completed = sum(len(ids) for ids, _ in trace_batch(programs, executor=executor))
+            elapsed = time.perf_counter() - start
+        assert completed == len(programs)
+        throughput = completed / elapsed
+        baseline = baseline or throughput
+        print(f"{workers:>8} {elapsed:>9.2f} {throughput:>11.1f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark corpus: classic problems written in the subset CodeParser supports.
+
+Shared by the bench_*.py scripts so every benchmark measures the same programs.
+"""
+
+TWO_SUM = """pair_idx = {}
+nums = [2, 7, 11, 15]
+target = 9
+
+for i, num in enumerate(nums):
+    if target - num in pair_idx:
+        print(i, pair_idx[target - num])
+    pair_idx[num] = i
+"""
+
+FIZZBUZZ = """result = []
+for i in range(1, 101):
+    if i % 3 == 0 and i % 5 == 0:
+        result.append("FizzBuzz")
+    elif i % 3 == 0:
+        result.append("Fizz")
+    elif i % 5 == 0:
+        result.append("Buzz")
+    else:
+        result.append(str(i))
+"""
+
+PREFIX_SUM = """n = 2000
+nums = range(n)
+prefix = [0] * (n + 1)
+for i in range(n):
+    prefix[i + 1] = prefix[i] + nums[i]
+"""
+
+FIBONACCI_DP = """n = 2000
+dp = [0] * n
+dp[1] = 1
+for i in range(2, n):
+    dp[i] = dp[i - 1] + dp[i - 2]
+"""
+
+HOUSE_ROBBER_DP = """houses = range(1000, 3000)
+n = len(houses)
+dp = [0] * n
+dp[0] = houses[0]
+dp[1] = max(houses[0], houses[1])
+for i in range(2, n):
+    dp[i] = max(dp[i - 1], dp[i - 2] + houses[i])
+"""
+
+MAX_SCAN = """nums = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5, 8, 9, 7, 9, 3, 2, 3, 8, 4]
+best = nums[0]
+for num in nums:
+    if num > best:
+        best = num
+"""
+
+CORPUS = {
+    "two_sum": TWO_SUM,
+    "fizzbuzz": FIZZBUZZ,
+    "prefix_sum": PREFIX_SUM,
+    "fibonacci_dp": FIBONACCI_DP,
+    "house_robber_dp": HOUSE_ROBBER_DP,
+    "max_scan": MAX_SCAN,
+}
+
+# Programs whose traces are dominated by a large, mostly unchanged list
+DP_PROGRAMS = ("prefix_sum", "fibonacci_dp", "house_robber_dp")
@@ -0,0 +1,219 @@
+"""
+Differential harness: CodeParser against real CPython on the supported subset.
+
+Runs every program through CodeParser.parse() and through exec(), compares the
+final variable values and the printed lines, and reports the interpreter's
+slowdown versus CPython per construct (largest gap first), so optimization
+work can target the constructs that need it most.
+
+Programs come from CONSTRUCTS (one small program per construct), the shared
+benchmark corpus and, optionally, randomly generated straight-line/loop
+programs. Top-level loops must stay under 100 iterations (CodeParser replays
+at most that many).
+
+Printed lines are compared as a multiset: CodeParser reports prints made
+inside a loop per iteration, separately from the top-level output.
+
+Usage: python bench_differential.py [--repeat 5] [--generated 50] [--seed 0] [--json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+from bench_corpus import CORPUS, DP_PROGRAMS
+from code_parser import CodeParser
+
+CONSTRUCTS = {
+    "arithmetic": "a = 7\nb = 3\nc = a * b - a // b + a % b\nd = (a + b) ** 2 / 4\ne = -a + abs(b - a)\n",
+    "comparison": "x = 5\nlo = 1 < x <= 5\nhi = x > 10 or x == 5\nnone = not (x in [1, 2])\n",
+    "bitwise": "m = 0b1011\nf = m & 6 | 16 ^ 3\ns = (m << 3) >> 1\n",
+    "aug_assign": "total = 0\ncount = 10\nnums = [1, 2, 3]\nfor n in nums:\n    total += n * n\n    count -= 1\n",
+    "list_concat": "res = []\nnums = [4, 5, 6]\nfor n in nums:\n    res += [n, n + 1]\nmore = res + [0]\n",
+    "string_build": "s = ''\nwords = ['ab', 'cd', 'ef']\nfor w in words:\n    s += w.upper()\n",
+    "subscript": "arr = [5, 4, 3, 2, 1]\narr[0] = arr[-1] + arr[2]\nfirst = arr[0]\narr[1:3] = [9, 9, 9]\n",
+    "nested_subscript": "grid = [[0] * 3 for _ in range(3)]\ngrid[1][2] = 5\ngrid[0][0] += grid[1][2]\n",
+    "list_methods": "xs = [3, 1, 2]\nxs.append(7)\nxs.insert(0, 9)\nxs.remove(1)\nlast = xs.pop()\nxs.sort()\nxs.reverse()\n",
+    "dict": "counts = {}\nwords = ['a', 'b', 'a', 'c', 'a']\nfor w in words:\n    counts[w] = counts.get(w, 0) + 1\n",
+    "comprehension": "squares = [i * i for i in range(10) if i % 2 == 0]\npairs = [[i, j] for i in range(3) for j in range(2)]\n",
+    "builtins": "nums = [4, 8, 15, 16, 23, 42]\nlo = min(nums)\nhi = max(nums)\ntotal = sum(nums)\nn = len(nums)\nordered = sorted(nums)\nback = list(reversed(nums))\n",
+    "lazy_builtins": "xs = [3, -1, 4]\nys = [2, 7, 1]\ndot = 0\nfor a, b in zip(xs, ys):\n    dot += a * b\npos = list(filter(lambda x: x > 0, xs))\nstrs = list(map(str, xs))\nhas_neg = any([x < 0 for x in xs])\nall_small = all([x < 10 for x in xs])\n",
+    "lambda_key": "words = ['pear', 'fig', 'banana']\nby_len = sorted(words, key=len)\nby_last = sorted(words, key=lambda w: w[-1], reverse=True)\nlongest = max(words, key=len)\nsquare = lambda x, k=2: x ** k\nnine = square(3)\n",
+    "enumerate": "nums = [10, 20, 30]\nbest = 0\nfor i, num in enumerate(nums):\n    best = max(best, i * num)\n",
+    "nested_loop": "n = 4\ncount = 0\nfor i in range(n):\n    for j in range(i):\n        count += j\n",
+    "break_continue": "nums = [5, 3, 8, 1, 9]\nodd_sum = 0\nfor n in nums:\n    if n == 1:\n        break\n    if n % 2 == 0:\n        continue\n    odd_sum += n\n",
+    "while": "n = 27\nsteps = 0\nwhile n != 1:\n    if n % 2 == 0:\n        n = n // 2\n    else:\n        n = 3 * n + 1\n    steps += 1\n",
+    "linked_list": "class ListNode:\n    def __init__(self, val, next=None):\n        self.val = val\n        self.next = next\n\nhead = ListNode(1, ListNode(2, ListNode(3)))\nprev = None\ncur = head\nwhile cur is not None:\n    cur.next, prev, cur = prev, cur, cur.next\nvals = []\nnode = prev\nwhile node:\n    vals.append(node.val)\n    node = node.next\n",
+    "conditionals": "nums = [3, -1, 0, 8, -5]\npos = 0\nneg = 0\nfor x in nums:\n    if x > 0:\n        pos += 1\n    elif x < 0:\n        neg += 1\n    else:\n        print('zero')\n",
+    "strings": "text = ' Hello World '\nwords = text.strip().lower().split(' ')\njoined = '-'.join(words)\nswapped = joined.replace('-', '+')\n",
+    "print": "x = 3\nprint(x, x * 2)\nnums = [1, 2]\nfor n in nums:\n    print(n)\n",
+}
+
+# Plain values compared between the two runs (functions, modules, ... are skipped)
+COMPARABLE = (int, float, str, bool, list, dict, set, tuple, range, type(None))
+
+
+def run_cpython(code):
+    """exec() `code`; returns (variables, printed lines, error, seconds)."""
+    namespace = {}
+    stdout = io.StringIO()
+    error = None
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(stdout):
+            exec(compile(code, '<program>', 'exec'), namespace)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    variables = {k: v for k, v in namespace.items() if not k.startswith('__') and isinstance(v, COMPARABLE)}
+    return variables, stdout.getvalue().splitlines(), error, elapsed
+
+
+def run_parser(code, parser=None):
+    """CodeParser.parse() `code`; returns (variables, printed lines, error, seconds)."""
+    parser = parser or CodeParser()
+    start = time.perf_counter()
+    result = parser.parse(code)
+    elapsed = time.perf_counter() - start
+    printed = list(result.get("output", []))
+    for key in sorted(result.get("iterationOutputs", {}), key=int):
+        printed.extend(result["iterationOutputs"][key])
+    errors = [line for line in printed if line.startswith(("Runtime Error", "Unexpected Interpretation Error", "Print error", "Execution stopped"))]
+    printed = [line for line in printed if line not in errors]
+    error = result.get("error") or (errors[0] if errors else None)
+    return dict(parser.context), printed, error, elapsed
+
+
+def _short(value, limit=200):
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+def _normalize(value):
+    if isinstance(value, (range, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def compare(code, parser=None):
+    """Run `code` both ways; returns a dict with the mismatches and both timings."""
+    expected_vars, expected_out, expected_error, cpython_s = run_cpython(code)
+    actual_vars, actual_out, actual_error, parser_s = run_parser(code, parser)
+
+    mismatches = []
+    if expected_error or actual_error:
+        if bool(expected_error) != bool(actual_error):
+            mismatches.append({"kind": "error", "cpython": expected_error, "parser": actual_error})
+    for name, value in expected_vars.items():
+        if name not in actual_vars:
+            mismatches.append({"kind": "missing", "name": name, "cpython": _short(value)})
+        elif _normalize(actual_vars[name]) != _normalize(value) or type(_normalize(actual_vars[name])) is not type(_normalize(value)):
+            mismatches.append({"kind": "value", "name": name, "cpython": _short(value), "parser": _short(actual_vars[name])})
+    if Counter(expected_out) != Counter(actual_out):
+        mismatches.append({"kind": "output", "cpython": _short(expected_out), "parser": _short(actual_out)})
+    return {"mismatches": mismatches, "cpython_s": cpython_s, "parser_s": parser_s}
+
+
+def timed(code, repeat):
+    """Best-of-`repeat` timings (CPython, CodeParser) in seconds."""
+    parser = CodeParser()
+    cpython_s = min(run_cpython(code)[3] for _ in range(repeat))
+    parser_s = min(run_parser(code, parser)[3] for _ in range(repeat))
+    return cpython_s, parser_s
+
+
+def generate_programs(count, seed=0):
+    """Random straight-line arithmetic followed by a short loop, all in the supported subset."""
+    rng = random.Random(seed)
+    ops = ['+', '-', '*', '//', '%', '&', '|', '^']
+
+    def expr(names, depth=0):
+        if depth > 2 or rng.random() < 0.3:
+            return rng.choice(names) if names and rng.random() < 0.6 else str(rng.randint(0, 20))
+        op = rng.choice(ops)
+        left, right = expr(names, depth + 1), expr(names, depth + 1)
+        if op in ('//', '%'):
+            right = f"(({right}) % 7 + 1)"  # Never divide by zero
+        return f"({left} {op} {right})"
+
+    programs = []
+    for _ in range(count):
+        names, lines = [], []
+        for i in range(rng.randint(2, 5)):
+            lines.append(f"v{i} = {expr(names)}")
+            names.append(f"v{i}")
+        lines.append(f"items = [{', '.join(str(rng.randint(-9, 9)) for _ in range(rng.randint(1, 8)))}]")
+        lines.append("acc = 0")
+        lines.append("for item in items:")
+        lines.append(f"    acc {rng.choice(['+=', '-=', '^=', '|='])} {expr(names + ['item', 'acc'])}")
+        if rng.random() < 0.5:
+            lines.append(f"    if item % 2 == 0:\n        print(item, acc)")
+        programs.append("\n".join(lines) + "\n")
+    return programs
+
+
+def run_harness(programs, repeat=5):
+    """Compare and time (construct, code) pairs; returns per-construct rows, largest gap first."""
+    rows = {}
+    for construct, code in programs:
+        outcome = compare(code)
+        cpython_s, parser_s = timed(code, repeat)
+        row = rows.setdefault(construct, {"construct": construct, "programs": 0, "mismatched": 0,
+                                          "ratios": [], "failures": []})
+        row["programs"] += 1
+        row["ratios"].append(parser_s / cpython_s if cpython_s else float('inf'))
+        if outcome["mismatches"]:
+            row["mismatched"] += 1
+            row["failures"].append({"code": code, "mismatches": outcome["mismatches"]})
+
+    report = []
+    for row in rows.values():
+        ratios = row.pop("ratios")
+        row["median_ratio"] = statistics.median(ratios)
+        row["geomean_ratio"] = math.exp(statistics.fmean(math.log(r) for r in ratios))
+        report.append(row)
+    report.sort(key=lambda row: row["geomean_ratio"], reverse=True)
+    return report
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--repeat', type=int, default=5, help='timing repetitions (best is kept)')
+    arg_parser.add_argument('--generated', type=int, default=50, help='number of random programs')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--json', action='store_true', help='print the full report as JSON')
+    args = arg_parser.parse_args()
+
+    programs = list(CONSTRUCTS.items())
+    # The DP programs loop past the 100 replayed iterations, so they cannot match
+    programs += [(f"corpus:{name}", code) for name, code in CORPUS.items() if name not in DP_PROGRAMS]
+    programs += [("generated", code) for code in generate_programs(args.generated, args.seed)]
+    report = run_harness(programs, args.repeat)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'construct':<24} {'programs':>8} {'mismatch':>8} {'median x':>10} {'geomean x':>10}")
+        for row in report:
+            print(f"{row['construct']:<24} {row['programs']:>8} {row['mismatched']:>8} "
+                  f"{row['median_ratio']:>10.1f} {row['geomean_ratio']:>10.1f}")
+        for row in report:
+            for failure in row["failures"][:3]:
+                print(f"\n[{row['construct']}] mismatch:\n{failure['code']}")
+                for mismatch in failure["mismatches"]:
+                    print(f"  {mismatch}")
+    return 1 if any(row["mismatched"] for row in report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
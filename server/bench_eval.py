@@ -0,0 +1,91 @@
+"""
+Expression evaluation benchmark: CodeParser cost per evaluated AST node.
+
+Runs every corpus program once, then re-evaluates its expressions (assigned
+values and conditions, without method calls since those mutate) against the
+final variables, and reports nanoseconds per evaluated node. A counting
+pass with CodeParser(count_handlers=True) gives the node counts and the
+most-called handlers (node types, operators, builtins, methods).
+
+Usage: python bench_eval.py [--repeat 200] [--top 10] [--json]
+"""
+import argparse
+import ast
+import json
+import time
+from collections import Counter
+
+from bench_corpus import CORPUS
+from code_parser import EVALUATORS, CodeParser
+
+NODE_TYPES = {cls.__name__ for cls in EVALUATORS}
+
+
+def expressions(code):
+    """Assigned values and loop/branch conditions of `code` that call no methods."""
+    found = []
+    for node in ast.walk(ast.parse(code)):
+        if isinstance(node, (ast.Assign, ast.AugAssign)):
+            found.append(node.value)
+        elif isinstance(node, (ast.If, ast.While)):
+            found.append(node.test)
+    return [expr for expr in found
+            if not any(isinstance(n, ast.Call) and isinstance(n.func, ast.Attribute) for n in ast.walk(expr))]
+
+
+def measure(code, repeat):
+    """(nodes evaluated per pass, best ns per node, handler counts of one pass) for `code`."""
+    parser = CodeParser(max_steps=None)
+    parser.parse(code)
+    exprs = []
+    for expr in expressions(code):
+        try:
+            parser._evaluate(expr)
+            exprs.append(expr)
+        except Exception:
+            pass  # Depends on loop-local state (e.g. an index past the end)
+
+    parser.handler_counts = Counter()
+    for expr in exprs:
+        parser._evaluate(expr)
+    counts = parser.handler_counts
+    parser.handler_counts = None
+    nodes = sum(count for name, count in counts.items() if name in NODE_TYPES)
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for expr in exprs:
+            parser._evaluate(expr)
+        best = min(best, time.perf_counter() - start)
+    return nodes, (best / nodes * 1e9 if nodes else 0.0), counts
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--repeat', type=int, default=200, help='timing repetitions (best is kept)')
+    arg_parser.add_argument('--top', type=int, default=10, help='most-called handlers to list')
+    arg_parser.add_argument('--json', action='store_true')
+    args = arg_parser.parse_args()
+
+    rows = []
+    total = Counter()
+    for name, code in CORPUS.items():
+        nodes, ns_per_node, counts = measure(code, args.repeat)
+        rows.append({"program": name, "nodes": nodes, "ns_per_node": round(ns_per_node, 1)})
+        total.update(counts)
+    top = total.most_common(args.top)
+
+    if args.json:
+        print(json.dumps({"programs": rows, "handlers": dict(top)}, indent=2))
+        return
+    print(f"{'program':<20} {'nodes':>8} {'ns/node':>10}")
+    for row in rows:
+        print(f"{row['program']:<20} {row['nodes']:>8} {row['ns_per_node']:>10.1f}")
+    print(f"\n{'handler':<20} {'calls':>8}")
+    for handler, calls in top:
+        print(f"{handler:<20} {calls:>8}")
+
+
+if __name__ == "__main__":
+    main()
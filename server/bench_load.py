@@ -0,0 +1,228 @@
+"""
+Load test: replay editing sessions against the Flask service at classroom scale.
+
+Each simulated student replays one session (the successive editorCode states
+of an editing session) the way the client does: every state is sent to
+/api/parse as a preview, and the final state is sent again with Run's
+options (trace on, maxFrames), like pressing Run. Reports p50/p95/p99 latency, error rate and throughput per
+endpoint, to size workers and to check caching, debouncing or pooling changes
+before deploying.
+
+Sessions come from a JSONL file (one {"states": [...]} per line) or, by
+default, are synthesized by "typing" the benchmark corpus a few characters
+at a time. Without --url a local server (app.py, threaded) is started on a
+free port and stopped afterwards; set VISUALEYES_CACHE etc. in the
+environment to test those configurations.
+
+Usage:
+    python bench_load.py [--students 200] [--sessions sessions.jsonl] [--url http://host:port]
+                         [--think-ms 150] [--debounce-ms 0] [--etag] [--duration 60] [--json]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_corpus import CORPUS
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Snapshots per loop the client asks for on Run (RUN_MAX_FRAMES in App.jsx)
+RUN_MAX_FRAMES = 200
+
+
+def preview_body(code):
+    """Body of a live preview, as CommandController.parse(code) sends it."""
+    return {"code": code, "trace": False}
+
+
+def run_body(code):
+    """Body of Run, as CommandController.parse(code, runOptions(null)) sends it."""
+    return {"code": code, "trace": True, "maxFrames": RUN_MAX_FRAMES}
+
+
+def typing_session(code, chars_per_state=4):
+    """Editor states of typing `code` from scratch, a few characters per state."""
+    states = [code[:end] for end in range(chars_per_state, len(code), chars_per_state)]
+    return states + [code]
+
+
+def load_sessions(path=None, chars_per_state=4):
+    """Sessions (lists of editor states) from a JSONL file, or typed from the corpus."""
+    if path is None:
+        return [typing_session(code, chars_per_state) for code in CORPUS.values()]
+    sessions = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                sessions.append(json.loads(line)["states"])
+    return sessions
+
+
+def debounce(states, think_ms, debounce_ms):
+    """States a debouncing client would send: drop states superseded within `debounce_ms`."""
+    if debounce_ms <= think_ms:
+        return list(states)
+    if think_ms <= 0:
+        return [states[-1]]
+    step = int(debounce_ms // think_ms) + 1
+    kept = states[step - 1::step]
+    if (len(states) - 1) % step != step - 1:
+        kept.append(states[-1])  # The final state is always sent
+    return kept
+
+
+class Stats:
+    """Thread-safe latency/error/status collection per endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # endpoint -> list of (seconds, status)
+
+    def add(self, endpoint, seconds, status):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append((seconds, status))
+
+    def report(self, elapsed):
+        rows = []
+        for endpoint, samples in sorted(self.samples.items()):
+            latencies = sorted(seconds for seconds, _ in samples)
+            errors = sum(1 for _, status in samples if status is None or status >= 500)
+            rows.append({
+                "endpoint": endpoint,
+                "requests": len(samples),
+                "errorRate": errors / len(samples),
+                "notModified": sum(1 for _, status in samples if status == 304),
+                "throughput": len(samples) / elapsed if elapsed else 0.0,
+                "p50_ms": _percentile(latencies, 50) * 1000,
+                "p95_ms": _percentile(latencies, 95) * 1000,
+                "p99_ms": _percentile(latencies, 99) * 1000,
+            })
+        return rows
+
+
+def _percentile(values, p):
+    """Nearest-rank percentile of sorted `values`."""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * p // 100))  # ceil
+    return values[min(rank, len(values)) - 1]
+
+
+def post(url, body, stats, endpoint, etags=None, timeout=30):
+    headers = {'Content-Type': 'application/json'}
+    key = None
+    if etags is not None:
+        key = json.dumps(body, sort_keys=True)
+        if key in etags:
+            headers['If-None-Match'] = etags[key]
+    request = urllib.request.Request(url, data=json.dumps(body).encode('utf-8'), headers=headers, method='POST')
+    start = time.perf_counter()
+    status = None
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+            if etags is not None and response.headers.get('ETag'):
+                etags[key] = response.headers['ETag']
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = None  # Connection refused/reset/timeout
+    stats.add(endpoint, time.perf_counter() - start, status)
+
+
+def replay(base_url, states, stats, think_ms=150, debounce_ms=0, use_etag=False, stop_at=None):
+    """One student: preview every (debounced) state, then Run the final one."""
+    etags = {} if use_etag else None
+    parse_url = base_url + '/api/parse'
+    for code in debounce(states, think_ms, debounce_ms):
+        if stop_at is not None and time.perf_counter() > stop_at:
+            return
+        post(parse_url, preview_body(code), stats, "parse", etags)
+        if think_ms:
+            time.sleep(think_ms / 1000)
+    post(parse_url, run_body(states[-1]), stats, "parse:run", etags)
+
+
+def run_load(base_url, sessions, students=200, think_ms=150, debounce_ms=0, use_etag=False, duration=None):
+    """Replay `sessions` with `students` concurrent clients; returns (rows, elapsed seconds)."""
+    stats = Stats()
+    start = time.perf_counter()
+    stop_at = start + duration if duration else None
+    with ThreadPoolExecutor(max_workers=students) as pool:
+        futures = [
+            pool.submit(replay, base_url, sessions[k % len(sessions)], stats, think_ms, debounce_ms, use_etag, stop_at)
+            for k in range(students)
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+    return stats.report(elapsed), elapsed
+
+
+def start_server():
+    """Start app.py (threaded dev server) on a free port; returns (process, base URL)."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    code = f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=SERVER_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url + '/api/health', timeout=1).read()
+            return process, base_url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--students', type=int, default=200, help='concurrent simulated students')
+    arg_parser.add_argument('--sessions', help='JSONL file of {"states": [...]} editing sessions')
+    arg_parser.add_argument('--chars-per-state', type=int, default=4, help='typing granularity of synthesized sessions')
+    arg_parser.add_argument('--url', help='existing server to test (default: start app.py locally)')
+    arg_parser.add_argument('--think-ms', type=float, default=150, help='pause between editor states')
+    arg_parser.add_argument('--debounce-ms', type=float, default=0, help='simulate client-side debouncing')
+    arg_parser.add_argument('--etag', action='store_true', help='send If-None-Match like the client cache')
+    arg_parser.add_argument('--duration', type=float, help='stop replaying after this many seconds')
+    arg_parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = arg_parser.parse_args()
+
+    sessions = load_sessions(args.sessions, args.chars_per_state)
+    process = None
+    base_url = args.url
+    if base_url is None:
+        process, base_url = start_server()
+    try:
+        rows, elapsed = run_load(base_url.rstrip('/'), sessions, args.students, args.think_ms,
+                                 args.debounce_ms, args.etag, args.duration)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.json:
+        print(json.dumps({"students": args.students, "elapsed": elapsed, "endpoints": rows}, indent=2))
+        return
+    print(f"{args.students} students, {len(sessions)} sessions, {elapsed:.1f}s")
+    print(f"{'endpoint':<12} {'requests':>8} {'errors':>7} {'304':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for row in rows:
+        print(f"{row['endpoint']:<12} {row['requests']:>8} {row['errorRate']:>7.1%} {row['notModified']:>6} "
+              f"{row['throughput']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Peak memory of iterationState on DP-style traces, measured with tracemalloc.
+
+Compares SnapshotStore against the previous representation (a fresh Python
+list per variable per iteration).
+
+Usage: python bench_snapshot_memory.py
+"""
+import json
+import tracemalloc
+
+from bench_corpus import CORPUS, DP_PROGRAMS
+from code_parser import CodeParser
+from snapshot_store import SnapshotStore, summarize
+
+
+class ListSnapshots(dict):
+    """Previous iterationState format: one list copy per variable per iteration."""
+
+    def capture(self, key, context):
+        snapshot = {}
+        for name, v in context.items():
+            if isinstance(v, list):
+                snapshot[name] = list(v)
+            elif isinstance(v, dict):
+                snapshot[name] = [{"key": str(k), "value": str(v_val)} for k, v_val in v.items()]
+            elif isinstance(v, set):
+                snapshot[name] = list(v)
+            elif isinstance(v, (int, float, str, bool, tuple, type(None))):
+                snapshot[name] = v
+            else:
+                # Ranges, iterators, lambdas: summarized as SnapshotStore does
+                summary = summarize(v)
+                snapshot[name] = {"summarized": True, "type": summary.type, "length": summary.length}
+        self[str(key)] = snapshot
+
+    def reset(self):
+        self.clear()
+
+    def to_dict(self):
+        return dict(self)
+
+
+def measure(code, store_cls):
+    """Return (peak bytes while tracing, parse result)."""
+    parser = CodeParser(snapshot_store=store_cls)
+    tracemalloc.start()
+    result = parser.parse(code)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, result
+
+
+def main():
+    print(f"{'program':<18} {'lists (KB)':>12} {'store (KB)':>12} {'ratio':>8}")
+    for name in DP_PROGRAMS:
+        code = CORPUS[name]
+        legacy_peak, legacy = measure(code, ListSnapshots)
+        store_peak, result = measure(code, SnapshotStore)
+
+        # Both representations must serialize to the same iterationState
+        assert json.dumps(result["iterationState"].to_dict()) == json.dumps(legacy["iterationState"])
+
+        print(f"{name:<18} {legacy_peak / 1024:>12.1f} {store_peak / 1024:>12.1f} {legacy_peak / store_peak:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Startup benchmark: fresh interpreter -> `import app` -> first /api/parse response.
+
+Each run starts a new Python process so nothing is cached in memory. Results
+can be appended to a JSONL file to track startup time across releases.
+
+Usage: python bench_startup.py [--runs 10] [--warmup] [--record bench_startup.jsonl] [--label v1.2]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from bench_corpus import TWO_SUM
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs inside the child process; prints timings in milliseconds as JSON
+CHILD = """
+import json, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+client = app.app.test_client()
+response = client.post('/api/parse', json={'code': %r})
+assert response.status_code == 200, response.status_code
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_parse_ms": (t2 - t1) * 1000, "total_ms": (t2 - t0) * 1000}))
+""" % TWO_SUM
+
+
+def run_once(warmup):
+    env = dict(os.environ)
+    if warmup:
+        env['VISUALEYES_WARMUP'] = '1'
+    else:
+        env.pop('VISUALEYES_WARMUP', None)
+
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', CHILD], cwd=SERVER_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    timings = json.loads(out.strip().splitlines()[-1])
+    timings["process_ms"] = (time.perf_counter() - start) * 1000  # includes interpreter boot
+    return timings
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--runs', type=int, default=10)
+    arg_parser.add_argument('--warmup', action='store_true', help='set VISUALEYES_WARMUP=1 in the child')
+    arg_parser.add_argument('--record', help='append the medians to this JSONL file')
+    arg_parser.add_argument('--label', default='', help='release/commit label stored with --record')
+    args = arg_parser.parse_args()
+
+    runs = [run_once(args.warmup) for _ in range(args.runs)]
+    medians = {key: round(statistics.median(r[key] for r in runs), 2) for key in runs[0]}
+
+    print(f"runs={args.runs} warmup={args.warmup}")
+    for key, value in medians.items():
+        print(f"  {key:<16} {value:>9.2f} ms (median)")
+
+    if args.record:
+        with open(args.record, 'a') as f:
+            f.write(json.dumps({"label": args.label, "time": time.time(), "warmup": args.warmup,
+                                "runs": args.runs, **medians}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,116 @@
 import ast
-import operator
+import contextlib
+import time
+from collections import Counter
+
+from def_use import DefUse
+from dispatch import BINARY_OPS, BUILTINS, COMPARE_OPS, INPLACE_OPS, METHODS, UNARY_OPS
+from object_graph import Heap, UserClass, UserObject, node_label, reachable
+from snapshot_store import KeyframeSampler, SnapshotStore, apply_policy
+from trace_log import TraceLog
+
+# Bump whenever parse() output changes, so cached results from older versions are ignored
+PARSER_VERSION = "8"
+
+# Default per-parse execution budget (statements executed + elements built)
+DEFAULT_MAX_STEPS = 1_000_000
+
+# Iterations of a top-level loop that get their own snapshot/output
+MAX_REPLAYED_ITERATIONS = 100
+
+# Builtins that can also be passed as values, e.g. map(str, nums) or sorted(words, key=len)
+CALLABLE_BUILTINS = {'abs': abs, 'bool': bool, 'float': float, 'int': int, 'len': len, 'str': str}
+
+
+class ExecutionBudgetExceeded(BaseException):
+    """Raised when a parse exceeds its step or time budget.
+
+    Derives from BaseException (like KeyboardInterrupt) so the interpreter's
+    per-statement `except Exception` handlers, which report *user* runtime
+    errors and keep going, don't swallow it.
+    """
+
+
+class LoopControl(BaseException):
+    """Raised by `break`/`continue` and caught by the innermost running loop.
+
+    A BaseException for the same reason as ExecutionBudgetExceeded: it has to
+    pass through the per-statement handlers of enclosing ifs.
+    """
+    keyword = None
+
+
+class BreakLoop(LoopControl):
+    keyword = 'break'
+
+
+class ContinueLoop(LoopControl):
+    keyword = 'continue'
+
 
 class CodeParser:
-    def __init__(self):
+    def __init__(self, snapshot_store=SnapshotStore, max_steps=DEFAULT_MAX_STEPS, max_seconds=None, count_handlers=False):
         self.context = {} # Symbol table for variable resolution
+        self.snapshot_store = snapshot_store # Factory for per-loop iterationState storage
+        self.trace = None # Statement-level TraceLog (only when requested)
+        self._iteration = -1 # Loop iteration currently being replayed
+        self.analysis = None # Static DefUse analysis of the program being parsed
+        self.heap = Heap() # Instances of user-defined classes created by the program
+        self.watch = None # Names snapshotted in full (None = all)
+        self.max_bytes = None # Values estimated larger than this are summarized (None = no limit)
+        self.max_frames = None # Snapshots kept per sampled loop (None = first MAX_REPLAYED_ITERATIONS)
+        self._sampler = None # KeyframeSampler of the top-level loop being replayed
+        self.max_steps = max_steps # None = unlimited
+        self.max_seconds = max_seconds # Wall-clock limit per parse, None = unlimited
+        self._steps = 0
+        self._deadline = None
+        # Calls per evaluator/operator/builtin/method across parses, for profiling (None = not counted)
+        self.handler_counts = Counter() if count_handlers else None
 
-    def parse(self, code):
+    def parse(self, code, trace=False, watch=None, max_bytes=None, max_frames=None):
+        """Interpret `code`. With `watch` (variable names) and/or `max_bytes`,
+        iteration snapshots keep only watched, small enough variables in full
+        and reduce the rest to their type and length. With `max_frames`,
+        top-level loops run past MAX_REPLAYED_ITERATIONS and keep at most
+        that many snapshots, chosen by a KeyframeSampler."""
         structures = []
         self.context = {} # Reset context on each parse
         self.output = []  # Capture print() calls
+        self.trace = TraceLog() if trace else None
+        self._iteration = -1
+        self.watch = set(watch) if watch is not None else None
+        self.max_bytes = max_bytes
+        self.max_frames = max_frames
+        self._sampler = None
+        self.heap = Heap()
+        self._steps = 0
+        self._deadline = time.perf_counter() + self.max_seconds if self.max_seconds else None
+        budget_error = None
         index_operations = []  # Track subscript operations
         loop_info = {
             "hasLoop": False,
             "target": None,
             "iterator": None,
-            "loopDependencies": []
+            "loopDependencies": [],
+            "loopCarried": []
         }
 
         try:
             tree = ast.parse(code)
         except SyntaxError as e:
             return {"structures": [], "error": f"Syntax Error: {e}", "output": []}
+        self.analysis = DefUse(tree)
 
         # Iterate over top-level nodes in order to respect variable dependencies
-        for node in tree.body:
-            self._process_node(node, structures, index_operations, loop_info)
+        try:
+            for node in tree.body:
+                self._process_node(node, structures, index_operations, loop_info)
+        except ExecutionBudgetExceeded as e:
+            # Keep everything traced so far
+            budget_error = str(e)
+            self.output.append(f"Execution stopped: {budget_error}")
+        except LoopControl as e:
+            self.output.append(f"Syntax Error: '{e.keyword}' outside loop")
 
         # Ensure loop iterator exists in structures
         if loop_info["iterator"] and not any(s['name'] == loop_info["iterator"] for s in structures):
@@ -38,46 +124,75 @@ class CodeParser:
                 initial_value = dep.get("formula", "?")
                 structures.append({"name": dep_name, "type": "variable", "data": initial_value})
 
-        return {
+        result = {
             "structures": structures,
             "indexOperations": index_operations,
             "output": self.output,
             **loop_info
         }
+        if self.trace is not None:
+            result["lineTrace"] = self.trace.to_dict()
+        if budget_error is not None:
+            result["error"] = budget_error
+            result["budgetExceeded"] = True
+        return result
+
+    def _charge(self, cost=1):
+        """Charge `cost` steps against the execution budget."""
+        self._steps += cost
+        if self.max_steps is not None and self._steps > self.max_steps:
+            raise ExecutionBudgetExceeded(f"step budget of {self.max_steps} exceeded")
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise ExecutionBudgetExceeded(f"time budget of {self.max_seconds}s exceeded")
 
     def _process_node(self, node, structures, index_operations, loop_info, silent=False):
         """Process a single AST node recursively."""
+        self._charge()
+        if self._sampler is not None:
+            self._sampler.statement(node)
+        if self.trace is not None:
+            # Loops record one trace event per iteration instead (see 3b)
+            if isinstance(node, (ast.For, ast.While)):
+                self.trace.close()
+            else:
+                self.trace.begin(node, self._iteration)
         try:
             # 1. Assignments
             if isinstance(node, ast.Assign):
                 # Check for subscript assignment (e.g., lis[0] = 2)
                 if len(node.targets) == 1 and isinstance(node.targets[0], ast.Subscript):
                     subscript = node.targets[0]
-                    if isinstance(subscript.value, ast.Name):
+                    # Nested subscript assignment (e.g., dp[i][j] = 1)
+                    if isinstance(subscript.value, ast.Subscript):
+                        self._assign_nested_subscript(node, subscript, structures, index_operations, silent)
+                    elif isinstance(subscript.value, ast.Name):
                         var_name = subscript.value.id
                         try:
                             # Evaluate the new value
                             new_value = self._evaluate(node.value)
-                            # Get indices
-                            indices = self._extract_indices(subscript.slice)
+                            container = self.context.get(var_name)
+                            # Get indices (slices stay as [start, stop, step] ranges)
+                            indices, ranges = self._extract_indices(subscript.slice, container)
                             
-                            # Update context if variable exists
-                            if var_name in self.context and isinstance(self.context[var_name], (list, dict)):
+                            if self.trace is not None:
+                                self.trace.write(var_name)
                                 for idx in indices:
-                                    # Dictionary assignment
-                                    if isinstance(self.context[var_name], dict):
-                                        self.context[var_name][idx] = new_value
-                                    # List assignment
-                                    elif isinstance(self.context[var_name], list) and 0 <= idx < len(self.context[var_name]):
-                                        self.context[var_name][idx] = new_value
+                                    self.trace.touch(var_name, idx)
+                                for r in ranges:
+                                    self.trace.touch(var_name, range(*r))
+
+                            # Update context if variable exists
+                            if isinstance(container, (list, dict)):
+                                if isinstance(subscript.slice, ast.Slice):
+                                    # Slice assignment in one operation (e.g., lis[1:3] = [8, 9])
+                                    container[self._evaluate_slice(subscript.slice)] = new_value
+                                else:
+                                    container[indices[0]] = new_value
                                         
                                 # Update structures (only if not silent)
                                 if not silent:
-                                    if isinstance(self.context[var_name], list):
-                                        self._add_or_update(structures, var_name, 'array', list(self.context[var_name]))
-                                    elif isinstance(self.context[var_name], dict):
-                                        data = [{"key": str(k), "value": str(v)} for k, v in self.context[var_name].items()]
-                                        self._add_or_update(structures, var_name, 'dictionary', data)
+                                    type_str, data = self._structure_for(self.context[var_name])
+                                    self._add_or_update(structures, var_name, type_str, data)
                             
                             # Track the operation (only if not silent)
                             if not silent:
@@ -85,7 +200,9 @@ class CodeParser:
                                     "type": "assign",
                                     "varName": var_name,
                                     "indices": indices,
-                                    "newValue": new_value
+                                    "ranges": ranges,
+                                    "newValue": new_value,
+                                    "line": node.lineno
                                 })
                         except Exception as e:
                             self.output.append(f"Runtime Error (Subscript Assign): {e}")
@@ -95,37 +212,49 @@ class CodeParser:
                     var_name = node.targets[0].id
                     value_node = node.value
                     
-                    data = None
-                    type_str = 'variable'
-
                     # Try to evaluate the expression
                     try:
                         evaluated_value = self._evaluate(value_node)
                         
-                        # Determine type based on result
-                        if isinstance(evaluated_value, list):
-                            type_str = 'array'
-                            data = list(evaluated_value)
-                        elif isinstance(evaluated_value, set):
-                            type_str = 'set'
-                            data = list(evaluated_value)
-                        elif isinstance(evaluated_value, dict):
-                            type_str = 'dictionary'
-                            # Format for frontend: [{"key": k, "value": v}]
-                            data = [{"key": str(k), "value": str(v)} for k, v in evaluated_value.items()]
-                        elif isinstance(evaluated_value, (int, float, str, bool)):
-                            type_str = 'variable'
-                            data = evaluated_value
-                        
                         # Update context for future references
                         self.context[var_name] = evaluated_value
+                        if self.trace is not None:
+                            self.trace.write(var_name)
                         # For frontend, we add to structures (only if not silent)
-                        if not silent and data is not None:
-                            self._add_or_update(structures, var_name, type_str, data)
+                        if not silent:
+                            # Determine type based on result
+                            type_str, data = self._structure_for(evaluated_value)
+                            if data is not None:
+                                self._add_or_update(structures, var_name, type_str, data)
 
                     except Exception as e:
                         # Report runtime errors during evaluation
                         self.output.append(f"Runtime Error (Assign {var_name}): {e}")
+
+                # Attribute assignment on an instance (e.g., node.next = prev)
+                elif len(node.targets) == 1 and isinstance(node.targets[0], ast.Attribute):
+                    try:
+                        self._assign_attribute(node.targets[0], self._evaluate(node.value), structures, silent)
+                    except Exception as e:
+                        self.output.append(f"Runtime Error (Attribute Assign): {e}")
+
+                # Chained assignment: dummy = cur = ListNode(0) binds one value to every target
+                elif len(node.targets) > 1 and all(isinstance(t, (ast.Name, ast.Attribute)) for t in node.targets):
+                    try:
+                        value = self._evaluate(node.value)
+                        for target in node.targets:
+                            if isinstance(target, ast.Attribute):
+                                self._assign_attribute(target, value, structures, silent)
+                                continue
+                            self.context[target.id] = value
+                            if self.trace is not None:
+                                self.trace.write(target.id)
+                            if not silent:
+                                type_str, data = self._structure_for(value)
+                                if data is not None:
+                                    self._add_or_update(structures, target.id, type_str, data)
+                    except Exception as e:
+                        self.output.append(f"Runtime Error (Assign): {e}")
                 
                 # Tuple/List unpacking assignment: a, b = [1, 2]
                 elif len(node.targets) == 1 and isinstance(node.targets[0], (ast.Tuple, ast.List)):
@@ -141,26 +270,33 @@ class CodeParser:
                                     var_name = elt.id
                                     val = values[i]
                                     
-                                    # Determine type and data for structures
-                                    data = val
-                                    type_str = 'variable'
-                                    if isinstance(val, list):
-                                        type_str = 'array'
-                                        data = list(val)
-                                    elif isinstance(val, set):
-                                        type_str = 'set'
-                                        data = list(val)
-                                    elif isinstance(val, dict):
-                                        type_str = 'dictionary'
-                                        data = [{"key": str(k), "value": str(v)} for k, v in val.items()]
-                                    
                                     # Update context and structures
                                     self.context[var_name] = val
+                                    if self.trace is not None:
+                                        self.trace.write(var_name)
                                     if not silent:
+                                        # Determine type and data for structures
+                                        type_str, data = self._structure_for(val)
+                                        if type_str is None:
+                                            type_str, data = 'variable', val
                                         self._add_or_update(structures, var_name, type_str, data)
+                                elif i < len(values) and isinstance(elt, ast.Attribute):
+                                    # prev, cur.next, cur = cur, prev, cur.next
+                                    self._assign_attribute(elt, values[i], structures, silent)
                     except Exception as e:
                         self.output.append(f"Runtime Error (Unpacking): {e}")
 
+            # 1b. Augmented assignment (e.g., count += 1, res += [x], dp[i][j] += 1)
+            elif isinstance(node, ast.AugAssign):
+                self._aug_assign(node, structures, index_operations, silent)
+
+            # 1c. Class definitions (e.g., class ListNode with an __init__)
+            elif isinstance(node, ast.ClassDef):
+                try:
+                    self._define_class(node)
+                except Exception as e:
+                    self.output.append(f"Runtime Error (Class {node.name}): {e}")
+
             # 2. Conditional Statements (if/elif/else)
             elif isinstance(node, ast.If):
                 try:
@@ -178,10 +314,21 @@ class CodeParser:
                     self.output.append(f"Runtime Error (Condition): {e}")
 
             # 3. Loops
+            elif isinstance(node, ast.For) and silent:
+                # Nested inside a replayed iteration: execute it, the outer loop snapshots
+                self._execute_nested_for(node, structures, index_operations, loop_info)
+
+            elif isinstance(node, ast.While):
+                self._execute_while(node, structures, index_operations, loop_info, silent)
+
+            elif isinstance(node, ast.Break):
+                raise BreakLoop()
+
+            elif isinstance(node, ast.Continue):
+                raise ContinueLoop()
+
             elif isinstance(node, ast.For):
-                loop_info["hasLoop"] = True
-                if "iterationOutputs" not in loop_info:
-                    loop_info["iterationOutputs"] = {}
+                self._begin_loop(loop_info)
                 
                 # 3a. Metadata Gathering (for visualization)
                 # Default behavior
@@ -227,15 +374,15 @@ class CodeParser:
                     elif isinstance(node.iter, ast.Call):
                         if isinstance(node.iter.func, ast.Name) and node.iter.func.id == 'range':
                             try:
-                                # Evaluate range arguments
+                                # Evaluate range arguments; the range is iterated lazily
                                 args = [self._evaluate(arg) for arg in node.iter.args]
-                                range_values = list(range(*args))
-                                iterable_obj = range_values
+                                iterable_obj = range(*args)
                                 
-                                # Create a synthetic structure for the range
+                                # Create a synthetic structure for the range (filled in
+                                # with the replayed iterations once the loop has run)
                                 loop_info["target"] = f"range_{loop_info['iterator']}"
                                 if not silent:
-                                    self._add_or_update(structures, loop_info["target"], 'array', range_values)
+                                    self._add_or_update(structures, loop_info["target"], 'array', [])
                             except Exception as e:
                                 self.output.append(f"Runtime Error (range): {e}")
                         else:
@@ -244,87 +391,75 @@ class CodeParser:
                             except:
                                 iterable_obj = []
                 
-                # Check body for dependencies (static analysis for visualization)
-                if loop_info["iterator"] and not silent:
-                    deps = []
-                    for child in node.body:
-                        if isinstance(child, ast.Assign):
-                            for target in child.targets:
-                                if isinstance(target, ast.Name):
-                                    # Check if value uses the iterator
-                                    if self._uses_variable(child.value, loop_info["iterator"]):
-                                        formula = self._get_formula(child.value)
-                                        deps.append({"name": target.id, "formula": formula})
-                                    else:
-                                        # Still add it but with evaluated value
-                                        try:
-                                            evaluated = self._evaluate(child.value)
-                                            deps.append({"name": target.id, "formula": str(evaluated)})
-                                        except:
-                                            formula = self._get_formula(child.value)
-                                            deps.append({"name": target.id, "formula": formula})
-                    
-                    # Merge dependencies, avoid duplicates
+                # Body dependencies for visualization (from the static def-use analysis)
+                summary = self.analysis.loops.get(node) if self.analysis is not None else None
+                if loop_info["iterator"] and not silent and summary is not None:
+                    loop_info["loopCarried"] = sorted(summary.carried)
                     current_dep_names = {d['name'] for d in loop_info["loopDependencies"]}
-                    for dep in deps:
-                        if dep['name'] not in current_dep_names:
-                            loop_info["loopDependencies"].append(dep)
+                    for dep in summary.assignments:
+                        if dep.name in current_dep_names:
+                            continue
+                        current_dep_names.add(dep.name)
+                        formula = dep.formula
+                        if not dep.reads & summary.written:
+                            # Loop-invariant: evaluating it now gives its in-loop value
+                            try:
+                                formula = str(self._evaluate(dep.value))
+                            except Exception:
+                                pass
+                        loop_info["loopDependencies"].append({"name": dep.name, "formula": formula})
 
                 # 3b. Silent Interpretation (to capture prints/snapshots per iteration)
+                broke = False
                 if not silent and iterable_obj:
-                    max_iters = min(len(iterable_obj), 100)
                     original_output = list(self.output)
-                    if "iterationState" not in loop_info:
-                        loop_info["iterationState"] = {}
+                    sampler = self._sampler = self._new_sampler(loop_info)
                     
-                    for idx in range(max_iters):
-                        val = iterable_obj[idx]
-                        
-                        # Set loop variables in context
-                        if is_enumerate:
-                            i_val, num_val = val
-                            # Handle tuple target unpacking
-                            if isinstance(node.target, (ast.Tuple, ast.List)) and len(node.target.elts) == 2:
-                                if isinstance(node.target.elts[0], ast.Name):
-                                    self.context[node.target.elts[0].id] = i_val
-                                if isinstance(node.target.elts[1], ast.Name):
-                                    self.context[node.target.elts[1].id] = num_val
-                            elif isinstance(node.target, ast.Name):
-                                self.context[node.target.id] = val
-                        else:
-                            if isinstance(node.target, ast.Name):
-                                self.context[node.target.id] = val
+                    try:
+                        # Consume the iterable lazily (zip/map/... are never materialized)
+                        for idx, val in enumerate(iterable_obj):
+                            if idx == MAX_REPLAYED_ITERATIONS and sampler is None:
+                                loop_info["iterationsTruncated"] = True
+                                break
+
+                            # Set loop variables in context (names or nested tuples)
+                            self._bind_target(node.target, val)
                         
-                        # Reset output for this iteration
-                        self.output = []
+                            # Record the loop header as this iteration's first event
+                            self._iteration = idx
+                            if self.trace is not None:
+                                self.trace.begin(node, idx)
+                                for target_name in ast.walk(node.target):
+                                    if isinstance(target_name, ast.Name):
+                                        self.trace.write(target_name.id)
+
+                            # Reset output for this iteration
+                            self.output = []
                         
-                        # Process body silently
-                        for child in node.body:
-                            self._process_node(child, structures, index_operations, loop_info, silent=True)
+                            # Process body silently
+                            broke = self._run_iteration(node.body, structures, index_operations, loop_info)
+                            loop_info["loopIterations"] = idx + 1
                         
-                        # Capture iteration output
-                        if self.output:
-                            loop_info["iterationOutputs"][str(idx)] = list(self.output)
+                            # Capture iteration output
+                            if self.output:
+                                loop_info["iterationOutputs"][str(idx)] = list(self.output)
                         
-                        # Capture iteration state snapshot (all variables in context)
-                        snapshot = {}
-                        for name, v in self.context.items():
-                            # Format if it's a structure
-                            if isinstance(v, list):
-                                snapshot[name] = list(v)
-                            elif isinstance(v, dict):
-                                snapshot[name] = [{"key": str(k), "value": str(v_val)} for k, v_val in v.items()]
-                            elif isinstance(v, set):
-                                snapshot[name] = list(v)
-                            else:
-                                snapshot[name] = v
-                        loop_info["iterationState"][str(idx)] = snapshot
-                    
-                    # Restore main output
-                    self.output = original_output
-            
-            elif isinstance(node, ast.While):
-                loop_info["hasLoop"] = True
+                            # Capture iteration state snapshot (all variables in context)
+                            self._capture_iteration(loop_info, idx)
+                            if broke:
+                                break
+                    finally:
+                        # Restore main output (also when the budget runs out mid-iteration)
+                        self.output = original_output
+                        self._iteration = -1
+                        self._finish_sampling(loop_info)
+                        if isinstance(iterable_obj, range):
+                            self._add_or_update(structures, loop_info["target"],
+                                                *range_structure(iterable_obj, loop_info["loopIterations"], sampler is not None))
+
+                if not broke:
+                    for child in node.orelse:
+                        self._process_node(child, structures, index_operations, loop_info, silent=silent)
             
             # 4. Subscript Access (e.g., lis[0] or lis[0:2])
             elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Subscript):
@@ -332,12 +467,19 @@ class CodeParser:
                 if isinstance(subscript.value, ast.Name):
                     var_name = subscript.value.id
                     try:
-                        indices = self._extract_indices(subscript.slice)
+                        indices, ranges = self._extract_indices(subscript.slice, self.context.get(var_name))
+                        if self.trace is not None:
+                            for idx in indices:
+                                self.trace.touch(var_name, idx)
+                            for r in ranges:
+                                self.trace.touch(var_name, range(*r))
                         if not silent:
                             index_operations.append({
                                 "type": "access",
                                 "varName": var_name,
-                                "indices": indices
+                                "indices": indices,
+                                "ranges": ranges,
+                                "line": node.lineno
                             })
                     except Exception as e:
                         self.output.append(f"Runtime Error (Subscript Access): {e}")
@@ -367,56 +509,298 @@ class CodeParser:
                             try:
                                 # Evaluate the method call
                                 self._evaluate(call)
+                                if self.trace is not None:
+                                    self.trace.write(var_name)
                                 # Update structures with mutated list
                                 if not silent:
                                     if var_name in self.context and isinstance(self.context[var_name], list):
-                                        self._add_or_update(structures, var_name, 'array', list(self.context[var_name]))
+                                        type_str, data = self._structure_for(self.context[var_name])
+                                        self._add_or_update(structures, var_name, type_str, data)
                             except Exception as e:
                                 self.output.append(f"Runtime Error (Method {method_name}): {e}")
+                    elif isinstance(call.func.value, ast.Attribute):
+                        # Lists held by objects (e.g., node.children.append(child))
+                        try:
+                            self._evaluate(call)
+                        except Exception as e:
+                            self.output.append(f"Runtime Error (Method {call.func.attr}): {e}")
         except Exception as top_e:
              self.output.append(f"Unexpected Interpretation Error: {top_e}")
 
 
-    def _uses_variable(self, node, var_name):
-        """Recursively check if a variable is used in the node tree."""
-        for child in ast.walk(node):
-            if isinstance(child, ast.Name) and child.id == var_name:
-                return True
+    def _assign_nested_subscript(self, node, subscript, structures, index_operations, silent):
+        """Assign through a chain of subscripts, e.g. dp[i][j] = v or grid[r][c][k] = v."""
+        # Walk down to the root name, collecting the index expressions
+        slices = []
+        root = subscript
+        while isinstance(root, ast.Subscript):
+            slices.append(root.slice)
+            root = root.value
+        if not isinstance(root, ast.Name):
+            return
+        slices.reverse()
+        var_name = root.id
+
+        try:
+            new_value = self._evaluate(node.value)
+            path = [self._evaluate(s) for s in slices]
+
+            container = self.context[var_name]
+            for key in path[:-1]:
+                container = container[key]
+            container[path[-1]] = new_value
+
+            if self.trace is not None:
+                self.trace.write(var_name)
+                self.trace.touch(var_name, tuple(path))
+
+            if not silent:
+                type_str, data = self._structure_for(self.context[var_name])
+                self._add_or_update(structures, var_name, type_str, data)
+                index_operations.append({
+                    "type": "assign",
+                    "varName": var_name,
+                    "indices": [],
+                    "cells": [path],
+                    "newValue": new_value,
+                    "line": node.lineno
+                })
+        except Exception as e:
+            self.output.append(f"Runtime Error (Subscript Assign): {e}")
+
+    def _aug_assign(self, node, structures, index_operations, silent):
+        """Augmented assignment to a name or a (nested) subscript; mutable values update in place."""
+        target = node.target
+        if isinstance(target, ast.Name):
+            var_name = target.id
+            try:
+                if var_name not in self.context:
+                    raise NameError(f"name '{var_name}' is not defined")
+                value = self._evaluate(node.value)
+                self.context[var_name] = self._binary_op(node.op, self.context[var_name], value, inplace=True)
+                if self.trace is not None:
+                    self.trace.write(var_name)
+                if not silent:
+                    type_str, data = self._structure_for(self.context[var_name])
+                    if data is not None:
+                        self._add_or_update(structures, var_name, type_str, data)
+            except Exception as e:
+                self.output.append(f"Runtime Error (Assign {var_name}): {e}")
+            return
+
+        if isinstance(target, ast.Attribute):
+            try:
+                obj = self._evaluate(target.value)
+                value = self._evaluate(node.value)
+                if type(obj) is not UserObject:
+                    raise ValueError(f"Unsupported attribute assignment: {target.attr} on {type(obj)}")
+                new_value = self._binary_op(node.op, obj.get(target.attr), value, inplace=True)
+                self._assign_attribute(target, new_value, structures, silent, obj)
+            except Exception as e:
+                self.output.append(f"Runtime Error (Attribute Assign): {e}")
+            return
+
+        if not isinstance(target, ast.Subscript):
+            return
+        # Walk down to the root name, collecting the index expressions
+        slices = []
+        root = target
+        while isinstance(root, ast.Subscript):
+            slices.append(root.slice)
+            root = root.value
+        if not isinstance(root, ast.Name):
+            return
+        slices.reverse()
+        var_name = root.id
+
+        try:
+            value = self._evaluate(node.value)
+            container = self.context[var_name]
+            path = []
+            for s in slices[:-1]:
+                key = self._evaluate(s)
+                path.append(key)
+                container = container[key]
+
+            # Last index: normalized like a plain subscript assignment
+            indices, ranges = self._extract_indices(slices[-1], container)
+            key = self._evaluate_slice(slices[-1]) if isinstance(slices[-1], ast.Slice) else indices[0]
+            container[key] = self._binary_op(node.op, container[key], value, inplace=True)
+            new_value = container[key]
+
+            if self.trace is not None:
+                self.trace.write(var_name)
+                if path:
+                    self.trace.touch(var_name, tuple(path + indices))
+                for idx in ([] if path else indices):
+                    self.trace.touch(var_name, idx)
+                for r in ranges:
+                    self.trace.touch(var_name, range(*r))
+
+            if not silent:
+                type_str, data = self._structure_for(self.context[var_name])
+                self._add_or_update(structures, var_name, type_str, data)
+                operation = {"type": "assign", "varName": var_name, "newValue": new_value, "line": node.lineno}
+                if path:
+                    operation.update({"indices": [], "cells": [path + indices]})
+                else:
+                    operation.update({"indices": indices, "ranges": ranges})
+                index_operations.append(operation)
+        except Exception as e:
+            self.output.append(f"Runtime Error (Subscript Assign): {e}")
+
+    def _execute_nested_for(self, node, structures, index_operations, loop_info):
+        """Run a for loop nested inside a replayed iteration (no per-iteration snapshots)."""
+        try:
+            iterable_obj = self._evaluate(node.iter)
+        except Exception as e:
+            self.output.append(f"Runtime Error (Loop): {e}")
+            return
+
+        for val in iterable_obj:
+            self._bind_target(node.target, val)
+            if self.trace is not None:
+                self.trace.begin(node, self._iteration)
+                for target_name in ast.walk(node.target):
+                    if isinstance(target_name, ast.Name):
+                        self.trace.write(target_name.id)
+            if self._run_iteration(node.body, structures, index_operations, loop_info):
+                return
+        for child in node.orelse:
+            self._process_node(child, structures, index_operations, loop_info, silent=True)
+
+    def _execute_while(self, node, structures, index_operations, loop_info, silent):
+        """Run a while loop to completion (or break). At top level the first
+        MAX_REPLAYED_ITERATIONS iterations (or a sample) are snapshotted like a
+        replayed for loop."""
+        if not silent:
+            self._begin_loop(loop_info)
+            self._sampler = self._new_sampler(loop_info)
+        original_output = self.output
+        idx = 0
+        try:
+            while True:
+                self._charge()
+                try:
+                    condition_result = self._evaluate(node.test)
+                except Exception as e:
+                    self.output.append(f"Runtime Error (Condition): {e}")
+                    return
+                if not condition_result:
+                    break
+
+                replayed = not silent and (idx < MAX_REPLAYED_ITERATIONS or self._sampler is not None)
+                if replayed:
+                    self._iteration = idx
+                    self.output = []
+                elif not silent:
+                    # Past the snapshot window: keep running, print to the main output
+                    loop_info["iterationsTruncated"] = True
+                    self._iteration = -1
+                    self.output = original_output
+                if self.trace is not None:
+                    self.trace.begin(node, self._iteration)
+
+                broke = self._run_iteration(node.body, structures, index_operations, loop_info)
+
+                if replayed:
+                    loop_info["loopIterations"] = idx + 1
+                    if self.output:
+                        loop_info["iterationOutputs"][str(idx)] = list(self.output)
+                    self._capture_iteration(loop_info, idx)
+                idx += 1
+                if broke:
+                    return
+        finally:
+            self.output = original_output
+            if not silent:
+                self._iteration = -1
+                self._finish_sampling(loop_info)
+
+        for child in node.orelse:
+            self._process_node(child, structures, index_operations, loop_info, silent=silent)
+
+    def _begin_loop(self, loop_info):
+        """Start the result fields of a top-level loop. Only the last top-level
+        loop is visualized, so an earlier loop's iterations, outputs,
+        snapshots and sampling are dropped."""
+        loop_info.update({"hasLoop": True, "target": None, "iterator": None, "loopDependencies": [],
+                          "loopCarried": [], "loopIterations": 0, "iterationOutputs": {}})
+        for field in ("iterationsTruncated", "loopFrames", "keyframes"):
+            loop_info.pop(field, None)
+        if "iterationState" in loop_info:
+            loop_info["iterationState"].reset()
+        else:
+            loop_info["iterationState"] = self.snapshot_store()
+
+    def _new_sampler(self, loop_info):
+        """KeyframeSampler for a top-level loop, or None when not sampling."""
+        if self.max_frames is None:
+            return None
+        return KeyframeSampler(loop_info["iterationState"], self.max_frames)
+
+    def _capture_iteration(self, loop_info, idx):
+        """Snapshot the context as iteration `idx` (through the sampler, if any)."""
+        frame = apply_policy(self.context, self.watch, self.max_bytes)
+        if self._sampler is not None:
+            self._sampler.capture(idx, frame)
+        else:
+            loop_info["iterationState"].capture(idx, frame)
+
+    def _finish_sampling(self, loop_info):
+        if self._sampler is not None:
+            loop_info.update(self._sampler.metadata())
+            self._sampler = None
+
+    def _run_iteration(self, body, structures, index_operations, loop_info):
+        """Run one iteration of a loop body; returns True when it ended in `break`."""
+        try:
+            for child in body:
+                self._process_node(child, structures, index_operations, loop_info, silent=True)
+        except ContinueLoop:
+            pass
+        except BreakLoop:
+            return True
         return False
 
-    def _extract_indices(self, slice_node):
+    def _bind_target(self, target, value):
+        """Bind a loop/comprehension target (name or nested tuple) in the context."""
+        if isinstance(target, ast.Name):
+            self.context[target.id] = value
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            values = list(value)
+            if len(values) != len(target.elts):
+                raise ValueError(f"Cannot unpack {len(values)} values into {len(target.elts)} targets")
+            for elt, v in zip(target.elts, values):
+                self._bind_target(elt, v)
+        else:
+            raise ValueError(f"Unsupported target: {type(target)}")
+
+    def _extract_indices(self, slice_node, container=None):
         """Extract indices from a subscript slice node.
-        Returns a list of indices (single index returns [idx], slice returns [start, start+1, ..., end-1])
+        Returns (indices, ranges): a single index returns ([idx], []) with negative
+        list indices normalized, a slice returns ([], [[start, stop, step]]) resolved
+        against len(container) without materializing the covered indices.
         """
-        # Single index: lis[0]
-        if isinstance(slice_node, ast.Constant):
-            return [slice_node.value]
-        elif isinstance(slice_node, ast.Num):  # Python < 3.8
-            return [slice_node.n]
-        
-        # Slice: lis[0:2]
-        elif isinstance(slice_node, ast.Slice):
-            start = 0
-            stop = None
-            
-            if slice_node.lower:
-                start = self._evaluate(slice_node.lower)
-            if slice_node.upper:
-                stop = self._evaluate(slice_node.upper)
-            
-            # If stop is None, we can't determine range without knowing array length
-            # Return empty for now, frontend will need to handle
-            if stop is None:
-                return []
-            
-            return list(range(start, stop))
-        
-        # Try to evaluate as expression
-        try:
-            idx = self._evaluate(slice_node)
-            return [idx] if isinstance(idx, int) else []
-        except:
-            return []
+        # Slice: lis[0:2], lis[::-1], lis[a:]
+        if isinstance(slice_node, ast.Slice):
+            if not hasattr(container, '__len__'):
+                return [], []
+            return [], [list(self._evaluate_slice(slice_node).indices(len(container)))]
+
+        # Single index: lis[0], lis[i - 1], lis[-1], d["key"]
+        idx = self._evaluate(slice_node)
+        if isinstance(container, (list, tuple, str)) and type(idx) is int and idx < 0:
+            idx += len(container)
+        return [idx], []
+
+    def _evaluate_slice(self, slice_node):
+        """Evaluate an ast.Slice into a slice object."""
+        return slice(
+            self._evaluate(slice_node.lower) if slice_node.lower else None,
+            self._evaluate(slice_node.upper) if slice_node.upper else None,
+            self._evaluate(slice_node.step) if slice_node.step else None,
+        )
 
     def _get_formula(self, node):
         """Extract source code formula from AST node."""
@@ -425,199 +809,361 @@ class CodeParser:
         return "" # Fallback for older python (shouldn't happen in most envs)
 
     def _evaluate(self, node):
-        """Recursively evaluate AST nodes."""
-        # Literals
-        if isinstance(node, ast.Constant):
-            return node.value
-        elif isinstance(node, ast.Num): # Python < 3.8
-            return node.n
-        elif isinstance(node, ast.Str): # Python < 3.8
-            return node.s
-        
+        """Recursively evaluate AST nodes (one lookup in EVALUATORS per node)."""
+        evaluator = EVALUATORS.get(node.__class__)
+        if evaluator is None:
+            raise ValueError(f"Unsupported node type: {type(node)}")
+        if self.handler_counts is not None:
+            self.handler_counts[node.__class__.__name__] += 1
+        return evaluator(self, node)
+
+    # Literals and variables
+
+    def _evaluate_constant(self, node):
+        return node.value
+
+    def _evaluate_name(self, node):
         # Variables (Look up in context)
-        elif isinstance(node, ast.Name):
-            if node.id in self.context:
-                return self.context[node.id]
-            raise NameError(f"Name '{node.id}' is not defined")
-
-        # Containers
-        elif isinstance(node, ast.List):
-            return [self._evaluate(elt) for elt in node.elts]
-        elif isinstance(node, ast.Set):
-            return {self._evaluate(elt) for elt in node.elts}
-        elif isinstance(node, ast.Dict):
-            return {self._evaluate(k): self._evaluate(v) for k, v in zip(node.keys, node.values)}
-        elif isinstance(node, ast.Tuple):
-            return tuple(self._evaluate(elt) for elt in node.elts)
-
-        # Operations
-        elif isinstance(node, ast.BinOp):
-            left = self._evaluate(node.left)
-            right = self._evaluate(node.right)
-            op = node.op
-            
-            if isinstance(op, ast.Add): return left + right
-            elif isinstance(op, ast.Sub): return left - right
-            elif isinstance(op, ast.Mult): return left * right
-            elif isinstance(op, ast.Div): return left / right
-            elif isinstance(op, ast.FloorDiv): return left // right
-            elif isinstance(op, ast.Mod): return left % right
-            elif isinstance(op, ast.Pow): return left ** right
-            elif isinstance(op, ast.BitXor): return left ^ right # Python uses ^ for XOR
-        
-        elif isinstance(node, ast.UnaryOp):
-            operand = self._evaluate(node.operand)
-            op = node.op
-            if isinstance(op, ast.USub): return -operand
-            elif isinstance(op, ast.UAdd): return +operand
-            elif isinstance(op, ast.Not): return not operand
-        
-        # Comparison Operations (e.g., x < 5, y == 10)
-        elif isinstance(node, ast.Compare):
-            left = self._evaluate(node.left)
-            for op, comparator in zip(node.ops, node.comparators):
-                right = self._evaluate(comparator)
-                if isinstance(op, ast.Lt): result = left < right
-                elif isinstance(op, ast.LtE): result = left <= right
-                elif isinstance(op, ast.Gt): result = left > right
-                elif isinstance(op, ast.GtE): result = left >= right
-                elif isinstance(op, ast.Eq): result = left == right
-                elif isinstance(op, ast.NotEq): result = left != right
-                elif isinstance(op, ast.In): result = left in right
-                elif isinstance(op, ast.NotIn): result = left not in right
-                else:
-                    raise ValueError(f"Unsupported comparison operator: {type(op)}")
-                if not result:
-                    return False
-                left = right  # Chain comparisons (e.g., 1 < x < 10)
-            return result
-        
-        # Boolean Operations (e.g., x and y, a or b)
-        elif isinstance(node, ast.BoolOp):
-            if isinstance(node.op, ast.And):
-                return all(self._evaluate(val) for val in node.values)
-            elif isinstance(node.op, ast.Or):
-                return any(self._evaluate(val) for val in node.values)
-        
-        # Function Calls (e.g., len(arr), max(arr))
-        elif isinstance(node, ast.Call):
-            return self._evaluate_function_call(node)
-        
-        # Subscript (e.g., lis[0] or lis[0:2])
-        elif isinstance(node, ast.Subscript):
-            value = self._evaluate(node.value)
-            if isinstance(value, (list, tuple, str, dict)):
-                # Single index
-                if isinstance(node.slice, (ast.Constant, ast.Num)):
-                    idx = self._evaluate(node.slice)
-                    return value[idx]
-                # Slice
-                elif isinstance(node.slice, ast.Slice):
-                    start = self._evaluate(node.slice.lower) if node.slice.lower else None
-                    stop = self._evaluate(node.slice.upper) if node.slice.upper else None
-                    step = self._evaluate(node.slice.step) if node.slice.step else None
-                    return value[start:stop:step]
-                # Expression as index
+        if node.id in self.context:
+            return self.context[node.id]
+        if node.id in CALLABLE_BUILTINS:
+            return CALLABLE_BUILTINS[node.id]
+        raise NameError(f"Name '{node.id}' is not defined")
+
+    # Containers
+
+    def _evaluate_list(self, node):
+        return [self._evaluate(elt) for elt in node.elts]
+
+    def _evaluate_set(self, node):
+        return {self._evaluate(elt) for elt in node.elts}
+
+    def _evaluate_dict(self, node):
+        return {self._evaluate(k): self._evaluate(v) for k, v in zip(node.keys, node.values)}
+
+    def _evaluate_tuple(self, node):
+        return tuple(self._evaluate(elt) for elt in node.elts)
+
+    # Operations
+
+    def _evaluate_binop(self, node):
+        left = self._evaluate(node.left)
+        right = self._evaluate(node.right)
+        return self._binary_op(node.op, left, right)
+
+    def _evaluate_unaryop(self, node):
+        func = UNARY_OPS.get(node.op.__class__)
+        if func is None:
+            raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
+        if self.handler_counts is not None:
+            self.handler_counts[node.op.__class__.__name__] += 1
+        return func(self._evaluate(node.operand))
+
+    def _evaluate_compare(self, node):
+        """Comparison Operations (e.g., x < 5, y == 10), chained like 1 < x < 10."""
+        left = self._evaluate(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            func = COMPARE_OPS.get(op.__class__)
+            if func is None:
+                raise ValueError(f"Unsupported comparison operator: {type(op)}")
+            if self.handler_counts is not None:
+                self.handler_counts[op.__class__.__name__] += 1
+            right = self._evaluate(comparator)
+            if not func(left, right):
+                return False
+            left = right
+        return True
+
+    def _evaluate_boolop(self, node):
+        """Boolean Operations (e.g., x and y, a or b)."""
+        if isinstance(node.op, ast.And):
+            return all(self._evaluate(val) for val in node.values)
+        return any(self._evaluate(val) for val in node.values)
+
+    def _evaluate_attribute(self, node):
+        """Attributes of user-defined objects (e.g., node.next.val)."""
+        obj = self._evaluate(node.value)
+        if type(obj) is UserObject:
+            return obj.get(node.attr)
+        raise ValueError(f"Unsupported attribute access: {node.attr} on {type(obj)}")
+
+    def _evaluate_subscript(self, node):
+        """Subscript (e.g., lis[0] or lis[0:2])."""
+        value = self._evaluate(node.value)
+        if not isinstance(value, (list, tuple, str, dict, range)):
+            raise ValueError(f"Unsupported node type: {type(node)}")
+        if isinstance(node.slice, ast.Slice):
+            slc = self._evaluate_slice(node.slice)
+            if self.trace is not None and isinstance(node.value, ast.Name):
+                self.trace.touch(node.value.id, range(*slc.indices(len(value))))
+            return value[slc]
+        # Single index or expression as index
+        idx = self._evaluate(node.slice)
+        if self.trace is not None and isinstance(node.value, ast.Name):
+            self.trace.touch(node.value.id, idx)
+        return value[idx]
+
+    def _binary_op(self, op, left, right, inplace=False):
+        """Apply a binary operator. With inplace=True (augmented assignment),
+        lists, sets and dicts are updated in place like CPython does."""
+        op_type = op.__class__
+        # Charge sequence building before allocating it
+        if op_type is ast.Add and isinstance(left, (list, str, tuple)):
+            # Concatenation copies both sides, except list += which only appends
+            # (so repeated s += ch costs quadratic steps, as it does in time)
+            grown = len(right) if hasattr(right, '__len__') else 0
+            copied = grown if inplace and isinstance(left, list) else len(left) + grown
+            # Characters are copied as bytes: charged per 64, like shifted bits
+            self._charge(copied // 64 if isinstance(left, str) else copied)
+        elif op_type is ast.Mult:
+            if isinstance(left, int) and isinstance(right, int):
+                # Result has up to bits(left) + bits(right) bits, and multiplying
+                # large operands costs about the product of their 64-bit word counts
+                left_words, right_words = left.bit_length() // 64, right.bit_length() // 64
+                self._charge(left_words + right_words + left_words * right_words)
+            elif isinstance(left, (list, str, tuple)) and isinstance(right, int):
+                # Sequence repetition (e.g., [0] * n); a negative count builds an empty sequence
+                size = max(0, len(left) * right)
+                self._charge(size // 64 if isinstance(left, str) else size)
+            elif isinstance(right, (list, str, tuple)) and isinstance(left, int):
+                size = max(0, len(right) * left)
+                self._charge(size // 64 if isinstance(right, str) else size)
+        elif op_type is ast.LShift and isinstance(right, int) and right > 0:
+            self._charge(right // 64)  # Result grows by `right` bits
+        elif op_type is ast.Pow and isinstance(left, int) and isinstance(right, int) and right > 0:
+            self._charge(right * left.bit_length() // 64)  # Result has up to right * bits(left) bits
+
+        if self.handler_counts is not None:
+            self.handler_counts[op_type.__name__] += 1
+        if inplace and isinstance(left, (list, set, dict)) and op_type in INPLACE_OPS:
+            return INPLACE_OPS[op_type](left, right)
+        func = BINARY_OPS.get(op_type)
+        if func is None:
+            raise ValueError(f"Unsupported operator: {op_type.__name__}")
+        return func(left, right)
+
+    @contextlib.contextmanager
+    def _local_names(self, names):
+        """Restore `names` in the context on exit (comprehension targets, lambda parameters)."""
+        missing = object()
+        saved = {name: self.context.get(name, missing) for name in names}
+        try:
+            yield
+        finally:
+            for name, value in saved.items():
+                if value is missing:
+                    self.context.pop(name, None)
                 else:
-                    idx = self._evaluate(node.slice)
-                    return value[idx]
+                    self.context[name] = value
+
+    def _evaluate_list_comp(self, node):
+        """Evaluate a list comprehension; its target names do not leak into the context."""
+        bound = {n.id for gen in node.generators for n in ast.walk(gen.target) if isinstance(n, ast.Name)}
+        result = []
+
+        def run(gen_index):
+            if gen_index == len(node.generators):
+                self._charge()
+                result.append(self._evaluate(node.elt))
+                return
+            gen = node.generators[gen_index]
+            for val in self._evaluate(gen.iter):
+                self._bind_target(gen.target, val)
+                if all(self._evaluate(cond) for cond in gen.ifs):
+                    run(gen_index + 1)
+
+        with self._local_names(bound):
+            run(0)
+        return result
+
+    def _make_lambda(self, node):
+        """A callable evaluating the lambda body in the interpreter; its parameters
+        are bound only for the duration of the call."""
+        arguments = node.args
+        if arguments.vararg or arguments.kwarg or arguments.kwonlyargs:
+            raise ValueError("Unsupported lambda signature")
+        params = [arg.arg for arg in arguments.posonlyargs + arguments.args]
+        defaults = [self._evaluate(default) for default in arguments.defaults]
+
+        def call(*values, **kwargs):
+            bound = self._bind_arguments('<lambda>()', params, defaults, values, kwargs)
+            self._charge()
+            with self._local_names(params):
+                self.context.update(bound)
+                return self._evaluate(node.body)
+
+        call.__name__ = call.__qualname__ = '<lambda>'
+        return call
+
+    def _bind_arguments(self, name, params, defaults, args, kwargs):
+        """Map call arguments to parameter names like Python does; `defaults` fill the last parameters."""
+        if len(args) > len(params):
+            raise TypeError(f"{name} takes {len(params)} arguments but {len(args)} were given")
+        bound = dict(zip(params, args))
+        for key, value in kwargs.items():
+            if key not in params:
+                raise TypeError(f"{name} got an unexpected keyword argument '{key}'")
+            if key in bound:
+                raise TypeError(f"{name} got multiple values for argument '{key}'")
+            bound[key] = value
+        first_default = len(params) - len(defaults)
+        for i, param in enumerate(params):
+            if param not in bound:
+                if i < first_default:
+                    raise TypeError(f"{name} missing required argument: '{param}'")
+                bound[param] = defaults[i - first_default]
+        return bound
+
+    def _define_class(self, node):
+        """Bind a class statement: its constants and its __init__ (other methods are not supported)."""
+        if node.bases or node.keywords:
+            raise ValueError("Unsupported base classes")
+        init, defaults, attributes, local = None, (), {}, ()
+        for stmt in node.body:
+            if isinstance(stmt, ast.FunctionDef) and stmt.name == '__init__':
+                arguments = stmt.args
+                if arguments.vararg or arguments.kwarg or arguments.kwonlyargs or arguments.posonlyargs:
+                    raise ValueError("Unsupported __init__ signature")
+                init = stmt
+                defaults = [self._evaluate(default) for default in arguments.defaults]
+                local = {arg.arg for arg in arguments.args}
+                local |= {n.id for n in ast.walk(stmt) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)}
+            elif isinstance(stmt, ast.Assign) and all(isinstance(t, ast.Name) for t in stmt.targets):
+                value = self._evaluate(stmt.value)
+                for target in stmt.targets:
+                    attributes[target.id] = value
+        self.context[node.name] = UserClass(node.name, init, defaults, attributes, local)
+        if self.trace is not None:
+            self.trace.write(node.name)
+
+    def _instantiate(self, cls, args, kwargs):
+        """Create an instance of `cls`, running its __init__ with self and the
+        arguments bound as locals (restored afterwards, like lambda parameters)."""
+        self._charge()
+        obj = self.heap.new(cls)
+        if cls.init is None:
+            if args or kwargs:
+                raise TypeError(f"{cls.name}() takes no arguments")
+            return obj
+        params = [arg.arg for arg in cls.init.args.args]
+        if not params:
+            raise TypeError(f"{cls.name}.__init__() takes no self argument")
+        bound = self._bind_arguments(f"{cls.name}()", params[1:], cls.defaults, args, kwargs)
+        with self._local_names(cls.locals):
+            self.context[params[0]] = obj
+            self.context.update(bound)
+            for stmt in cls.init.body:
+                self._process_node(stmt, [], [], {}, silent=True)
+        return obj
+
+    def _assign_attribute(self, target, value, structures, silent, obj=None):
+        """Set target.attr = value on a user-defined object and redraw the
+        variables holding objects (a write through cur also changes head)."""
+        if obj is None:
+            obj = self._evaluate(target.value)
+        if type(obj) is not UserObject:
+            raise ValueError(f"Unsupported attribute assignment: {target.attr} on {type(obj)}")
+        obj.set(target.attr, value)
 
-        raise ValueError(f"Unsupported node type: {type(node)}")
+        root = target.value
+        while isinstance(root, (ast.Attribute, ast.Subscript)):
+            root = root.value
+        if self.trace is not None and isinstance(root, ast.Name):
+            self.trace.write(root.id)
+        if not silent:
+            for name, held in self.context.items():
+                if type(held) is UserObject:
+                    type_str, data = self._structure_for(held)
+                    self._add_or_update(structures, name, type_str, data)
+
+    def _evaluate_keywords(self, node):
+        """Evaluate the keyword arguments of a call."""
+        kwargs = {}
+        for keyword in node.keywords:
+            if keyword.arg is None:
+                raise ValueError("Unsupported argument unpacking: **")
+            kwargs[keyword.arg] = self._evaluate(keyword.value)
+        return kwargs
+
+    def _metered(self, iterator):
+        """Lazily yield from a builtin iterator (zip, map, ...), charging each item."""
+        for item in iterator:
+            self._charge()
+            yield item
+
+    def _charged(self, iterable):
+        """Charge consuming a sized iterable up front; lazy ones are metered per item."""
+        if hasattr(iterable, '__len__'):
+            self._charge(len(iterable))
+        return iterable
 
     def _evaluate_function_call(self, node):
-        """Evaluate built-in function calls and method calls."""
+        """Evaluate built-in function calls and method calls (see dispatch.BUILTINS and dispatch.METHODS)."""
         # Built-in functions (e.g., len(arr), max(arr))
         if isinstance(node.func, ast.Name):
             func_name = node.func.id
             
             # Evaluate arguments
             args = [self._evaluate(arg) for arg in node.args]
-            
-            # Built-in functions
-            if func_name == 'len':
-                return len(args[0]) if args else 0
-            elif func_name == 'max':
-                return max(args[0]) if len(args) == 1 and isinstance(args[0], (list, tuple)) else max(args)
-            elif func_name == 'min':
-                return min(args[0]) if len(args) == 1 and isinstance(args[0], (list, tuple)) else min(args)
-            elif func_name == 'sum':
-                return sum(args[0]) if args else 0
-            elif func_name == 'abs':
-                return abs(args[0]) if args else 0
-            elif func_name == 'int':
-                return int(args[0]) if args else 0
-            elif func_name == 'str':
-                return str(args[0]) if args else ""
-            elif func_name == 'float':
-                return float(args[0]) if args else 0.0
-            elif func_name == 'range':
-                return list(range(*args))
-            elif func_name == 'enumerate':
-                # enumerate(iterable, start=0)
-                iterable = args[0] if args else []
-                start = args[1] if len(args) > 1 else 0
-                return list(enumerate(iterable, start=start))
-            elif func_name == 'sorted':
-                return sorted(args[0]) if args else []
-            elif func_name == 'reversed':
-                return list(reversed(args[0])) if args else []
-            else:
+            kwargs = self._evaluate_keywords(node) if node.keywords else {}
+
+            # Classes and lambdas bound to a name (square = lambda x: x * x) shadow builtins
+            func = self.context.get(func_name)
+            if type(func) is UserClass:
+                return self._instantiate(func, args, kwargs)
+            if callable(func):
+                return func(*args, **kwargs)
+
+            entry = BUILTINS.get(func_name)
+            if entry is None:
                 raise ValueError(f"Unsupported function: {func_name}")
+            handler, keywords = entry
+            if kwargs and not keywords.issuperset(kwargs):
+                unexpected = ', '.join(sorted(set(kwargs) - keywords))
+                raise ValueError(f"Unsupported keyword argument for {func_name}(): {unexpected}")
+            if self.handler_counts is not None:
+                self.handler_counts[f"{func_name}()"] += 1
+            return handler(self, args, kwargs)
         
         # Method calls (e.g., arr.append(5), s.split())
         elif isinstance(node.func, ast.Attribute):
             obj = self._evaluate(node.func.value)
             method_name = node.func.attr
             args = [self._evaluate(arg) for arg in node.args]
-            
-            # List methods
-            if method_name == 'append' and isinstance(obj, list):
-                obj.append(args[0] if args else None)
-                return obj
-            elif method_name == 'pop' and isinstance(obj, list):
-                return obj.pop(args[0] if args else -1)
-            elif method_name == 'remove' and isinstance(obj, list):
-                obj.remove(args[0])
-                return obj
-            elif method_name == 'insert' and isinstance(obj, list) and len(args) >= 2:
-                obj.insert(args[0], args[1])
-                return obj
-            elif method_name == 'reverse' and isinstance(obj, list):
-                obj.reverse()
-                return obj
-            elif method_name == 'sort' and isinstance(obj, list):
-                obj.sort()
-                return obj
-            
-            # String methods
-            elif method_name == 'split' and isinstance(obj, str):
-                return obj.split(args[0] if args else None)
-            elif method_name == 'join' and isinstance(obj, str):
-                return obj.join(args[0]) if args else ""
-            elif method_name == 'replace' and isinstance(obj, str) and len(args) >= 2:
-                return obj.replace(args[0], args[1])
-            elif method_name == 'strip' and isinstance(obj, str):
-                return obj.strip()
-            elif method_name == 'lower' and isinstance(obj, str):
-                return obj.lower()
-            elif method_name == 'upper' and isinstance(obj, str):
-                return obj.upper()
-            
-            # Dictionary methods
-            elif method_name == 'get' and isinstance(obj, dict):
-                return obj.get(args[0], args[1] if len(args) > 1 else None)
-            elif method_name == 'keys' and isinstance(obj, dict):
-                return list(obj.keys())
-            elif method_name == 'values' and isinstance(obj, dict):
-                return list(obj.values())
-            elif method_name == 'items' and isinstance(obj, dict):
-                return list(obj.items())
-            
-            else:
+            kwargs = self._evaluate_keywords(node) if node.keywords else {}
+
+            entry = METHODS.lookup(obj, method_name)
+            if entry is None:
                 raise ValueError(f"Unsupported method: {method_name} on {type(obj)}")
+            handler, keywords = entry
+            if kwargs and not keywords.issuperset(kwargs):
+                unexpected = ', '.join(sorted(set(kwargs) - keywords))
+                raise ValueError(f"Unsupported keyword argument for {method_name}(): {unexpected}")
+            if self.handler_counts is not None:
+                self.handler_counts[f"{type(obj).__name__}.{method_name}"] += 1
+            return handler(self, obj, args, kwargs)
         
         raise ValueError(f"Unsupported function call: {ast.unparse(node) if hasattr(ast, 'unparse') else 'unknown'}")
 
+    def _structure_for(self, value):
+        """Return (type_str, data) for the frontend, or (None, None) if not visualizable."""
+        if isinstance(value, list):
+            # List of rows (e.g., a DP table) -> matrix; copy rows so later writes don't alias
+            if value and all(isinstance(row, list) for row in value):
+                return 'matrix', [list(row) for row in value]
+            return 'array', list(value)
+        elif isinstance(value, set):
+            return 'set', list(value)
+        elif isinstance(value, dict):
+            # Format for frontend: [{"key": k, "value": v}]
+            return 'dictionary', [{"key": str(k), "value": str(v)} for k, v in value.items()]
+        elif isinstance(value, (int, float, str, bool)):
+            return 'variable', value
+        elif type(value) is UserObject:
+            # Nodes reachable from the object, each listed once (a cycle ends the walk)
+            return 'linked', [node_label(obj) for obj in reachable(value)]
+        return None, None
+
     def _add_or_update(self, structures, name, type_str, data):
         for s in structures:
             if s['name'] == name:
@@ -627,6 +1173,38 @@ class CodeParser:
         structures.append({"name": name, "type": type_str, "data": data})
 
 
+def range_structure(r, iterations, sampled):
+    """(type, data) of the synthetic range_<i> structure of a loop over range `r`.
+
+    Lists the values of the first `iterations` iterations, except for sampled
+    loops (which may run millions of iterations): those send the range as
+    [start, stop, step] and the Visualizer computes the value of a frame.
+    """
+    if sampled:
+        return 'range', [r.start, r.stop, r.step]
+    return 'array', list(r[:iterations])
+
+
+# AST node type -> CodeParser evaluator (see CodeParser._evaluate)
+EVALUATORS = {
+    ast.Constant: CodeParser._evaluate_constant,
+    ast.Name: CodeParser._evaluate_name,
+    ast.List: CodeParser._evaluate_list,
+    ast.Set: CodeParser._evaluate_set,
+    ast.Dict: CodeParser._evaluate_dict,
+    ast.Tuple: CodeParser._evaluate_tuple,
+    ast.ListComp: CodeParser._evaluate_list_comp,
+    ast.Lambda: CodeParser._make_lambda,
+    ast.BinOp: CodeParser._evaluate_binop,
+    ast.UnaryOp: CodeParser._evaluate_unaryop,
+    ast.Compare: CodeParser._evaluate_compare,
+    ast.BoolOp: CodeParser._evaluate_boolop,
+    ast.Call: CodeParser._evaluate_function_call,
+    ast.Attribute: CodeParser._evaluate_attribute,
+    ast.Subscript: CodeParser._evaluate_subscript,
+}
+
+
 def run_tests():
     """
     Comprehensive test suite for the CodeParser.
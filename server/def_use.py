@@ -0,0 +1,281 @@
+import ast
+from collections import namedtuple
+
+# List/set/dict methods that modify their receiver (arr.append(x) writes arr)
+MUTATING_METHODS = {
+    'append', 'extend', 'insert', 'pop', 'remove', 'reverse', 'sort', 'clear',
+    'add', 'discard', 'update', 'popitem', 'setdefault',
+}
+
+# Variables a statement reads and writes. `binds` are the written names that
+# are rebound (x = ...); the rest are mutated in place (x[i] = ..., x.append(...)).
+# For compound statements only the header counts (the test of an if/while,
+# the target and iterable of a for), their bodies are separate statements.
+Access = namedtuple('Access', 'reads writes binds')
+
+# A name assigned in a loop body and the expression it is assigned
+# (`total += num` gives value/formula `total + num`).
+Dependency = namedtuple('Dependency', 'name formula value reads line')
+
+# Per-loop summary: `assignments` are the Dependency entries of the body
+# (including inside if blocks, excluding nested loops), `written` every name
+# the loop writes (header included) and `carried` the loop-carried names,
+# i.e. read in an iteration before that iteration assigns them.
+LoopSummary = namedtuple('LoopSummary', 'assignments written carried')
+
+# What a block does to reaching definitions: `gen` the statements it adds per
+# name, `kill` the names it rebinds on every path (their earlier definitions
+# no longer reach past it).
+Transfer = namedtuple('Transfer', 'gen kill')
+
+
+class DefUse:
+    """
+    Static def-use analysis of a parsed program, computed once per parse.
+
+    Records which variables every statement reads and writes and a summary
+    per loop, so the interpreter does not have to re-walk subtrees while it
+    runs. The def-use edges between statements (reaching definitions,
+    following if branches and loop back edges) are only computed on first use.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.access = {}    # statement -> Access
+        self.loops = {}     # For/While node -> LoopSummary
+        self._edges = None
+        self._transfers = {}  # For/While node -> Transfer of one iteration (header and body)
+        self._analyze(tree.body)
+
+    @property
+    def edges(self):
+        """(defining statement, using statement, name) triples."""
+        if self._edges is None:
+            self._edges = set()
+            self._flow(self.tree.body, {})
+        return self._edges
+
+    def uses(self, stmt):
+        """Statements whose definitions `stmt` may read, as (statement, name) pairs."""
+        return {(d, name) for d, u, name in self.edges if u is stmt}
+
+    def _analyze(self, body):
+        for stmt in body:
+            access = self._statement_access(stmt)
+            if isinstance(stmt, (ast.If, ast.For, ast.While)):
+                # Inner loops are summarized before the loops around them
+                self._analyze(stmt.body)
+                self._analyze(stmt.orelse)
+            if isinstance(stmt, (ast.For, ast.While)):
+                self.loops[stmt] = self._summarize(stmt, access)
+
+    # Per-statement access sets
+
+    def _statement_access(self, stmt):
+        reads, writes, binds = set(), set(), set()
+        if isinstance(stmt, (ast.If, ast.While)):
+            parts = [stmt.test]
+        elif isinstance(stmt, ast.For):
+            parts = [stmt.iter, stmt.target]
+        elif isinstance(stmt, (ast.FunctionDef, ast.ClassDef)):
+            parts = []
+            writes.add(stmt.name)
+            binds.add(stmt.name)
+        else:
+            parts = [stmt]
+        for part in parts:
+            _collect(part, reads, writes, binds, frozenset())
+        if isinstance(stmt, ast.AugAssign):
+            reads |= writes  # x += 1 reads x first
+        access = Access(frozenset(reads), frozenset(writes), frozenset(binds))
+        self.access[stmt] = access
+        return access
+
+    # Reaching definitions
+
+    def _flow(self, body, defs):
+        """Propagate reaching definitions ({name: frozenset of statements}) through `body`."""
+        for stmt in body:
+            access = self.access[stmt]
+            self._link(stmt, access, defs)
+            if isinstance(stmt, ast.If):
+                taken = self._flow(stmt.body, dict(defs))
+                defs = _merge(taken, self._flow(stmt.orelse, dict(defs)))
+            elif isinstance(stmt, (ast.For, ast.While)):
+                defs = self._flow_loop(stmt, access, defs)
+            else:
+                defs = _define(stmt, access, defs)
+        return defs
+
+    def _flow_loop(self, loop, access, entry):
+        # Definitions only ever add or replace, so one iteration already
+        # brings every definition that can flow around the back edge (a
+        # second one adds nothing). The head gets them from the cached
+        # transfer of an iteration and the body is walked once, instead of
+        # walking it (and every loop inside it) until the result is stable.
+        start = _merge(entry, _apply(self._iteration(loop), entry))
+        self._link(loop, access, start)
+        back = self._flow(loop.body, _define(loop, access, start))
+        exit_defs = _merge(_define(loop, access, entry), back)
+        return self._flow(loop.orelse, exit_defs)
+
+    def _link(self, stmt, access, defs):
+        for name in access.reads:
+            for definition in defs.get(name, ()):
+                self._edges.add((definition, stmt, name))
+
+    # Transfers: what a block does to the reaching definitions, without walking it again
+
+    def _iteration(self, loop):
+        """Transfer of one loop iteration (the header, then the body), cached per loop."""
+        transfer = self._transfers.get(loop)
+        if transfer is None:
+            transfer = _then(_statement_transfer(loop, self.access[loop]), self._block_transfer(loop.body))
+            self._transfers[loop] = transfer
+        return transfer
+
+    def _block_transfer(self, body):
+        transfer = Transfer({}, frozenset())
+        for stmt in body:
+            access = self.access[stmt]
+            if isinstance(stmt, ast.If):
+                step = _either(self._block_transfer(stmt.body), self._block_transfer(stmt.orelse))
+            elif isinstance(stmt, (ast.For, ast.While)):
+                # The body may run no times: either just the header or some iterations
+                step = _either(_statement_transfer(stmt, access), self._iteration(stmt))
+                step = _then(step, self._block_transfer(stmt.orelse))
+            else:
+                step = _statement_transfer(stmt, access)
+            transfer = _then(transfer, step)
+        return transfer
+
+    # Loop summaries
+
+    def _summarize(self, loop, header):
+        assignments = []
+        written = set(header.writes)
+        carried = set()
+        self._scan_body(loop.body, header.writes, assignments, written, carried)
+        # Only names the loop writes can carry a value between iterations
+        carried &= written
+        return LoopSummary(tuple(assignments), frozenset(written), frozenset(carried))
+
+    def _scan_body(self, body, defined, assignments, written, carried):
+        """Walk a loop body in order; returns the names definitely assigned by its end."""
+        defined = set(defined)
+        for stmt in body:
+            access = self.access[stmt]
+            carried |= access.reads - defined
+            written |= access.writes
+            if isinstance(stmt, ast.If):
+                taken = self._scan_body(stmt.body, defined, assignments, written, carried)
+                other = self._scan_body(stmt.orelse, defined, assignments, written, carried)
+                defined |= taken & other
+            elif isinstance(stmt, (ast.For, ast.While)):
+                # Nested loops have their own summary; here they count as one statement
+                written |= self.loops[stmt].written
+                nested_reads = set()
+                for child in ast.walk(stmt):
+                    if child in self.access:
+                        nested_reads |= self.access[child].reads
+                carried |= nested_reads - defined
+            else:
+                dependency = _dependency(stmt, access)
+                if dependency is not None:
+                    assignments.append(dependency)
+                defined |= access.binds
+        return defined
+
+
+def _collect(node, reads, writes, binds, bound):
+    """Add the variable names `node` reads/writes; names in `bound` are comprehension-local."""
+    if isinstance(node, ast.Name):
+        if node.id not in bound:
+            if isinstance(node.ctx, (ast.Store, ast.Del)):
+                writes.add(node.id)
+                binds.add(node.id)
+            else:
+                reads.add(node.id)
+        return
+    if isinstance(node, (ast.Subscript, ast.Attribute)) and isinstance(node.ctx, (ast.Store, ast.Del)):
+        root = _root_name(node)
+        if root is not None and root not in bound:
+            writes.add(root)  # lis[i] = v mutates lis
+    elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr in MUTATING_METHODS):
+        root = _root_name(node.func.value)
+        if root is not None and root not in bound:
+            writes.add(root)
+    elif isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+        inner = bound | {n.id for gen in node.generators for n in ast.walk(gen.target) if isinstance(n, ast.Name)}
+        for gen in node.generators:
+            _collect(gen.iter, reads, writes, binds, inner)
+            for cond in gen.ifs:
+                _collect(cond, reads, writes, binds, inner)
+        for elt in ([node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]):
+            _collect(elt, reads, writes, binds, inner)
+        return
+    elif isinstance(node, ast.Lambda):
+        bound = bound | {arg.arg for arg in node.args.args}
+    for child in ast.iter_child_nodes(node):
+        _collect(child, reads, writes, binds, bound)
+
+
+def _root_name(node):
+    while isinstance(node, (ast.Subscript, ast.Attribute)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def _define(stmt, access, defs):
+    """Definitions after `stmt`: rebinding kills earlier definitions, mutation adds to them."""
+    if not access.writes:
+        return defs
+    defs = dict(defs)
+    for name in access.writes:
+        if name in access.binds:
+            defs[name] = frozenset([stmt])
+        else:
+            defs[name] = defs.get(name, frozenset()) | {stmt}
+    return defs
+
+
+def _statement_transfer(stmt, access):
+    return Transfer({name: frozenset([stmt]) for name in access.writes}, access.binds)
+
+
+def _then(first, second):
+    """Transfer of `first` followed by `second`."""
+    gen = dict(first.gen)
+    for name, stmts in second.gen.items():
+        gen[name] = stmts if name in second.kill else gen.get(name, frozenset()) | stmts
+    return Transfer(gen, first.kill | second.kill)
+
+
+def _either(a, b):
+    """Transfer of taking one of two paths."""
+    return Transfer(_merge(a.gen, b.gen), a.kill & b.kill)
+
+
+def _apply(transfer, defs):
+    defs = dict(defs)
+    for name, stmts in transfer.gen.items():
+        defs[name] = stmts if name in transfer.kill else defs.get(name, frozenset()) | stmts
+    return defs
+
+
+def _merge(a, b):
+    merged = dict(a)
+    for name, stmts in b.items():
+        merged[name] = merged.get(name, frozenset()) | stmts
+    return merged
+
+
+def _dependency(stmt, access):
+    """Dependency for `name = expr` / `name op= expr`, else None."""
+    if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name):
+        return Dependency(stmt.targets[0].id, ast.unparse(stmt.value), stmt.value, access.reads, stmt.lineno)
+    if isinstance(stmt, ast.AugAssign) and isinstance(stmt.target, ast.Name):
+        expr = ast.BinOp(ast.Name(stmt.target.id, ast.Load()), stmt.op, stmt.value)
+        return Dependency(stmt.target.id, ast.unparse(expr), expr, access.reads, stmt.lineno)
+    return None
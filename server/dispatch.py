@@ -0,0 +1,305 @@
+"""
+Dispatch tables for CodeParser: operators, builtins and methods.
+
+Operators are looked up by AST node type, builtins by name and methods by
+(receiver type, method name), so evaluating a node costs one dict lookup
+instead of a cascade of isinstance/== checks. New builtins and methods plug
+in with the register decorators:
+
+    @BUILTINS.register('divmod')
+    def _divmod(parser, args, kwargs):
+        return divmod(*args)
+
+Handlers receive the running CodeParser (for its budget helpers such as
+_charged and _metered) and the evaluated arguments. With
+CodeParser(count_handlers=True), parser.handler_counts counts the calls of
+every handler (and evaluated node type) for profiling.
+"""
+import ast
+import operator
+
+BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.BitXor: operator.xor,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.LShift: operator.lshift,
+    ast.RShift: operator.rshift,
+}
+
+# In-place operators applied to mutable targets of augmented assignment
+# (res += [x] extends res instead of building a new list)
+INPLACE_OPS = {
+    ast.Add: operator.iadd,
+    ast.Sub: operator.isub,
+    ast.Mult: operator.imul,
+    ast.BitOr: operator.ior,
+    ast.BitAnd: operator.iand,
+    ast.BitXor: operator.ixor,
+}
+
+UNARY_OPS = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+    ast.Not: operator.not_,
+    ast.Invert: operator.invert,
+}
+
+COMPARE_OPS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.In: lambda left, right: left in right,
+    ast.NotIn: lambda left, right: left not in right,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+}
+
+
+class Registry:
+    """Handlers by key, each with the keyword arguments it accepts."""
+
+    def __init__(self):
+        self.handlers = {}  # key -> (handler, accepted keywords)
+
+    def register(self, key, keywords=()):
+        """Decorator registering `handler` for `key` (replacing any previous one)."""
+        def decorator(handler):
+            self.handlers[key] = (handler, frozenset(keywords))
+            return handler
+        return decorator
+
+    def get(self, key):
+        return self.handlers.get(key)
+
+    def __contains__(self, key):
+        return key in self.handlers
+
+
+class MethodRegistry(Registry):
+    """Methods keyed by (receiver type, name); subclasses inherit their bases' methods."""
+
+    def lookup(self, obj, name):
+        entry = self.handlers.get((type(obj), name))
+        if entry is None:
+            for base in type(obj).__mro__[1:]:
+                entry = self.handlers.get((base, name))
+                if entry is not None:
+                    break
+        return entry
+
+
+BUILTINS = Registry()   # name -> handler(parser, args, kwargs)
+METHODS = MethodRegistry()  # (type, name) -> handler(parser, obj, args, kwargs)
+
+
+# Builtins
+
+@BUILTINS.register('len')
+def _len(parser, args, kwargs):
+    return len(args[0]) if args else 0
+
+
+@BUILTINS.register('max', keywords=('key', 'default'))
+def _max(parser, args, kwargs):
+    return max(parser._charged(args[0]), **kwargs) if len(args) == 1 else max(*args, **kwargs)
+
+
+@BUILTINS.register('min', keywords=('key', 'default'))
+def _min(parser, args, kwargs):
+    return min(parser._charged(args[0]), **kwargs) if len(args) == 1 else min(*args, **kwargs)
+
+
+@BUILTINS.register('sum')
+def _sum(parser, args, kwargs):
+    return sum(parser._charged(args[0]), *args[1:]) if args else 0
+
+
+@BUILTINS.register('abs')
+def _abs(parser, args, kwargs):
+    return abs(args[0]) if args else 0
+
+
+@BUILTINS.register('int')
+def _int(parser, args, kwargs):
+    return int(args[0]) if args else 0
+
+
+@BUILTINS.register('str')
+def _str(parser, args, kwargs):
+    return str(args[0]) if args else ""
+
+
+@BUILTINS.register('float')
+def _float(parser, args, kwargs):
+    return float(args[0]) if args else 0.0
+
+
+@BUILTINS.register('range')
+def _range(parser, args, kwargs):
+    return range(*args)
+
+
+# Lazy iterators: nothing is materialized until consumed
+
+@BUILTINS.register('enumerate', keywords=('start',))
+def _enumerate(parser, args, kwargs):
+    iterable = args[0] if args else []
+    start = args[1] if len(args) > 1 else kwargs.get('start', 0)
+    return parser._metered(enumerate(iterable, start=start))
+
+
+@BUILTINS.register('reversed')
+def _reversed(parser, args, kwargs):
+    return parser._metered(reversed(args[0])) if args else iter(())
+
+
+@BUILTINS.register('zip')
+def _zip(parser, args, kwargs):
+    return parser._metered(zip(*args))
+
+
+@BUILTINS.register('map')
+def _map(parser, args, kwargs):
+    return parser._metered(map(*args))
+
+
+@BUILTINS.register('filter')
+def _filter(parser, args, kwargs):
+    return parser._metered(filter(*args))
+
+
+# Consumers
+
+@BUILTINS.register('any')
+def _any(parser, args, kwargs):
+    return any(parser._charged(args[0]))
+
+
+@BUILTINS.register('all')
+def _all(parser, args, kwargs):
+    return all(parser._charged(args[0]))
+
+
+@BUILTINS.register('sorted', keywords=('key', 'reverse'))
+def _sorted(parser, args, kwargs):
+    return sorted(parser._charged(args[0]), **kwargs) if args else []
+
+
+@BUILTINS.register('list')
+def _list(parser, args, kwargs):
+    return list(parser._charged(args[0])) if args else []
+
+
+@BUILTINS.register('tuple')
+def _tuple(parser, args, kwargs):
+    return tuple(parser._charged(args[0])) if args else ()
+
+
+@BUILTINS.register('set')
+def _set(parser, args, kwargs):
+    return set(parser._charged(args[0])) if args else set()
+
+
+# List methods (mutators return the list, which the statement handler redraws)
+
+@METHODS.register((list, 'append'))
+def _list_append(parser, obj, args, kwargs):
+    obj.append(args[0] if args else None)
+    return obj
+
+
+@METHODS.register((list, 'pop'))
+def _list_pop(parser, obj, args, kwargs):
+    return obj.pop(args[0] if args else -1)
+
+
+@METHODS.register((list, 'remove'))
+def _list_remove(parser, obj, args, kwargs):
+    obj.remove(args[0])
+    return obj
+
+
+@METHODS.register((list, 'insert'))
+def _list_insert(parser, obj, args, kwargs):
+    if len(args) < 2:
+        raise TypeError(f"insert expected 2 arguments, got {len(args)}")
+    obj.insert(args[0], args[1])
+    return obj
+
+
+@METHODS.register((list, 'reverse'))
+def _list_reverse(parser, obj, args, kwargs):
+    obj.reverse()
+    return obj
+
+
+@METHODS.register((list, 'sort'), keywords=('key', 'reverse'))
+def _list_sort(parser, obj, args, kwargs):
+    obj.sort(**kwargs)
+    return obj
+
+
+# String methods
+
+@METHODS.register((str, 'split'))
+def _str_split(parser, obj, args, kwargs):
+    return obj.split(args[0] if args else None)
+
+
+@METHODS.register((str, 'join'))
+def _str_join(parser, obj, args, kwargs):
+    return obj.join(args[0]) if args else ""
+
+
+@METHODS.register((str, 'replace'))
+def _str_replace(parser, obj, args, kwargs):
+    if len(args) < 2:
+        raise TypeError(f"replace expected at least 2 arguments, got {len(args)}")
+    return obj.replace(args[0], args[1])
+
+
+@METHODS.register((str, 'strip'))
+def _str_strip(parser, obj, args, kwargs):
+    return obj.strip()
+
+
+@METHODS.register((str, 'lower'))
+def _str_lower(parser, obj, args, kwargs):
+    return obj.lower()
+
+
+@METHODS.register((str, 'upper'))
+def _str_upper(parser, obj, args, kwargs):
+    return obj.upper()
+
+
+# Dictionary methods
+
+@METHODS.register((dict, 'get'))
+def _dict_get(parser, obj, args, kwargs):
+    return obj.get(args[0], args[1] if len(args) > 1 else None)
+
+
+@METHODS.register((dict, 'keys'))
+def _dict_keys(parser, obj, args, kwargs):
+    return list(obj.keys())
+
+
+@METHODS.register((dict, 'values'))
+def _dict_values(parser, obj, args, kwargs):
+    return list(obj.values())
+
+
+@METHODS.register((dict, 'items'))
+def _dict_items(parser, obj, args, kwargs):
+    return list(obj.items())
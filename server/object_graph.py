@@ -0,0 +1,89 @@
+"""
+User-defined classes for the interpreter (ListNode, TreeNode, ...).
+
+Only what LeetCode-style data structures need: a class body of constants and
+an __init__ that sets attributes. Instances keep their attributes in a dict
+and report every write to the Heap of their parse, so snapshots re-encode
+only the objects that changed instead of walking the whole graph.
+"""
+from collections import deque
+
+# Nodes listed by the 'linked' structure of a variable (the rest is elided)
+MAX_LISTED_NODES = 50
+
+
+class UserClass:
+    """A class defined by the program."""
+
+    def __init__(self, name, init=None, defaults=(), attributes=None, locals=()):
+        self.name = name
+        self.init = init                     # __init__ FunctionDef, or None
+        self.defaults = tuple(defaults)      # evaluated __init__ defaults
+        self.attributes = attributes or {}   # class-level constants
+        self.locals = frozenset(locals)      # names bound while __init__ runs (restored after)
+
+    def __repr__(self):
+        return f"<class '{self.name}'>"
+
+
+class UserObject:
+    """An instance of a UserClass; `oid` is its creation order within the parse."""
+
+    __slots__ = ('cls', 'oid', 'attrs', 'heap')
+
+    def __init__(self, cls, oid, heap):
+        self.cls = cls
+        self.oid = oid
+        self.attrs = {}
+        self.heap = heap
+
+    def get(self, name):
+        if name in self.attrs:
+            return self.attrs[name]
+        if name in self.cls.attributes:
+            return self.cls.attributes[name]
+        raise AttributeError(f"'{self.cls.name}' object has no attribute '{name}'")
+
+    def set(self, name, value):
+        self.attrs[name] = value
+        self.heap.changed.add(self.oid)
+
+    def __repr__(self):
+        return f"<{self.cls.name} object #{self.oid}>"
+
+
+class Heap:
+    """Objects created during one parse, and the ids of those written since the last snapshot."""
+
+    def __init__(self):
+        self.objects = []    # oid -> UserObject
+        self.changed = set()
+
+    def new(self, cls):
+        obj = UserObject(cls, len(self.objects), self)
+        self.objects.append(obj)
+        return obj
+
+
+def node_label(obj):
+    """The value shown for a node: its first plain attribute (e.g. val), else its class name."""
+    for value in obj.attrs.values():
+        if isinstance(value, (int, float, str, bool)):
+            return value
+    return obj.cls.name
+
+
+def reachable(root, limit=MAX_LISTED_NODES):
+    """Objects reachable from `root` in breadth-first order (a linked list in
+    order, a tree level by level), each once even with cycles, at most `limit`."""
+    seen = {root.oid}
+    order = []
+    queue = deque([root])
+    while queue and len(order) < limit:
+        obj = queue.popleft()
+        order.append(obj)
+        for value in obj.attrs.values():
+            if type(value) is UserObject and value.oid not in seen:
+                seen.add(value.oid)
+                queue.append(value)
+    return order
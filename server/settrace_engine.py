@@ -0,0 +1,501 @@
+"""
+Alternative tracing engine: run the program under real CPython with sys.settrace.
+
+Covers the whole language and runs at close to native speed, unlike the
+CodeParser subset. Each program runs in a fresh child process (this file run
+as a script). Before the program starts, the child (see _sandbox):
+
+    - imports ALLOWED_MODULES, so nothing has to be loaded from disk later
+    - sets rlimits on CPU time, address space, file size and process count
+    - enters its own network namespace, chroots into an empty directory and
+      drops to an unprivileged uid, where the kernel permits it
+    - installs a seccomp filter that fails every syscall that opens files,
+      creates sockets, starts processes, signals other processes or changes
+      the filesystem (Linux x86_64/aarch64; elsewhere the child refuses to
+      run the program)
+
+It also runs with restricted builtins (no open/exec/eval/input, imports
+limited to ALLOWED_MODULES), an empty environment, isolated mode (-I) and
+no bytecode writes.
+
+The child records module-level line events and snapshots the module's
+variables at the end of every iteration of the first top-level loop, and
+returns the same schema as CodeParser.parse() (structures, iterationState,
+iterationOutputs, loop metadata, optional lineTrace). `structures` holds the
+final values; indexOperations are not recorded.
+
+The builtins restrictions are defense in depth (allowed modules still reach
+`os` through their attributes); the seccomp filter is the real boundary.
+The engine is off unless the server opts in (VISUALEYES_CPYTHON_ENGINE=1).
+"""
+import ast
+import json
+import math
+import operator
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Ensure the server directory is importable in the isolated (-I) child
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from code_parser import DEFAULT_MAX_STEPS, CodeParser, ExecutionBudgetExceeded, range_structure
+from def_use import DefUse
+from snapshot_store import KeyframeSampler, SnapshotStore, apply_policy
+from trace_log import TraceLog
+
+try:
+    import resource
+except ImportError:  # Not available on Windows: run without rlimits
+    resource = None
+
+DEFAULT_MAX_SECONDS = 5.0
+DEFAULT_MAX_MEMORY = 512 * 1024 * 1024
+MAX_ITERATIONS = 100  # Snapshotted loop iterations, as in CodeParser
+
+ALLOWED_MODULES = {
+    'math', 'cmath', 'random', 'itertools', 'functools', 'collections', 'heapq', 'bisect',
+    'string', 're', 'operator', 'statistics', 'fractions', 'decimal', 'copy', 'typing',
+    'dataclasses', 'enum',
+}
+
+SAFE_BUILTINS = (
+    'abs', 'all', 'any', 'ascii', 'bin', 'bool', 'bytearray', 'bytes', 'callable', 'chr',
+    'classmethod', 'complex', 'dict', 'divmod', 'enumerate', 'filter', 'float', 'format',
+    'frozenset', 'getattr', 'hasattr', 'hash', 'hex', 'id', 'int', 'isinstance', 'issubclass',
+    'iter', 'len', 'list', 'map', 'max', 'min', 'next', 'object', 'oct', 'ord', 'pow', 'property',
+    'range', 'repr', 'reversed', 'round', 'set', 'setattr', 'slice', 'sorted', 'staticmethod',
+    'str', 'sum', 'super', 'tuple', 'type', 'zip', '__build_class__',
+    'BaseException', 'Exception', 'ArithmeticError', 'AssertionError', 'AttributeError',
+    'IndexError', 'KeyError', 'LookupError', 'NameError', 'NotImplementedError', 'OverflowError',
+    'RecursionError', 'RuntimeError', 'StopIteration', 'TypeError', 'ValueError',
+    'ZeroDivisionError', 'NotImplemented', 'Ellipsis',
+)
+
+# Variable types included in snapshots and structures (functions, modules, ... are not)
+PLAIN_TYPES = (int, float, str, bool, list, dict, set, tuple, type(None))
+
+
+def trace_cpython(code, trace=False, watch=None, max_bytes=None, max_frames=None, max_steps=DEFAULT_MAX_STEPS,
+                  max_seconds=DEFAULT_MAX_SECONDS, max_memory=DEFAULT_MAX_MEMORY):
+    """Run `code` in a locked-down child process and return a CodeParser-style result."""
+    root = tempfile.mkdtemp(prefix='visualeyes-root-')  # Empty chroot for the child
+    request = json.dumps({
+        "code": code, "trace": trace, "watch": watch, "maxBytes": max_bytes, "maxFrames": max_frames,
+        "maxSteps": max_steps, "maxSeconds": max_seconds, "maxMemory": max_memory, "root": root,
+    })
+    try:
+        proc = subprocess.run(
+            [sys.executable, '-I', '-B', os.path.abspath(__file__)],
+            input=request, capture_output=True, text=True, timeout=max_seconds + 2,
+            env={} if os.name == 'posix' else None,
+        )
+    except subprocess.TimeoutExpired:
+        return _stopped(f"time budget of {max_seconds}s exceeded")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    if proc.returncode != 0 or not proc.stdout.strip():
+        return _stopped("resource limit exceeded")
+    return json.loads(proc.stdout)
+
+
+def _stopped(reason):
+    message = f"Execution stopped: {reason}"
+    return {"structures": [], "indexOperations": [], "output": [message], "hasLoop": False,
+            "error": reason, "budgetExceeded": True}
+
+
+# Child process
+
+
+def _restricted_builtins(emit):
+    import builtins
+    safe = {name: getattr(builtins, name) for name in SAFE_BUILTINS}
+
+    def restricted_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level != 0 or name.split('.')[0] not in ALLOWED_MODULES:
+            raise ImportError(f"import of '{name}' is not allowed")
+        return __import__(name, globals, locals, fromlist, level)
+
+    def restricted_print(*args, sep=' ', end='\n', file=None, flush=False):
+        emit((sep if sep is not None else ' ').join(str(arg) for arg in args))
+
+    safe['__import__'] = restricted_import
+    safe['print'] = restricted_print
+    return safe
+
+
+def _apply_limits(max_seconds, max_memory):
+    import signal
+    # Writes past RLIMIT_FSIZE fail with an error instead of killing the process
+    signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+    limits = [
+        (resource.RLIMIT_CPU, math.ceil(max_seconds) + 1),
+        (resource.RLIMIT_AS, max_memory),
+        (resource.RLIMIT_FSIZE, 0),
+    ]
+    if hasattr(resource, 'RLIMIT_NPROC'):
+        limits.append((resource.RLIMIT_NPROC, 0))
+    for limit, value in limits:
+        try:
+            resource.setrlimit(limit, (value, value))
+        except (ValueError, OSError):  # Not permitted here (e.g. hard limit lower)
+            pass
+
+
+# Syscalls failed with EPERM by the seccomp filter, per architecture
+# (AUDIT_ARCH value, syscall numbers): opening files, sockets, new
+# processes and programs, signals and tracing, filesystem changes, and
+# escaping the namespaces/chroot set up before the filter.
+DENIED_SYSCALLS = {
+    'x86_64': (0xC000003E, (
+        2, 85, 257, 437,                                   # open creat openat openat2
+        41, 53, 42, 49, 50, 43, 288,                        # socket socketpair connect bind listen accept accept4
+        59, 322, 57, 58, 56, 435,                           # execve execveat fork vfork clone clone3
+        62, 200, 234, 101, 310, 311,                        # kill tkill tgkill ptrace process_vm_readv/writev
+        129, 297, 424, 434, 438,                            # rt_(tg)sigqueueinfo pidfd_send_signal pidfd_open pidfd_getfd
+        87, 263, 82, 264, 316, 83, 258, 84, 86, 265, 88, 266,  # unlink* rename* mkdir* rmdir link* symlink*
+        90, 268, 92, 260, 94, 76, 133, 259,                 # chmod fchmodat chown fchownat lchown truncate mknod*
+        165, 166, 161, 272, 308, 155, 425,                  # mount umount2 chroot unshare setns pivot_root io_uring_setup
+    )),
+    'aarch64': (0xC00000B7, (
+        56, 437,                                            # openat openat2
+        198, 199, 203, 200, 201, 202, 242,                  # socket socketpair connect bind listen accept accept4
+        221, 281, 220, 435,                                 # execve execveat clone clone3
+        129, 130, 131, 117, 270, 271,                       # kill tkill tgkill ptrace process_vm_readv/writev
+        138, 240, 424, 434, 438,                            # rt_(tg)sigqueueinfo pidfd_send_signal pidfd_open pidfd_getfd
+        35, 38, 276, 34, 37, 36,                            # unlinkat renameat renameat2 mkdirat linkat symlinkat
+        53, 54, 45, 33,                                     # fchmodat fchownat truncate mknodat
+        40, 39, 51, 97, 268, 41, 425,                       # mount umount2 chroot unshare setns pivot_root io_uring_setup
+    )),
+}
+
+# Operators _Recorder._pure_int evaluates (on ints only, so no user code runs)
+PURE_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.FloorDiv: operator.floordiv,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+NOBODY = 65534
+CLONE_NEWUSER = 0x10000000
+CLONE_NEWNET = 0x40000000
+
+
+def _seccomp_filter(arch, denied):
+    """BPF program: kill on a foreign architecture, EPERM for `denied` syscalls, allow the rest."""
+    ld_abs, jeq, jge, ret = 0x20, 0x15, 0x35, 0x06
+    kill, errno_eperm, allow = 0x80000000, 0x00050000 | 1, 0x7FFF0000
+    program = [(ld_abs, 0, 0, 4), (jeq, 1, 0, arch), (ret, 0, 0, kill), (ld_abs, 0, 0, 0)]
+    checks = list(denied)
+    if arch == DENIED_SYSCALLS['x86_64'][0]:
+        checks.append(None)  # x32 syscall numbers (bit 30 set) reach the same kernel code
+    for i, nr in enumerate(checks):
+        to_deny = len(checks) - i  # Skips the remaining checks and the allow
+        program.append((jge, to_deny, 0, 0x40000000) if nr is None else (jeq, to_deny, 0, nr))
+    program += [(ret, 0, 0, allow), (ret, 0, 0, errno_eperm)]
+    return program
+
+
+def _sandbox(root):
+    """Isolate this (child) process before the program runs; returns False if any step fails."""
+    import ctypes
+    import platform
+
+    for name in sorted(ALLOWED_MODULES):
+        __import__(name)  # Nothing can be loaded from disk once the filter is in place
+    libc = ctypes.CDLL(None, use_errno=True)
+
+    # No network interfaces, and as root also an empty / and no privileges
+    # (needs root or user namespaces; without them the program does not run)
+    if os.geteuid() == 0:
+        if libc.unshare(CLONE_NEWNET) != 0:
+            return False
+        try:
+            os.chroot(root)
+            os.chdir('/')
+            os.setgroups([])
+            os.setgid(NOBODY)
+            os.setuid(NOBODY)
+        except OSError:
+            return False
+    elif libc.unshare(CLONE_NEWUSER | CLONE_NEWNET) != 0:
+        return False
+
+    if sys.platform != 'linux' or platform.machine() not in DENIED_SYSCALLS:
+        return False
+    arch, denied = DENIED_SYSCALLS[platform.machine()]
+    program = _seccomp_filter(arch, denied)
+
+    class SockFilter(ctypes.Structure):
+        _fields_ = [('code', ctypes.c_ushort), ('jt', ctypes.c_ubyte), ('jf', ctypes.c_ubyte), ('k', ctypes.c_uint)]
+
+    class SockFprog(ctypes.Structure):
+        _fields_ = [('len', ctypes.c_ushort), ('filter', ctypes.POINTER(SockFilter))]
+
+    filters = (SockFilter * len(program))(*[SockFilter(*instruction) for instruction in program])
+    fprog = SockFprog(len(program), filters)
+    pr_set_no_new_privs, pr_set_seccomp, seccomp_mode_filter = 38, 22, 2
+    if libc.prctl(pr_set_no_new_privs, 1, 0, 0, 0) != 0:
+        return False
+    return libc.prctl(pr_set_seccomp, seccomp_mode_filter, ctypes.byref(fprog), 0, 0) == 0
+
+
+class _Recorder:
+    """sys.settrace hooks: counts module-level lines and snapshots the first top-level loop."""
+
+    def __init__(self, tree, namespace, options):
+        self.namespace = namespace
+        self.watch = set(options["watch"]) if options.get("watch") is not None else None
+        self.max_bytes = options.get("maxBytes")
+        self.max_steps = options.get("maxSteps")
+        self.deadline = time.perf_counter() + options["maxSeconds"]
+        self.steps = 0
+
+        self.loop = next((node for node in tree.body if isinstance(node, (ast.For, ast.While))), None)
+        self.iteration = -1  # Iteration in progress (-1 = not in the loop)
+        self.body_seen = False
+        self.iterations = 0  # Completed iterations (including uncaptured ones)
+        self.states = SnapshotStore()
+        self.outputs = {}
+        self.output = []
+        self.range_target = None  # (type, data) of a `for ... in range(...)` loop's synthetic structure
+
+        self.analysis = DefUse(tree)
+        self.trace = TraceLog() if options.get("trace") else None
+        # With maxFrames the whole loop is recorded and sampled (see KeyframeSampler)
+        self.sampler = None
+        if options.get("maxFrames") and self.loop is not None:
+            self.sampler = KeyframeSampler(self.states, options["maxFrames"])
+        self.statements = {}
+        if self.trace is not None or self.sampler is not None:
+            for node in ast.walk(tree):
+                if isinstance(node, ast.stmt):
+                    self.statements.setdefault(node.lineno, node)
+
+    def recording(self):
+        """Whether the iteration in progress gets its outputs/snapshot/trace recorded."""
+        return self.iteration < MAX_ITERATIONS or self.sampler is not None
+
+    def emit(self, line):
+        if self.iteration >= 0 and self.recording():
+            self.outputs.setdefault(str(self.iteration), []).append(line)
+        elif self.iteration < 0:
+            self.output.append(line)
+
+    def variables(self):
+        return {k: v for k, v in self.namespace.items() if not k.startswith('__') and isinstance(v, PLAIN_TYPES)}
+
+    def finish_iteration(self):
+        if self.iteration >= 0 and self.body_seen:
+            if self.sampler is not None:
+                self.sampler.capture(self.iteration, apply_policy(self.variables(), self.watch, self.max_bytes))
+            elif self.iteration < MAX_ITERATIONS:
+                self.states.capture(self.iteration, apply_policy(self.variables(), self.watch, self.max_bytes))
+            self.iterations += 1
+        self.body_seen = False
+
+    def global_trace(self, frame, event, arg):
+        if frame.f_code.co_filename == '<program>' and frame.f_code.co_name == '<module>':
+            return self.local_trace
+        return None
+
+    def local_trace(self, frame, event, arg):
+        if event != 'line':
+            return self.local_trace
+        self.steps += 1
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise ExecutionBudgetExceeded(f"step budget of {self.max_steps} exceeded")
+        if self.steps % 1024 == 0 and time.perf_counter() > self.deadline:
+            raise ExecutionBudgetExceeded("time budget exceeded")
+
+        line = frame.f_lineno
+        loop = self.loop
+        if loop is not None:
+            if line == loop.lineno:
+                if self.iteration < 0 and self.range_target is None:
+                    self.range_target = self._range_target()
+                # Loop header: the previous iteration (if any) is complete
+                self.finish_iteration()
+                self.iteration = self.iterations
+            elif loop.lineno < line <= loop.end_lineno:
+                self.body_seen = True
+                if self.sampler is not None and line in self.statements:
+                    self.sampler.statement(self.statements[line])
+            elif self.iteration >= 0:
+                self.finish_iteration()
+                self.iteration = -1
+
+        if self.trace is not None and self.recording():
+            stmt = self.statements.get(line)
+            if stmt is not None:
+                self.trace.begin(stmt, self.iteration)
+                access = self.analysis.access.get(stmt)
+                if access is not None and not isinstance(stmt, (ast.If, ast.While)):
+                    for name in access.writes:
+                        self.trace.write(name)
+        return self.local_trace
+
+    def _range_target(self):
+        """Structure of the loop's range, computed on its header's first line
+        event (before the loop evaluates it). Only arguments without side
+        effects are evaluated, so the program still runs its calls once."""
+        it = getattr(self.loop, 'iter', None)
+        if not (isinstance(it, ast.Call) and isinstance(it.func, ast.Name) and it.func.id == 'range'
+                and 'range' not in self.namespace and not it.keywords):
+            return None
+        try:
+            values = range(*[self._pure_int(arg) for arg in it.args])
+            return range_structure(values, MAX_ITERATIONS, self.sampler is not None)
+        except (TypeError, ValueError, KeyError, ZeroDivisionError):
+            return None
+
+    def _pure_int(self, node):
+        """Value of an int expression built from constants, names, + - * // and
+        len() of a built-in container; raises ValueError for anything else."""
+        if isinstance(node, ast.Constant):
+            value = node.value
+        elif isinstance(node, ast.Name):
+            value = self.namespace[node.id]
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            value = PURE_OPS[type(node.op)](self._pure_int(node.operand))
+        elif isinstance(node, ast.BinOp) and type(node.op) in PURE_OPS:
+            value = PURE_OPS[type(node.op)](self._pure_int(node.left), self._pure_int(node.right))
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'len'
+                and 'len' not in self.namespace and len(node.args) == 1 and not node.keywords
+                and isinstance(node.args[0], ast.Name)
+                and type(self.namespace[node.args[0].id]) in (list, tuple, str, dict, set, range)):
+            value = len(self.namespace[node.args[0].id])
+        else:
+            raise ValueError("not a side-effect free int expression")
+        if type(value) is not int:
+            raise ValueError("not an int")
+        return value
+
+    def result(self, error=None, budget_error=None):
+        self.finish_iteration()
+        parser = CodeParser()
+        structures = []
+        for name, value in self.variables().items():
+            type_str, data = parser._structure_for(value)
+            if data is not None:
+                parser._add_or_update(structures, name, type_str, data)
+
+        loop_info = {"hasLoop": self.loop is not None, "target": None, "iterator": None,
+                     "loopDependencies": [], "loopCarried": []}
+        if self.loop is not None:
+            self._loop_metadata(loop_info, structures)
+            if self.sampler is not None:
+                loop_info["loopIterations"] = self.iterations
+                loop_info.update(self.sampler.metadata())
+            else:
+                loop_info["loopIterations"] = min(self.iterations, MAX_ITERATIONS)
+
+        output = list(self.output)
+        if error is not None:
+            output.append(f"Runtime Error: {error}")
+        if budget_error is not None:
+            output.append(f"Execution stopped: {budget_error}")
+        result = {
+            "structures": structures,
+            "indexOperations": [],
+            "output": output,
+            **loop_info,
+            "iterationOutputs": self.outputs,
+            "iterationState": self.states.to_dict(),
+            "engine": "cpython",
+        }
+        if self.iterations > MAX_ITERATIONS and self.sampler is None:
+            result["iterationsTruncated"] = True
+        if self.trace is not None:
+            result["lineTrace"] = self.trace.to_dict()
+        if budget_error is not None:
+            result["error"] = budget_error
+            result["budgetExceeded"] = True
+        return result
+
+    def _loop_metadata(self, loop_info, structures):
+        """Loop target/iterator/dependencies, following CodeParser's conventions."""
+        loop = self.loop
+        summary = self.analysis.loops[loop]
+        loop_info["loopCarried"] = sorted(summary.carried)
+        if not isinstance(loop, ast.For):
+            return
+        if isinstance(loop.target, ast.Name):
+            loop_info["iterator"] = loop.target.id
+
+        it = loop.iter
+        if isinstance(it, ast.Call) and isinstance(it.func, ast.Name) and it.func.id == 'enumerate' and it.args:
+            arg = it.args[0]
+            loop_info["target"] = arg.id if isinstance(arg, ast.Name) else ast.unparse(arg)
+            if isinstance(loop.target, ast.Tuple) and len(loop.target.elts) == 2:
+                index, item = loop.target.elts
+                if isinstance(item, ast.Name):
+                    loop_info["iterator"] = item.id
+                if isinstance(index, ast.Name):
+                    loop_info["loopDependencies"].append({"name": index.id, "formula": "_index"})
+        elif isinstance(it, ast.Name):
+            loop_info["target"] = it.id
+        elif isinstance(it, ast.Call) and isinstance(it.func, ast.Name) and it.func.id == 'range':
+            loop_info["target"] = f"range_{loop_info['iterator']}"
+            type_str, data = self.range_target or ('array', [])
+            structures.append({"name": loop_info["target"], "type": type_str, "data": data})
+
+        first = self.states.get('0', {})
+        names = {d["name"] for d in loop_info["loopDependencies"]}
+        for dep in summary.assignments:
+            if dep.name in names:
+                continue
+            names.add(dep.name)
+            formula = dep.formula
+            # Loop-invariant values are the same in every iteration: take the first
+            if not dep.reads & summary.written and dep.name in first and not isinstance(first[dep.name], dict):
+                formula = str(first[dep.name])
+            loop_info["loopDependencies"].append({"name": dep.name, "formula": formula})
+        if loop_info["iterator"] and not any(s['name'] == loop_info["iterator"] for s in structures):
+            structures.append({"name": loop_info["iterator"], "type": "variable", "data": "?"})
+
+
+def run_child(request):
+    """Trace one program in this (child) process; returns the result dict."""
+    code = request["code"]
+    try:
+        tree = ast.parse(code)
+        compiled = compile(tree, '<program>', 'exec')
+    except SyntaxError as e:
+        return {"structures": [], "error": f"Syntax Error: {e}", "output": []}
+
+    namespace = {'__name__': '__main__'}
+    recorder = _Recorder(tree, namespace, request)
+    namespace['__builtins__'] = _restricted_builtins(recorder.emit)
+    if resource is not None:
+        _apply_limits(request["maxSeconds"], request["maxMemory"])
+    if not _sandbox(request["root"]):
+        reason = "sandbox unavailable on this platform (needs seccomp and root or user namespaces)"
+        return {"structures": [], "error": reason, "output": [f"Execution stopped: {reason}"]}
+
+    error = budget_error = None
+    sys.settrace(recorder.global_trace)
+    try:
+        exec(compiled, namespace)
+    except ExecutionBudgetExceeded as e:
+        budget_error = str(e)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        sys.settrace(None)
+    return recorder.result(error, budget_error)
+
+
+if __name__ == "__main__":
+    sys.dont_write_bytecode = True
+    result = run_child(json.loads(sys.stdin.read()))
+    sys.stdout.write(json.dumps(result, default=repr))
@@ -0,0 +1,481 @@
+import hashlib
+from array import array
+from collections import deque, namedtuple
+from collections.abc import Mapping
+
+from object_graph import UserClass, UserObject
+
+# Long lists are split into fixed-size chunks so that a DP table that changes
+# one cell per iteration only stores one new chunk instead of a full copy.
+CHUNK_SIZE = 128
+
+# Matrix rows remembered between captures (bounded, cleared when full)
+ROW_CACHE_SIZE = 4096
+
+# Sampled loops always keep this many iterations at each end (fewer for tiny budgets)
+EDGE_FRAMES = 5
+
+# Smallest frame budget a sampled loop accepts
+MIN_FRAMES = 4
+
+# Values compared between iterations to find keyframes
+SCALARS = (int, float, str, bool)
+
+# A container captured in a frame: kind is 'list' (payload = tuple of chunk
+# ids), 'matrix' (payload = tuple of row Refs), 'dict' (payload = tuple of
+# (key, value) string pairs), 'object' (payload = oid of a user-defined
+# object) or 'reflist' (a list whose chunks hold object Refs).
+Ref = namedtuple('Ref', 'kind payload')
+
+# A variable left out of a snapshot by the client's watch/size policy: only
+# its type name and length (None for scalars) are kept.
+Summary = namedtuple('Summary', 'type length')
+
+
+def _typecode(items):
+    """Return the array typecode for a homogeneous numeric list, else None."""
+    types = set(map(type, items))  # C-speed scan; bools are excluded since type(True) is bool
+    if types == {int} or not types:
+        return 'q'
+    if types == {float}:
+        return 'd'
+    return None
+
+
+def _types(items):
+    """Element types of `items`, recursing into tuples."""
+    return tuple(_types(x) if type(x) is tuple else type(x) for x in items)
+
+
+def _holds_objects(items):
+    """True if `items` holds user-defined objects (directly or in tuples, e.g. (node, depth))."""
+    types = set(map(type, items))  # C-speed scan, like _typecode
+    if UserObject in types:
+        return True
+    return tuple in types and any(type(x) is tuple and UserObject in set(map(type, x)) for x in items)
+
+
+def summarize(v):
+    """Summary of a value that is not snapshotted in full."""
+    if type(v) is UserObject:
+        return Summary(v.cls.name, None)
+    if type(v) is UserClass:
+        return Summary('class', None)
+    return Summary(type(v).__name__, len(v) if hasattr(v, '__len__') else None)
+
+
+def estimated_bytes(v):
+    """Rough payload size of a value as snapshotted (8 bytes per element)."""
+    if isinstance(v, list) and v and all(isinstance(row, list) for row in v):
+        return sum(8 * len(row) for row in v)
+    if isinstance(v, (list, tuple, set)):
+        return 8 * len(v)
+    if isinstance(v, dict):
+        return 16 * len(v)
+    if isinstance(v, str):
+        return len(v)
+    return 8
+
+
+def apply_policy(context, watch=None, max_bytes=None):
+    """Variables for a snapshot, with unwatched (not in `watch`) or oversized values summarized."""
+    if watch is None and max_bytes is None:
+        return context
+    frame = {}
+    for name, value in context.items():
+        if ((watch is not None and name not in watch)
+                or (max_bytes is not None and estimated_bytes(value) > max_bytes)):
+            frame[name] = summarize(value)
+        else:
+            frame[name] = value
+    return frame
+
+
+class SnapshotStore(Mapping):
+    """
+    Per-iteration variable snapshots (the `iterationState` of a parse).
+
+    Homogeneous int/float lists are kept as array('q')/array('d') chunks
+    instead of lists of boxed numbers, and every chunk and container version is
+    deduplicated by content hash, so variables that do not change between
+    iterations cost nothing after their first snapshot.
+
+    Lists of lists (grids, DP tables) are stored row by row, so a row that did
+    not change since the previous iteration is shared (row-level
+    copy-on-write) and each snapshot is isolated from later writes.
+
+    Behaves like the old {iteration: {name: data}} dict; frames are
+    materialized on access and `to_dict()` serializes straight from the
+    buffers, building each distinct version only once. In `to_dict()` a
+    matrix is sent as {"shape", "rows"} the first time it appears and as
+    {"shape", "cells": [[row, col, value], ...]} (changes since the previous
+    frame) afterwards.
+
+    Instances of user-defined classes are captured by identity: a variable
+    holding one is an ('object', oid) Ref, and each object's attributes are
+    encoded once, when it is first reached, and again only when it is
+    written (Heap.changed) or holds a container. `to_dict()` sends them as
+    per-frame deltas under "$objects" ({oid: {"class", "attrs"}}), so a
+    pointer swap in a 10k-node list costs one object per frame, and cycles
+    are just Refs.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.frames = {}      # iteration key -> {name: Ref or scalar}
+        self._chunks = []     # chunk id -> array or tuple
+        self._chunk_ids = {}  # content key -> chunk id
+        self._refs = {}       # interned Refs
+        self._rows = {}       # id(row) -> (row, copy, Ref) for numeric matrix rows
+        self.object_changes = {}  # iteration key -> {oid: state} encoded in that frame
+        self._objects = {}    # oid -> (class name, ((attr, encoded value), ...)), None while pending
+        self._volatile = set()  # oids whose attributes hold containers (re-encoded every capture)
+        self._pending = []    # objects reached but not encoded yet
+        self._changes = {}    # object states encoded since the last frame
+        self._heap = None     # Heap of the objects seen (for its write set)
+
+    # Capture
+
+    def capture(self, key, context):
+        """Snapshot every variable in `context` as frame `key`."""
+        self._sync_objects()
+        frame = {name: self._encode(v) for name, v in context.items()}
+        self._encode_pending()
+        self.frames[str(key)] = frame
+        if self._changes:
+            self.object_changes[str(key)] = self._changes
+            self._changes = {}
+
+    def reset(self):
+        """Drop every frame, for a new loop; its first frame sends every known
+        object again. Interned chunks are kept for reuse."""
+        self.frames.clear()
+        self.object_changes.clear()
+        self._changes = {oid: state for oid, state in self._objects.items() if state is not None}
+
+    def discard(self, key):
+        """Drop frame `key` (chunks it shared with kept frames stay); the
+        object states it introduced move to the next frame."""
+        key = str(key)
+        self.frames.pop(key, None)
+        changes = self.object_changes.pop(key, None)
+        if changes:
+            later = [str(int(key) + 1)] if str(int(key) + 1) in self.frames else [k for k in self.frames if int(k) > int(key)]
+            if later:
+                target = min(later, key=int)
+                changes.update(self.object_changes.get(target, {}))
+                self.object_changes[target] = changes
+            else:
+                changes.update(self._changes)
+                self._changes = changes
+
+    def _sync_objects(self):
+        """Re-encode the known objects written since the last capture."""
+        if self._heap is None:
+            return
+        dirty = self._heap.changed | self._volatile
+        self._heap.changed.clear()
+        for oid in dirty:
+            old = self._objects.get(oid)
+            if old is None:  # Not reached yet: encoded when it is
+                continue
+            state = self._object_state(self._heap.objects[oid])
+            if state != old:
+                self._objects[oid] = state
+                self._changes[oid] = state
+        self._encode_pending()
+
+    def _encode_pending(self):
+        # Iterative, so a 10k-node chain does not recurse
+        while self._pending:
+            obj = self._pending.pop()
+            state = self._object_state(obj)
+            self._objects[obj.oid] = state
+            self._changes[obj.oid] = state
+
+    def _object_state(self, obj):
+        attrs = []
+        volatile = False
+        for name, value in obj.attrs.items():
+            if isinstance(value, (list, set, dict)):
+                volatile = True
+            attrs.append((name, self._link(value) if type(value) is UserObject else self._encode(value)))
+        if volatile:
+            self._volatile.add(obj.oid)
+        else:
+            self._volatile.discard(obj.oid)
+        return (obj.cls.name, tuple(attrs))
+
+    def _link(self, v):
+        """Encode a value that may hold objects; objects become Refs and are queued the first time."""
+        if type(v) is UserObject:
+            if v.oid not in self._objects:
+                self._objects[v.oid] = None  # Placeholder: a cycle back to it stops here
+                self._pending.append(v)
+                self._heap = v.heap
+            return self._refs.setdefault(Ref('object', v.oid), Ref('object', v.oid))
+        if isinstance(v, (list, tuple)):
+            return tuple(self._link(x) for x in v)
+        return v
+
+    def _encode(self, v):
+        if isinstance(v, list) and v and all(isinstance(row, list) for row in v):
+            ref = Ref('matrix', tuple(self._encode_row(row) for row in v))
+        elif isinstance(v, (list, set, tuple)) and _holds_objects(v):
+            ref = Ref('reflist', self._encode_sequence(self._link(list(v))))
+        elif isinstance(v, (list, set)):
+            ref = Ref('list', self._encode_sequence(list(v) if isinstance(v, set) else v))
+        elif isinstance(v, dict):
+            ref = Ref('dict', tuple((str(k), str(val)) for k, val in v.items()))
+        elif isinstance(v, (int, float, str, bool, tuple, type(None))):
+            return v
+        elif type(v) is UserObject:
+            return self._link(v)
+        else:
+            # Iterators, ranges, lambdas: not JSON values, keep their type and length
+            return summarize(v)
+        return self._refs.setdefault(ref, ref)
+
+    def _encode_row(self, row):
+        # Unchanged numeric rows are detected with a C-level list comparison
+        # instead of being re-encoded and re-hashed every iteration
+        # (the typecode check keeps 1 == 1.0 == True from matching across types)
+        cached = self._rows.get(id(row))
+        if cached is not None and cached[0] is row and cached[1] == row and _typecode(row) == cached[3]:
+            return cached[2]
+        ref = self._encode(row)
+        if ref.kind == 'list' and all(isinstance(self._chunks[c], array) for c in ref.payload):
+            if len(self._rows) >= ROW_CACHE_SIZE:
+                self._rows.clear()
+            self._rows[id(row)] = (row, list(row), ref, self._chunks[ref.payload[0]].typecode)
+        return ref
+
+    def _encode_sequence(self, items):
+        # Convert the whole list once, then slice the buffer into chunks
+        typecode = _typecode(items)
+        if typecode is not None:
+            try:
+                items = array(typecode, items)
+            except OverflowError:  # Python ints wider than 64 bits
+                pass
+        size = self.chunk_size
+        if len(items) <= size:
+            return (self._intern_chunk(items),)
+        return tuple(self._intern_chunk(items[i:i + size]) for i in range(0, len(items), size))
+
+    def _intern_chunk(self, chunk):
+        if isinstance(chunk, array):
+            key = (chunk.typecode, hashlib.blake2b(chunk, digest_size=16).digest())
+        else:
+            chunk = tuple(chunk)
+            # Element types are part of the key: tuples compare True == 1 == 1.0
+            key = ('t', _types(chunk), chunk)
+            try:
+                hash(key)
+            except TypeError:  # Unhashable elements, store without dedup
+                self._chunks.append(chunk)
+                return len(self._chunks) - 1
+
+        chunk_id = self._chunk_ids.get(key)
+        if chunk_id is not None and self._chunks[chunk_id] == chunk:
+            return chunk_id
+        self._chunks.append(chunk)
+        chunk_id = len(self._chunks) - 1
+        if key not in self._chunk_ids:
+            self._chunk_ids[key] = chunk_id
+        return chunk_id
+
+    # Serialization
+
+    def _decode(self, v, memo):
+        if type(v) is not Ref:
+            if type(v) is Summary:
+                return {"summarized": True, "type": v.type, "length": v.length}
+            return v
+        data = memo.get(v)
+        if data is None:
+            if v.kind == 'object':
+                data = {"ref": v.payload}
+            elif v.kind == 'list':
+                data = []
+                for chunk_id in v.payload:
+                    chunk = self._chunks[chunk_id]
+                    data.extend(chunk.tolist() if isinstance(chunk, array) else chunk)
+            elif v.kind == 'reflist':
+                data = [self._decode_linked(x, memo) for chunk_id in v.payload for x in self._chunks[chunk_id]]
+            elif v.kind == 'matrix':
+                data = [self._decode(row, memo) for row in v.payload]
+            else:
+                data = [{"key": k, "value": val} for k, val in v.payload]
+            memo[v] = data
+        return data
+
+    def _decode_linked(self, v, memo):
+        if type(v) is tuple:
+            return [self._decode_linked(x, memo) for x in v]
+        return self._decode(v, memo)
+
+    def _object_update(self, changes, memo):
+        """The "$objects" entry of a frame: the states of the objects that changed."""
+        return {
+            str(oid): {"class": cls, "attrs": {name: self._decode(value, memo) for name, value in attrs}}
+            for oid, (cls, attrs) in changes.items()
+        }
+
+    def _matrix_update(self, previous, v, memo):
+        """Serialize a matrix as a full keyframe or as the cells changed since `previous`."""
+        rows = v.payload
+        shape = [len(rows), max((len(self._decode(row, memo)) for row in rows), default=0)]
+        if (previous is None or len(previous.payload) != len(rows)
+                or any(row.kind != 'list' for row in rows)):
+            return {"shape": shape, "rows": self._decode(v, memo)}
+
+        cells = []
+        for r, (old_row, new_row) in enumerate(zip(previous.payload, rows)):
+            if old_row == new_row:  # Shared row, unchanged
+                continue
+            old_values = self._decode(old_row, memo)
+            new_values = self._decode(new_row, memo)
+            if len(old_values) != len(new_values):
+                return {"shape": shape, "rows": self._decode(v, memo)}
+            for c, (a, b) in enumerate(zip(old_values, new_values)):
+                if a != b or type(a) is not type(b):
+                    cells.append([r, c, b])
+        return {"shape": shape, "cells": cells}
+
+    def to_dict(self):
+        """Materialize all frames, sharing one list per distinct version."""
+        memo = {}
+        result = {}
+        previous = {}  # name -> matrix Ref in the previous frame
+        for key in sorted(self.frames, key=int):
+            frame = self.frames[key]
+            serialized = {}
+            for name, v in frame.items():
+                if type(v) is Ref and v.kind == 'matrix':
+                    serialized[name] = self._matrix_update(previous.get(name), v, memo)
+                else:
+                    serialized[name] = self._decode(v, memo)
+            previous = {name: v for name, v in frame.items() if type(v) is Ref and v.kind == 'matrix'}
+            if key in self.object_changes:
+                serialized["$objects"] = self._object_update(self.object_changes[key], memo)
+            result[key] = serialized
+        return result
+
+    def nbytes(self):
+        """Approximate payload size of the stored chunks in bytes."""
+        return sum(c.itemsize * len(c) if isinstance(c, array) else 8 * len(c) for c in self._chunks)
+
+    # Mapping interface
+
+    def __getitem__(self, key):
+        frame = self.frames[key]
+        memo = {}
+        return {name: self._decode(v, memo) for name, v in frame.items()}
+
+    def __iter__(self):
+        return iter(self.frames)
+
+    def __len__(self):
+        return len(self.frames)
+
+
+class KeyframeSampler:
+    """
+    Chooses which iterations of a long loop keep their snapshot in `store`,
+    at most `max_frames` of them: the first and last few iterations,
+    keyframes, and an evenly strided sample of the rest.
+
+    An iteration is a keyframe when it runs a statement for the first time
+    (a branch taken for the first time) or when a scalar variable changes
+    after staying the same for at least one iteration (a new max, a pointer
+    that finally moves); counters that change every iteration never qualify.
+    Keyframes (first come, first kept) may use up to half of the budget left
+    after the edges; the strided sample gets the rest, and its stride doubles
+    whenever it outgrows that.
+
+    Every iteration is captured and dropped once it is neither kept nor among
+    the last few, so loops of unknown length (while) are handled online.
+    """
+
+    def __init__(self, store, max_frames, edge=EDGE_FRAMES):
+        if max_frames < MIN_FRAMES:
+            raise ValueError(f"max_frames must be at least {MIN_FRAMES}")
+        self.store = store
+        self.edge = max(1, min(edge, max_frames // 4))
+        self.budget = max_frames - 2 * self.edge  # Keyframes + samples
+        self.stride = 1
+        self.iterations = 0
+        self.keyframes = {}    # iteration -> reason
+        self.samples = {}      # strided iterations (ordered set, ascending)
+        self.recent = deque()  # last `edge` iterations
+        self._seen = set()     # statements run so far
+        self._reason = None    # keyframe reason of the iteration in progress
+        self._last = {}        # scalar name -> value at the end of the previous iteration
+        self._changed = set()  # scalars that changed in the previous iteration
+
+    def statement(self, node):
+        """Note that statement `node` runs in the current iteration."""
+        if node not in self._seen:
+            self._seen.add(node)
+            if self.iterations and self._reason is None:
+                self._reason = f"first run of line {node.lineno}"
+
+    def capture(self, key, context):
+        """Snapshot iteration `key` (0, 1, ... in order) and drop what is no longer needed."""
+        self.store.capture(key, context)
+        self.iterations = key + 1
+
+        changed = set()
+        for name, value in context.items():
+            if type(value) in SCALARS:
+                if self._last.get(name, changed) != value:  # `changed` stands in for "unset"
+                    changed.add(name)
+                self._last[name] = value
+        reason = self._reason
+        if reason is None and key:
+            moved = sorted(changed - self._changed)
+            if moved:
+                reason = f"{moved[0]} changed"
+        self._changed = changed
+        self._reason = None
+
+        if key >= self.edge:
+            if reason is not None and len(self.keyframes) < self.budget // 2:
+                self.keyframes[key] = reason
+            elif (key - self.edge) % self.stride == 0:
+                self.samples[key] = None
+            while self.samples and len(self.samples) + len(self.keyframes) > self.budget:
+                self._thin()
+
+        self.recent.append(key)
+        if len(self.recent) > self.edge:
+            old = self.recent.popleft()
+            if not self._kept(old):
+                self.store.discard(old)
+
+    def _thin(self):
+        """Double the stride, dropping every other strided sample."""
+        self.stride *= 2
+        kept = {}
+        for key in self.samples:
+            if (key - self.edge) % self.stride == 0:
+                kept[key] = None
+            elif key not in self.keyframes and key not in self.recent:
+                self.store.discard(key)
+        self.samples = kept
+
+    def _kept(self, key):
+        return key < self.edge or key in self.keyframes or key in self.samples
+
+    def frames(self):
+        """Iterations that keep a snapshot, ascending."""
+        kept = set(range(min(self.edge, self.iterations))) | set(self.keyframes) | set(self.samples) | set(self.recent)
+        return sorted(kept)
+
+    def metadata(self):
+        """Sampling fields of a parse result: the kept iterations and why keyframes were kept."""
+        return {
+            "loopFrames": self.frames(),
+            "keyframes": {str(key): reason for key, reason in self.keyframes.items()},
+        }
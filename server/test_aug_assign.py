@@ -0,0 +1,58 @@
+from code_parser import CodeParser
+
+
+def test_aug_assign_targets():
+    parser = CodeParser()
+    code = """count = 0
+total = 0
+res = []
+alias = res
+dp = [1, 1, 1]
+grid = [[0, 0], [0, 0]]
+nums = [3, 5, 6]
+for num in nums:
+    count += 1
+    total += num
+    res += [num]
+    dp[-1] *= 2
+    grid[1][0] += num
+flags = 6 & 3 | 8
+shifted = (1 << 4) >> 2
+"""
+    result = parser.parse(code)
+    frame = result['iterationState']['2']
+    assert frame['count'] == 3 and frame['total'] == 14, f"❌ name += wrong: {frame}"
+    assert frame['res'] == [3, 5, 6], f"❌ list += wrong: {frame['res']}"
+    assert frame['alias'] == [3, 5, 6], "❌ list += should extend in place (alias sees it)"
+    assert frame['dp'] == [1, 1, 8], f"❌ subscript *= wrong: {frame['dp']}"
+    assert frame['grid'] == [[0, 0], [14, 0]], f"❌ nested subscript += wrong: {frame['grid']}"
+
+    structures = {s['name']: s['data'] for s in result['structures']}
+    assert structures['flags'] == 10 and structures['shifted'] == 4, f"❌ bit operators wrong: {structures}"
+    print("✅ PASSED")
+
+
+def test_aug_assign_index_operations():
+    parser = CodeParser()
+    result = parser.parse("lis = [1, 2, 3]\nlis[-1] += 10\ngrid = [[1, 2]]\ngrid[0][1] -= 2\n")
+    flat, nested = result['indexOperations']
+    assert flat['indices'] == [2] and flat['newValue'] == 13, f"❌ wrong flat operation: {flat}"
+    assert nested['cells'] == [[0, 1]] and nested['newValue'] == 0, f"❌ wrong nested operation: {nested}"
+    print("✅ PASSED")
+
+
+def test_string_building_is_budgeted():
+    parser = CodeParser()
+    code = "s = ''\nfor i in range(10):\n    for j in range(5000):\n        s += 'ab'\n"
+    result = parser.parse(code)
+    assert result.get('budgetExceeded'), "❌ quadratic s += ch should be charged for the copied characters"
+
+    result = parser.parse("s = ''\nwhile len(s) < 1500:\n    s += 'a'\n")
+    assert not result.get('budgetExceeded') and len(parser.context['s']) == 1500, "❌ short strings fit the default budget"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_aug_assign_targets()
+    test_aug_assign_index_operations()
+    test_string_building_is_budgeted()
@@ -0,0 +1,94 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import threading
+
+import app as server_app
+from batch import trace_batch
+from code_parser import CodeParser
+
+
+def test_execution_budget():
+    parser = CodeParser(max_steps=500)
+    result = parser.parse("total = 0\nfor i in range(10):\n    for j in range(10 ** 9):\n        total = j\n")
+    assert result.get('budgetExceeded'), "❌ runaway nested loop should exceed the budget"
+    assert 'iterationState' in result, "❌ partial trace should be kept"
+
+    result = parser.parse("big = [0] * 10 ** 12\n")
+    assert result.get('budgetExceeded'), "❌ huge allocation should be charged before it happens"
+
+    result = CodeParser(max_steps=1000).parse("x = 7 ** 10 ** 8\n")
+    assert result.get('budgetExceeded'), "❌ a huge power should be charged before it is computed"
+
+    result = CodeParser().parse("x = [0] * -10 ** 15\ni = 0\nwhile True:\n    i += 1\n")
+    assert result.get('budgetExceeded'), "❌ a negative repetition must not refund steps"
+    result = CodeParser().parse("s = 'ab' * -10 ** 15\ni = 0\nwhile True:\n    i += 1\n")
+    assert result.get('budgetExceeded'), "❌ nor on strings"
+
+    result = CodeParser().parse("x = 3\nfor i in range(40):\n    x = x * x\n")
+    assert result.get('budgetExceeded'), "❌ repeated squaring should be charged by operand size"
+    parser = CodeParser()
+    parser.parse("f = 1\nn = 1\nwhile n < 500:\n    f = f * n\n    n += 1\n")
+    assert parser.context['n'] == 500, "❌ ordinary big-int products stay within the budget"
+    print("✅ PASSED")
+
+
+def test_batch_dedup_and_budget():
+    programs = [
+        {"id": "a", "code": "x = 1"},
+        {"id": "b", "code": "x = 1"},
+        {"id": "c", "code": "i = 0\nwhile True:\n    i += 1\n"},
+    ]
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        results = list(trace_batch(programs, executor=executor, max_steps=1000))
+
+    assert len(results) == 2, "❌ identical sources should be traced once"
+    by_id = {program_id: json.loads(payload) for ids, payload in results for program_id in ids}
+    assert by_id["a"] == by_id["b"], "❌ duplicate ids should share the result"
+    assert by_id["c"].get("budgetExceeded"), "❌ batch entries should be budgeted"
+    print("✅ PASSED")
+
+
+def test_batch_timeout_recycles_worker():
+    programs = [
+        {"id": "quick", "code": "x = 1"},
+        {"id": "slow", "code": "i = 0\nwhile True:\n    i += 1\n"},
+        {"id": "after", "code": "y = 2"},
+    ]
+    executor = ProcessPoolExecutor(max_workers=1)
+    try:
+        results = list(trace_batch(programs, executor=executor, max_steps=10 ** 12, max_seconds=60, timeout=1))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    by_id = {program_id: json.loads(payload) for ids, payload in results for program_id in ids}
+    assert by_id["slow"]["error"] == "Timed out after 1s", f"❌ a hung program should time out: {by_id['slow']}"
+    assert by_id["quick"].get("error") is None and by_id["after"].get("error") is None, "❌ other programs still complete"
+    print("✅ PASSED")
+
+
+def test_concurrent_batch_timeout_spares_other_batches():
+    spin = "i = 0\nwhile True:\n    i += 1\n"
+    other = []
+    worker = threading.Thread(target=lambda: other.extend(trace_batch([{"id": "b", "code": spin}], max_steps=10 ** 12, max_seconds=3)))
+    worker.start()
+    hung = list(trace_batch([{"id": "a", "code": spin}], max_steps=10 ** 12, max_seconds=60, timeout=1))
+    worker.join()
+
+    assert json.loads(hung[0][1])["error"] == "Timed out after 1s", f"❌ the hung program should time out: {hung}"
+    result = json.loads(other[0][1])
+    assert result.get("budgetExceeded"), f"❌ another batch's program must not be killed: {result}"
+    print("✅ PASSED")
+
+
+def test_batch_rejects_bad_max_steps():
+    client = server_app.app.test_client()
+    response = client.post('/api/parse/batch', json={"programs": ["x = 1"], "maxSteps": "lots"})
+    assert response.status_code == 400, f"❌ non-numeric maxSteps should be a 400: {response.status_code}"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_execution_budget()
+    test_batch_dedup_and_budget()
+    test_batch_timeout_recycles_worker()
+    test_concurrent_batch_timeout_spares_other_batches()
+    test_batch_rejects_bad_max_steps()
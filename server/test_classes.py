@@ -0,0 +1,135 @@
+from code_parser import CodeParser
+
+LIST_NODE = """class ListNode:
+    def __init__(self, val=0, next=None):
+        self.val = val
+        self.next = next
+
+"""
+
+
+def _values(node):
+    values = []
+    while node is not None:
+        values.append(node.get('val'))
+        node = node.get('next')
+    return values
+
+
+def _resolve(frames):
+    """Accumulate the "$objects" deltas; returns {key: objects as of that frame}."""
+    objects = {}
+    resolved = {}
+    for key in sorted(frames, key=int):
+        objects.update(frames[key].get('$objects', {}))
+        resolved[key] = dict(objects)
+    return resolved
+
+
+def _walk(objects, ref):
+    values = []
+    while ref is not None:
+        node = objects[str(ref['ref'])]
+        values.append(node['attrs']['val'])
+        ref = node['attrs']['next']
+    return values
+
+
+def test_build_and_reverse():
+    parser = CodeParser()
+    result = parser.parse(LIST_NODE + """head = ListNode(1, ListNode(2, ListNode(3)))
+dummy = tail = ListNode(0)
+tail.next = head
+prev = None
+cur = head
+while cur is not None:
+    cur.next, prev, cur = prev, cur, cur.next
+""")
+    assert not any("Error" in line for line in result['output']), f"❌ unexpected errors: {result['output']}"
+    assert _values(parser.context['prev']) == [3, 2, 1], "❌ the list should be reversed"
+    assert parser.context['dummy'] is parser.context['tail'], "❌ chained assignment binds one object"
+    linked = {s['name']: s for s in result['structures'] if s['type'] == 'linked'}
+    assert linked['head']['data'] == [1, 2, 3] and linked['dummy']['data'] == [0, 1, 2, 3], f"❌ wrong structures: {linked}"
+
+    frames = result['iterationState'].to_dict()
+    resolved = _resolve(frames)
+    assert [_walk(resolved[key], frames[key]['prev']) for key in ('0', '1', '2')] == [[1], [2, 1], [3, 2, 1]], "❌ frames should follow the pointers"
+    assert all(len(frames[key]['$objects']) == 1 for key in ('1', '2')), "❌ later frames only send the node that changed"
+    print("✅ PASSED")
+
+
+def test_trees_and_cycles():
+    parser = CodeParser()
+    result = parser.parse("""class TreeNode:
+    kind = 'tree'
+    def __init__(self, val, left=None, right=None):
+        self.val = val
+        self.left = left
+        self.right = right
+
+root = TreeNode(1, TreeNode(2), right=TreeNode(3, left=TreeNode(4)))
+label = root.kind + str(root.right.left.val)
+root.right.val += 10
+a = TreeNode(5)
+a.left = a
+queue = [root]
+seen = 0
+while queue:
+    node = queue.pop()
+    seen += node.val
+    if node.left:
+        queue.append(node.left)
+""")
+    assert parser.context['label'] == 'tree4' and parser.context['root'].get('right').get('val') == 13, "❌ attribute reads/writes"
+    assert parser.context['seen'] == 3, "❌ a while loop walks the tree"
+    structures = {s['name']: s for s in result['structures']}
+    assert structures['root']['data'] == [1, 2, 13, 4], "❌ trees are listed breadth first"
+    assert structures['a']['data'] == [5], "❌ a cycle lists each node once"
+
+    frames = result['iterationState'].to_dict()
+    assert frames['0']['queue'] == [{'ref': 0}], f"❌ lists of nodes hold refs: {frames['0']['queue']}"
+    assert set(frames['0']['$objects']) == {'0', '1', '2', '3', '4'}, "❌ reachable nodes are sent once"
+    assert frames['0']['$objects']['4']['attrs']['left'] == {'ref': 4}, "❌ a cycle is a ref back to the node"
+    assert '$objects' not in frames['1'], "❌ unchanged nodes are not sent again"
+    print("✅ PASSED")
+
+
+def test_errors():
+    result = CodeParser().parse(LIST_NODE + """node = ListNode(1)
+x = node.missing
+y = ListNode(1, 2, 3)
+class Child(ListNode):
+    pass
+""")
+    assert "Runtime Error (Assign x): 'ListNode' object has no attribute 'missing'" in result['output'], "❌ missing attributes are reported"
+    assert any(line.startswith("Runtime Error (Assign y): ListNode() takes 2 arguments") for line in result['output']), "❌ arity is checked"
+    assert "Runtime Error (Class Child): Unsupported base classes" in result['output'], "❌ inheritance is rejected"
+    print("✅ PASSED")
+
+
+def test_long_reversal_sends_deltas():
+    n = 10_000
+    parser = CodeParser()
+    result = parser.parse(LIST_NODE + f"""head = None
+for v in range({n}):
+    head = ListNode(v, head)
+prev = None
+cur = head
+while cur:
+    cur.next, prev, cur = prev, cur, cur.next
+""", max_frames=50)
+    assert result['loopIterations'] == n and len(result['loopFrames']) <= 50, "❌ the reversal is sampled"
+    frames = result['iterationState'].to_dict()
+    sent = [len(frame.get('$objects', {})) for frame in frames.values()]
+    assert sent[0] == n, "❌ a new loop starts from every node"
+    assert sum(sent[1:]) <= n, f"❌ dropped frames pass their changes on instead of copies: {sum(sent[1:])}"
+    last = str(result['loopFrames'][-1])
+    assert _walk(_resolve(frames)[last], frames[last]['prev']) == list(range(n)), "❌ the last frame holds the reversed list"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_build_and_reverse()
+    test_trees_and_cycles()
+    test_errors()
+    test_long_reversal_sends_deltas()
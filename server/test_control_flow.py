@@ -0,0 +1,98 @@
+from code_parser import CodeParser
+
+
+def test_break_stops_replay():
+    code = """nums = [2, 7, 11, 15]
+found = -1
+for i in range(len(nums)):
+    if nums[i] == 7:
+        found = i
+        break
+"""
+    parser = CodeParser()
+    result = parser.parse(code, trace=True)
+    assert parser.context['found'] == 1 and parser.context['i'] == 1, "❌ break should stop the loop"
+    assert result['loopIterations'] == 2, f"❌ only executed iterations count: {result['loopIterations']}"
+    assert sorted(result['iterationState'].to_dict()) == ['0', '1'], "❌ no snapshots after break"
+    assert set(result['lineTrace']['iteration']) <= {-1, 0, 1}, "❌ trace should stop at the break"
+    print("✅ PASSED")
+
+
+def test_continue_and_else():
+    code = """nums = [1, 2, 3, 4, 5]
+total = 0
+for n in nums:
+    if n % 2 == 0:
+        continue
+    total += n
+else:
+    done = True
+"""
+    parser = CodeParser()
+    result = parser.parse(code)
+    assert parser.context['total'] == 9, "❌ continue should skip the rest of the body"
+    assert parser.context['done'] is True, "❌ else runs when the loop did not break"
+    assert result['loopIterations'] == 5, "❌ continue does not end the loop"
+
+    parser.parse("nums = [1, 2]\nfor n in nums:\n    break\nelse:\n    done = True\n")
+    assert 'done' not in parser.context, "❌ else is skipped after break"
+    print("✅ PASSED")
+
+
+def test_while_loop():
+    parser = CodeParser()
+    result = parser.parse("""n = 6
+steps = 0
+while n != 1:
+    if n % 2 == 0:
+        n = n // 2
+    else:
+        n = 3 * n + 1
+    steps += 1
+    print(n)
+""")
+    assert parser.context['steps'] == 8 and parser.context['n'] == 1, "❌ while should run to completion"
+    assert result['hasLoop'] and result['loopIterations'] == 8, "❌ one snapshot per iteration"
+    assert result['iterationOutputs']['0'] == ['3'], "❌ prints are recorded per iteration"
+
+    parser.parse("i = 0\nwhile True:\n    i += 1\n    if i == 3:\n        break\n")
+    assert parser.context['i'] == 3, "❌ break should end while True"
+
+    result = parser.parse("n = 0\nwhile n < 150:\n    n += 1\n")
+    assert parser.context['n'] == 150, "❌ iterations past the snapshot window still run"
+    assert result['loopIterations'] == 100 and result['iterationsTruncated'], "❌ snapshots stop at 100"
+
+    result = CodeParser(max_steps=10_000).parse("x = 0\nwhile True:\n    x += 1\n")
+    assert result.get('budgetExceeded'), "❌ infinite loops are stopped by the budget"
+    print("✅ PASSED")
+
+
+def test_later_loop_replaces_earlier():
+    result = CodeParser().parse("""for i in range(300):
+    print(i)
+n = 0
+while n < 3:
+    n += 1
+""", max_frames=10)
+    assert result['loopIterations'] == 3 and result['iterationOutputs'] == {}, "❌ the earlier loop's iterations are dropped"
+    assert not result.get('iterationsTruncated') and result['loopFrames'] == [0, 1, 2], f"❌ stale sampling: {result['loopFrames']}"
+    assert (result['target'], result['iterator']) == (None, None), "❌ the while loop has no range target"
+    assert sorted(result['iterationState'].to_dict(), key=int) == ['0', '1', '2'], "❌ only the last loop's frames are sent"
+
+    result = CodeParser().parse("for i in range(150):\n    x = i\nfor j in range(2):\n    y = j\n")
+    assert result['loopIterations'] == 2 and not result.get('iterationsTruncated'), "❌ truncation belongs to the earlier loop"
+    print("✅ PASSED")
+
+
+def test_break_outside_loop():
+    result = CodeParser().parse("x = 1\nbreak\n")
+    assert "Syntax Error: 'break' outside loop" in result['output'], "❌ stray break should be reported"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_break_stops_replay()
+    test_continue_and_else()
+    test_while_loop()
+    test_later_loop_replaces_earlier()
+    test_break_outside_loop()
@@ -0,0 +1,78 @@
+import ast
+import time
+
+from code_parser import CodeParser
+from def_use import DefUse
+
+
+def test_loop_summary():
+    code = """nums = [1, 2, 3]
+size = len(nums)
+total = 0
+prev = 0
+for num in nums:
+    if num > 1:
+        best = num * 2
+    total += num
+    last = prev
+    prev = num
+    seen = [x for x in nums if x < num]
+"""
+    tree = ast.parse(code)
+    analysis = DefUse(tree)
+    loop = tree.body[4]
+    summary = analysis.loops[loop]
+
+    names = [dep.name for dep in summary.assignments]
+    assert names == ['best', 'total', 'last', 'prev', 'seen'], f"❌ wrong loop assignments: {names}"
+    assert summary.carried == {'total', 'prev'}, f"❌ wrong loop-carried names: {summary.carried}"
+    assert 'x' not in analysis.access[loop.body[4]].reads, "❌ comprehension variables are local"
+
+    # total += num reads the initial total and its own previous iteration
+    aug = loop.body[1]
+    sources = {d.lineno for d, name in analysis.uses(aug) if name == 'total'}
+    assert sources == {3, 8}, f"❌ wrong reaching definitions for total: {sources}"
+    print("✅ PASSED")
+
+
+def test_loop_dependencies_from_analysis():
+    code = """nums = [4, 5, 6]
+size = len(nums)
+total = 0
+for num in nums:
+    if num % 2 == 0:
+        half = num // 2
+    total += num
+    width = size
+"""
+    result = CodeParser().parse(code)
+    deps = {d['name']: d['formula'] for d in result['loopDependencies']}
+    assert deps['half'] == 'num // 2', f"❌ dependency inside if should be found: {deps}"
+    assert deps['total'] == 'total + num', f"❌ augmented assignment formula wrong: {deps}"
+    assert deps['width'] == '3', f"❌ loop-invariant value should be evaluated: {deps}"
+    assert result['loopCarried'] == ['total'], f"❌ wrong loopCarried: {result['loopCarried']}"
+    print("✅ PASSED")
+
+
+def test_deeply_nested_loops():
+    depth = 18
+    code = "x = 0\n" + "".join("    " * i + f"for i{i} in range(2):\n" for i in range(depth)) + "    " * depth + "x += 1\n"
+    tree = ast.parse(code)
+    start = time.perf_counter()
+    analysis = DefUse(tree)
+    assert analysis._edges is None, "❌ def-use edges are only computed when asked for"
+    innermost = tree.body[1]
+    for _ in range(depth - 1):
+        innermost = innermost.body[0]
+    aug = innermost.body[0]
+    sources = {d.lineno for d, name in analysis.uses(aug) if name == 'x'}
+    elapsed = time.perf_counter() - start
+    assert sources == {1, depth + 2}, f"❌ wrong reaching definitions for x: {sources}"
+    assert elapsed < 0.5, f"❌ nested loops should not multiply the analysis: {elapsed:.2f}s"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_loop_summary()
+    test_loop_dependencies_from_analysis()
+    test_deeply_nested_loops()
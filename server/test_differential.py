@@ -0,0 +1,29 @@
+from bench_differential import CONSTRUCTS, compare, generate_programs, run_harness
+
+
+def test_constructs_match_cpython():
+    for name in ("arithmetic", "bitwise", "aug_assign", "nested_subscript", "dict", "nested_loop", "conditionals",
+                 "break_continue", "while", "builtins", "lazy_builtins", "lambda_key",
+                 "linked_list"):
+        outcome = compare(CONSTRUCTS[name])
+        assert not outcome["mismatches"], f"❌ {name} differs from CPython: {outcome['mismatches']}"
+    for code in generate_programs(20, seed=1):
+        outcome = compare(code)
+        assert not outcome["mismatches"], f"❌ generated program differs from CPython:\n{code}{outcome['mismatches']}"
+    print("✅ PASSED")
+
+
+def test_mismatch_is_reported():
+    # try/except is outside the supported subset, so x is never assigned
+    outcome = compare("try:\n    x = 1\nexcept Exception:\n    x = 2\n")
+    assert any(m["kind"] == "missing" and m["name"] == "x" for m in outcome["mismatches"]), "❌ missing variable should be reported"
+
+    report = run_harness([("arithmetic", CONSTRUCTS["arithmetic"]), ("print", CONSTRUCTS["print"])], repeat=1)
+    assert {row["construct"] for row in report} == {"arithmetic", "print"}, "❌ one row per construct"
+    assert all(row["geomean_ratio"] > 0 for row in report), "❌ ratios should be positive"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_constructs_match_cpython()
+    test_mismatch_is_reported()
@@ -0,0 +1,54 @@
+from code_parser import CodeParser
+from dispatch import BUILTINS, METHODS
+
+
+def test_operator_tables():
+    parser = CodeParser()
+    parser.parse("a = 7\nb = ~a\nc = -a ** 2 // 3\nd = a is not None and 1 < a <= 7 != 8\ne = 3 in [1, 2]\n")
+    assert parser.context == {'a': 7, 'b': -8, 'c': -17, 'd': True, 'e': False}, f"❌ wrong values: {parser.context}"
+    result = parser.parse("x = 1 @ 2\n")
+    assert result['output'] == ["Runtime Error (Assign x): Unsupported operator: MatMult"], "❌ unknown operators are reported"
+    print("✅ PASSED")
+
+
+def test_pluggable_builtins_and_methods():
+    @BUILTINS.register('divmod')
+    def _divmod(parser, args, kwargs):
+        return divmod(*args)
+
+    @METHODS.register((str, 'count'))
+    def _count(parser, obj, args, kwargs):
+        return obj.count(args[0])
+
+    try:
+        parser = CodeParser()
+        parser.parse("q, r = divmod(17, 5)\nn = 'banana'.count('a')\n")
+        assert (parser.context['q'], parser.context['r'], parser.context['n']) == (3, 2, 3), "❌ registered handlers are used"
+    finally:
+        del BUILTINS.handlers['divmod']
+        del METHODS.handlers[(str, 'count')]
+
+    result = CodeParser().parse("q = divmod(17, 5)\nxs = [1]\nn = xs.count(1)\ny = sorted(xs, cmp=1)\n")
+    assert result['output'] == [
+        "Runtime Error (Assign q): Unsupported function: divmod",
+        "Runtime Error (Assign n): Unsupported method: count on <class 'list'>",
+        "Runtime Error (Assign y): Unsupported keyword argument for sorted(): cmp",
+    ], f"❌ unregistered calls are rejected: {result['output']}"
+    print("✅ PASSED")
+
+
+def test_handler_counts():
+    parser = CodeParser(count_handlers=True)
+    parser.parse("nums = [3, 1, 2]\nnums.sort()\ntotal = 0\nfor n in nums:\n    total += n * len(nums)\n")
+    counts = parser.handler_counts
+    assert counts['list.sort'] == 1 and counts['len()'] == 3, f"❌ calls are counted per handler: {counts}"
+    assert counts['Mult'] == 3 and counts['Add'] == 3, "❌ operators are counted"
+    assert counts['Constant'] >= 4 and counts['Call'] == 4, "❌ evaluated node types are counted"
+    assert CodeParser().handler_counts is None, "❌ counting is off by default"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_operator_tables()
+    test_pluggable_builtins_and_methods()
+    test_handler_counts()
@@ -0,0 +1,28 @@
+import app as server_app
+
+
+def test_conditional_parse():
+    client = server_app.app.test_client()
+    body = {'code': 'nums = [1, 2]\nfor n in nums:\n    print(n)\n'}
+    first = client.post('/api/parse', json=body)
+    etag = first.headers['ETag']
+    assert etag, "❌ /api/parse should return an ETag"
+
+    calls = []
+    original = server_app.parser.parse
+    server_app.parser.parse = lambda *args, **kwargs: calls.append(args) or original(*args, **kwargs)
+    try:
+        again = client.post('/api/parse', json=body, headers={'If-None-Match': etag})
+        assert again.status_code == 304 and not again.data, "❌ unchanged source should get an empty 304"
+        assert not calls, "❌ a 304 should skip interpretation"
+
+        traced = client.post('/api/parse', json={**body, 'trace': True}, headers={'If-None-Match': etag})
+        assert traced.status_code == 200 and traced.headers['ETag'] != etag, "❌ options should change the ETag"
+        assert len(calls) == 1, "❌ a different mode should be interpreted"
+    finally:
+        server_app.parser.parse = original
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_conditional_parse()
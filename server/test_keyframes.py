@@ -0,0 +1,64 @@
+from code_parser import CodeParser
+from snapshot_store import KeyframeSampler, SnapshotStore
+
+
+LONG_LOOP = """nums = [5, 3, 8, 1, 9, 2, 7, 4, 6, 0] * 200
+best = 0
+for i in range(len(nums)):
+    if nums[i] > best:
+        best = nums[i]
+    if i == 1500:
+        best = 100
+        print('halfway')
+"""
+
+
+def test_sampler_budget():
+    for max_frames in (4, 5, 12, 40, 200):
+        store = SnapshotStore()
+        sampler = KeyframeSampler(store, max_frames)
+        for key in range(5000):
+            sampler.capture(key, {"i": key, "flag": key // 1000})
+        frames = sampler.frames()
+        assert len(frames) <= max_frames, f"❌ {len(frames)} frames for a budget of {max_frames}"
+        assert frames[0] == 0 and frames[-1] == 4999, "❌ the first and last iterations are always kept"
+        assert sorted(store, key=int) == [str(key) for key in frames], "❌ dropped frames should leave the store"
+        if max_frames >= 40:
+            assert {"1000", "2000", "3000", "4000"} <= set(sampler.metadata()["keyframes"]), "❌ flag changes are keyframes"
+    print("✅ PASSED")
+
+
+def test_sampled_parse():
+    result = CodeParser().parse(LONG_LOOP, max_frames=12)
+    assert result['loopIterations'] == 2000 and not result.get('iterationsTruncated'), "❌ sampled loops run to the end"
+    assert len(result['loopFrames']) <= 12 and result['loopFrames'][-1] == 1999, f"❌ wrong frames: {result['loopFrames']}"
+    assert result['keyframes'].get('1500') == "first run of line 7", f"❌ branch keyframe missing: {result['keyframes']}"
+    frames = result['iterationState'].to_dict()
+    assert sorted(frames, key=int) == [str(key) for key in result['loopFrames']], "❌ one snapshot per kept frame"
+    assert frames['1999']['best'] == 100, "❌ last frame should hold the final state"
+    assert result['iterationOutputs'] == {'1500': ['halfway']}, "❌ outputs of every iteration are kept"
+    target = next(s for s in result['structures'] if s['name'] == 'range_i')
+    assert (target['type'], target['data']) == ('range', [0, 2000, 1]), f"❌ sampled ranges are sent as bounds: {target}"
+
+    # Without a frame budget the replay still stops at 100 iterations
+    result = CodeParser().parse(LONG_LOOP)
+    assert result['loopIterations'] == 100 and result['iterationsTruncated'] and 'loopFrames' not in result, "❌ default replay"
+    print("✅ PASSED")
+
+
+def test_sampled_while_and_endpoint():
+    result = CodeParser().parse("n = 0\nwhile n < 1000:\n    n += 1\n", max_frames=20)
+    assert result['loopIterations'] == 1000 and len(result['loopFrames']) <= 20, "❌ while loops are sampled too"
+
+    import app as server_app
+    client = server_app.app.test_client()
+    response = client.post('/api/parse', json={'code': LONG_LOOP, 'maxFrames': 12})
+    assert response.get_json()['loopFrames'][-1] == 1999, "❌ maxFrames should reach the parser"
+    assert client.post('/api/parse', json={'code': LONG_LOOP, 'maxFrames': 2}).status_code == 400, "❌ tiny budgets are rejected"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_sampler_budget()
+    test_sampled_parse()
+    test_sampled_while_and_endpoint()
@@ -0,0 +1,82 @@
+from code_parser import CodeParser
+
+
+def test_lazy_iterators():
+    parser = CodeParser()
+    result = parser.parse("""xs = [1, 2, 3]
+ys = [4, 5, 6]
+dot = 0
+for a, b in zip(xs, ys):
+    dot += a * b
+evens = list(filter(lambda x: x % 2 == 0, xs))
+labels = list(map(str, xs))
+""")
+    assert parser.context['dot'] == 32, "❌ for should unpack zip() pairs"
+    assert parser.context['evens'] == [2] and parser.context['labels'] == ['1', '2', '3'], "❌ filter/map with lambda/builtin"
+    assert result['loopIterations'] == 3, "❌ one iteration per pair"
+
+    # A lazy loop over a huge range only runs (and allocates) the replayed iterations
+    result = parser.parse("n = 10 ** 9\nfor i, (a, b) in enumerate(zip(range(n), range(n))):\n    last = a + b\n")
+    assert result['loopIterations'] == 100 and result['iterationsTruncated'], "❌ replay should stop at 100"
+    assert parser.context['last'] == 198, "❌ wrong last pair"
+    print("✅ PASSED")
+
+
+def test_consumers_are_charged():
+    for code in ("x = sum(range(10 ** 12))\n", "x = list(zip(range(10 ** 12), range(10 ** 12)))\n"):
+        result = CodeParser(max_steps=10_000).parse(code)
+        assert result.get('budgetExceeded'), f"❌ consuming a huge iterable should hit the budget: {code}"
+    print("✅ PASSED")
+
+
+def test_keywords_and_lambda():
+    parser = CodeParser()
+    parser.parse("""words = ['pear', 'fig', 'banana']
+by_len = sorted(words, key=len)
+desc = sorted(words, key=lambda w: w[-1], reverse=True)
+pairs = [[2, 'b'], [1, 'a']]
+pairs.sort(key=lambda p: p[0])
+power = lambda x, k=2: x ** k
+a = power(3)
+b = power(2, 3)
+x = 5
+keep = power(x)
+""")
+    assert parser.context['by_len'] == ['fig', 'pear', 'banana'], "❌ sorted should read key="
+    assert parser.context['desc'] == ['pear', 'fig', 'banana'], "❌ sorted should read reverse="
+    assert parser.context['pairs'] == [[1, 'a'], [2, 'b']], "❌ list.sort should read key="
+    assert (parser.context['a'], parser.context['b'], parser.context['keep']) == (9, 8, 25), "❌ lambda defaults"
+    assert parser.context['x'] == 5, "❌ lambda parameters must not leak into the context"
+
+    result = parser.parse("nums = [1]\ny = sorted(nums, cmp=1)\n")
+    assert any("Unsupported keyword argument for sorted(): cmp" in line for line in result['output']), "❌ unknown keyword"
+    print("✅ PASSED")
+
+
+def test_iterators_in_snapshots():
+    import json
+    result = CodeParser().parse("pairs = zip([1], [2])\nf = lambda x: x\nnums = [1, 2]\nfor n in nums:\n    total = n\n")
+    frame = json.loads(json.dumps(result['iterationState'].to_dict()))['0']
+    assert frame['f'] == {"summarized": True, "type": "function", "length": None}, f"❌ lambdas are summarized: {frame}"
+    assert frame['pairs']['summarized'], "❌ iterators are summarized"
+    print("✅ PASSED")
+
+
+def test_range_loop_is_lazy():
+    result = CodeParser(max_steps=10_000).parse("for i in range(2000000):\n    if i == 3:\n        break\n")
+    assert not result.get('budgetExceeded'), "❌ the range should not be charged up front"
+    ranges = {s['name']: s['data'] for s in result['structures']}
+    assert ranges['range_i'] == [0, 1, 2, 3], f"❌ only replayed iterations are listed: {ranges['range_i']}"
+
+    result = CodeParser().parse("for i in range(10 ** 6):\n    x = i\n")
+    ranges = {s['name']: s['data'] for s in result['structures']}
+    assert ranges['range_i'] == list(range(100)) and result['iterationsTruncated'], "❌ truncated loops list their replayed window"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_lazy_iterators()
+    test_consumers_are_charged()
+    test_keywords_and_lambda()
+    test_iterators_in_snapshots()
+    test_range_loop_is_lazy()
@@ -0,0 +1,49 @@
+import threading
+
+from werkzeug.serving import make_server
+
+import app as server_app
+from bench_load import _percentile, debounce, preview_body, run_body, run_load, typing_session
+
+
+def test_session_helpers():
+    code = "x = 1\ny = 2\n"
+    states = typing_session(code, chars_per_state=2)
+    assert states == [code[:2], code[:4], code[:6], code[:8], code[:10], code], "❌ typing should grow the source"
+
+    assert debounce(states, 150, 0) == states, "❌ no debouncing sends every state"
+    assert debounce(states, 100, 250) == [states[2], states[5]], "❌ superseded states should be dropped"
+    assert debounce(states[:5], 100, 250) == [states[2], states[4]], "❌ the final state is always sent"
+    assert debounce(states, 0, 300) == [states[-1]], "❌ instant typing only sends the final state"
+
+    assert _percentile([1, 2, 3, 4], 50) == 2 and _percentile([1, 2, 3, 4], 99) == 4, "❌ nearest-rank percentile"
+    assert _percentile([], 95) == 0.0, "❌ no samples gives 0"
+
+    assert preview_body(code) == {"code": code, "trace": False}, "❌ previews send no options, like the client"
+    assert run_body(code) == {"code": code, "trace": True, "maxFrames": 200}, "❌ Run sends the client's runOptions"
+    print("✅ PASSED")
+
+
+def test_replay_against_server():
+    server = make_server('127.0.0.1', 0, server_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        sessions = [typing_session("nums = [1, 2, 3]\ntotal = 0\nfor n in nums:\n    total += n\n", 8)]
+        rows, elapsed = run_load(base_url, sessions + sessions, students=4, think_ms=0, use_etag=True)
+    finally:
+        server.shutdown()
+
+    by_endpoint = {row["endpoint"]: row for row in rows}
+    assert set(by_endpoint) == {"parse", "parse:run"}, "❌ previews and runs are reported separately"
+    assert by_endpoint["parse:run"]["requests"] == 4, "❌ every student should press Run once"
+    assert by_endpoint["parse"]["requests"] == 4 * len(sessions[0]), "❌ every state should be previewed"
+    assert all(row["errorRate"] == 0 for row in rows), f"❌ no request should fail: {rows}"
+    assert all(0 < row["p50_ms"] <= row["p95_ms"] <= row["p99_ms"] for row in rows), "❌ percentiles should be ordered"
+    assert elapsed > 0 and all(row["throughput"] > 0 for row in rows), "❌ throughput should be positive"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_session_helpers()
+    test_replay_against_server()
@@ -0,0 +1,49 @@
+from code_parser import CodeParser
+
+
+def test_grid_dp():
+    parser = CodeParser()
+    code = """m = 3
+n = 3
+dp = [[0] * n for _ in range(m)]
+for i in range(m):
+    for j in range(n):
+        if i == 0 or j == 0:
+            dp[i][j] = 1
+        else:
+            dp[i][j] = dp[i - 1][j] + dp[i][j - 1]
+print(dp[m - 1][n - 1])
+"""
+    result = parser.parse(code)
+
+    dp = next(s for s in result['structures'] if s['name'] == 'dp')
+    assert dp['type'] == 'matrix', "❌ dp should be a matrix"
+    assert result['output'] == ['6'], f"❌ unique paths in a 3x3 grid should be 6, got {result['output']}"
+    assert '_' not in parser.context, "❌ comprehension variables should not leak"
+
+    # Each iteration's snapshot is isolated from later writes
+    state = result['iterationState']
+    assert state['0']['dp'] == [[1, 1, 1], [0, 0, 0], [0, 0, 0]], f"❌ wrong iteration 0: {state['0']['dp']}"
+    assert state['1']['dp'] == [[1, 1, 1], [1, 2, 3], [0, 0, 0]], f"❌ wrong iteration 1: {state['1']['dp']}"
+
+    # Serialized: keyframe first, then only the changed cells
+    serialized = state.to_dict()
+    assert serialized['0']['dp'] == {"shape": [3, 3], "rows": [[1, 1, 1], [0, 0, 0], [0, 0, 0]]}
+    assert serialized['2']['dp'] == {"shape": [3, 3], "cells": [[2, 0, 1], [2, 1, 3], [2, 2, 6]]}
+    print("✅ PASSED")
+
+
+def test_nested_subscript_operation():
+    parser = CodeParser()
+    result = parser.parse("grid = [[0, 0], [0, 0]]\ngrid[1][0] = 5\n")
+
+    grid = next(s for s in result['structures'] if s['name'] == 'grid')
+    assert grid['data'] == [[0, 0], [5, 0]], f"❌ wrong grid: {grid['data']}"
+    op = result['indexOperations'][0]
+    assert op['varName'] == 'grid' and op['cells'] == [[1, 0]], f"❌ wrong operation: {op}"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_grid_dp()
+    test_nested_subscript_operation()
@@ -0,0 +1,87 @@
+import json
+
+from bench_corpus import TWO_SUM
+from code_parser import CodeParser
+from settrace_engine import trace_cpython
+
+
+def test_same_schema_as_code_parser():
+    expected = json.loads(json.dumps(CodeParser().parse(TWO_SUM), default=lambda o: o.to_dict()))
+    result = trace_cpython(TWO_SUM, trace=True)
+
+    missing = set(expected) - set(result)
+    assert not missing, f"❌ keys missing from the cpython engine: {missing}"
+    assert result['iterationState'] == expected['iterationState'], "❌ iteration snapshots should match"
+    assert result['iterationOutputs'] == expected['iterationOutputs'], "❌ iteration outputs should match"
+    assert (result['target'], result['iterator']) == (expected['target'], expected['iterator']), "❌ loop metadata should match"
+    assert result['lineTrace']['line'], "❌ line trace should be recorded"
+    print("✅ PASSED")
+
+
+def test_full_language_and_watch():
+    code = "class Box:\n    pass\ndef square(x):\n    return x * x\ntotal = 0\nfor i in range(5):\n    total += square(i)\n"
+    result = trace_cpython(code, watch=['total'])
+    assert result['iterationState']['4']['total'] == 30, f"❌ functions should run natively: {result}"
+    assert result['iterationState']['4']['i']['summarized'], "❌ watch list should apply"
+    structures = {s['name']: s['data'] for s in result['structures']}
+    assert result['target'] == 'range_i' and structures['range_i'] == [0, 1, 2, 3, 4], "❌ range target should be synthesized"
+
+    result = trace_cpython("calls = []\ndef n():\n    calls.append(1)\n    return 3\nfor i in range(n()):\n    pass\nprint(len(calls))\n")
+    assert result['output'] == ['1'], f"❌ the range call runs once, as in CPython: {result['output']}"
+    result = trace_cpython("nums = [4, 5, 6]\nfor i in range(len(nums) - 1, -1, -1):\n    x = nums[i]\n")
+    structures = {s['name']: s['data'] for s in result['structures']}
+    assert structures['range_i'] == [2, 1, 0], f"❌ side-effect free bounds are still evaluated: {structures['range_i']}"
+    print("✅ PASSED")
+
+
+def test_sandbox_limits():
+    result = trace_cpython("import os\nfiles = os.listdir('/')\n")
+    assert any("not allowed" in line for line in result['output']), "❌ imports outside the allow list should fail"
+    result = trace_cpython("data = open('/etc/hostname').read()\n")
+    assert any("open" in line for line in result['output']), "❌ open() should not be available"
+    # Allowed modules reach os, but the kernel refuses files, sockets and processes
+    result = trace_cpython("import random\nfd = random._os.open('/etc/hostname', 0)\n")
+    assert any("Operation not permitted" in line for line in result['output']), f"❌ files must not open: {result['output']}"
+    result = trace_cpython("import random\nstatus = random._os.system('true')\nnames = random._os.listdir('/')\n")
+    assert 'names' not in {s['name'] for s in result['structures']}, "❌ the file system must not be listed"
+    assert next(s['data'] for s in result['structures'] if s['name'] == 'status') != 0, "❌ processes must not start"
+    result = trace_cpython("import random\nfd = random._os.pidfd_open(random._os.getppid())\n")
+    assert any("Operation not permitted" in line for line in result['output']), f"❌ the server must not be signalled: {result['output']}"
+    result = trace_cpython("x = 0\nwhile True:\n    x += 1\n", max_steps=5000)
+    assert result.get('budgetExceeded'), "❌ infinite loop should hit the step budget"
+    print("✅ PASSED")
+
+
+
+def test_sampling_matches_code_parser():
+    from test_keyframes import LONG_LOOP
+    expected = CodeParser().parse(LONG_LOOP, max_frames=12)
+    result = trace_cpython(LONG_LOOP, max_frames=12)
+    assert result['loopFrames'] == expected['loopFrames'], f"❌ engines should keep the same frames: {result['loopFrames']}"
+    assert result['keyframes'] == expected['keyframes'] and result['loopIterations'] == 2000, "❌ same keyframes"
+    targets = [next(s for s in r['structures'] if s['name'] == 'range_i') for r in (result, expected)]
+    assert targets[0] == targets[1] == {'name': 'range_i', 'type': 'range', 'data': [0, 2000, 1]}, f"❌ same range bounds: {targets}"
+    print("✅ PASSED")
+
+
+def test_engine_is_opt_in():
+    import app as server_app
+    client = server_app.app.test_client()
+    enabled = server_app.CPYTHON_ENGINE
+    try:
+        server_app.CPYTHON_ENGINE = False
+        assert client.post('/api/parse', json={'code': 'x = 1', 'engine': 'cpython'}).status_code == 403, "❌ off by default"
+        server_app.CPYTHON_ENGINE = True
+        response = client.post('/api/parse', json={'code': 'x = 1', 'engine': 'cpython', 'cache': False})
+        assert response.get_json()['structures'] == [{'name': 'x', 'type': 'variable', 'data': 1}], "❌ opted-in servers run it"
+    finally:
+        server_app.CPYTHON_ENGINE = enabled
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_same_schema_as_code_parser()
+    test_full_language_and_watch()
+    test_sandbox_limits()
+    test_sampling_matches_code_parser()
+    test_engine_is_opt_in()
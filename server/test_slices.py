@@ -0,0 +1,34 @@
+from code_parser import CodeParser
+
+
+def test_slice_operations():
+    parser = CodeParser()
+    code = """lis = [1, 2, 3, 4, 5, 6]
+lis[1:3] = [8, 9, 10]
+lis[-1] = 0
+lis[::-2]
+lis[4:]
+"""
+    result = parser.parse(code)
+    lis = next(s for s in result['structures'] if s['name'] == 'lis')
+    assert lis['data'] == [1, 8, 9, 10, 4, 5, 0], f"❌ wrong list after slice assignment: {lis['data']}"
+
+    assign_slice, assign_neg, access_rev, access_open = result['indexOperations']
+    assert assign_slice['ranges'] == [[1, 3, 1]] and assign_slice['indices'] == [], "❌ slice assignment should be one range"
+    assert assign_neg['indices'] == [6], "❌ negative index should be resolved against the length"
+    assert access_rev['ranges'] == [[6, -1, -2]], f"❌ wrong reversed range: {access_rev['ranges']}"
+    assert access_open['ranges'] == [[4, 7, 1]], "❌ open-ended slice should be resolved against the length"
+    print("✅ PASSED")
+
+
+def test_large_slice_is_not_materialized():
+    parser = CodeParser()
+    result = parser.parse("big = [0] * 100000\nbig[10:90000]\n")
+    op = result['indexOperations'][0]
+    assert op['indices'] == [] and op['ranges'] == [[10, 90000, 1]], "❌ slice should stay a range"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_slice_operations()
+    test_large_slice_is_not_materialized()
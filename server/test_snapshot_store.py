@@ -0,0 +1,70 @@
+from array import array
+
+from snapshot_store import SnapshotStore
+
+
+def test_round_trip():
+    store = SnapshotStore(chunk_size=4)
+    context = {
+        "nums": [2, 7, 11, 15, 20, 25],
+        "ratios": [0.5, 1.5],
+        "flags": [True, False],
+        "mixed": [1, "a", 2.0],
+        "huge": [2 ** 70, 1],
+        "seen": {3},
+        "pair_idx": {2: 0},
+        "i": 1,
+    }
+    store.capture(0, context)
+    frame = store["0"]
+
+    assert frame["nums"] == [2, 7, 11, 15, 20, 25], "❌ chunked int list should round-trip"
+    assert frame["ratios"] == [0.5, 1.5], "❌ float list should round-trip"
+    assert frame["flags"] == [True, False] and type(frame["flags"][0]) is bool, "❌ bools must stay bools"
+    assert frame["mixed"] == [1, "a", 2.0], "❌ mixed list should round-trip"
+    assert frame["huge"] == [2 ** 70, 1], "❌ ints wider than 64 bits should round-trip"
+    assert frame["seen"] == [3], "❌ sets are sent as lists"
+    assert frame["pair_idx"] == [{"key": "2", "value": "0"}], "❌ dicts use the frontend key/value format"
+    assert frame["i"] == 1
+    assert any(isinstance(c, array) and c.typecode == 'q' for c in store._chunks), "❌ ints should be stored in array('q')"
+    print("✅ PASSED")
+
+
+def test_unchanged_versions_are_shared():
+    store = SnapshotStore(chunk_size=4)
+    dp = [0] * 12
+    nums = list(range(12))
+    for i in range(12):
+        dp[i] = i * i
+        store.capture(i, {"dp": dp, "nums": nums})
+
+    # nums: 3 chunks once; dp: 3 initial chunks + one new chunk per changed cell
+    assert len(store._chunks) <= 3 + 3 + 12, f"❌ expected chunk reuse, got {len(store._chunks)} chunks"
+    assert store["5"]["dp"] == [0, 1, 4, 9, 16, 25, 0, 0, 0, 0, 0, 0], "❌ frame 5 should not see later writes"
+
+    serialized = store.to_dict()
+    assert serialized["3"]["nums"] is serialized["7"]["nums"], "❌ identical versions should serialize once"
+    print("✅ PASSED")
+
+
+def test_equal_values_of_different_types():
+    store = SnapshotStore()
+    store.capture(0, {"a": [1, 'x'], "b": [True, 'x'], "c": [1.0, 'y'], "d": [1, 'y'], "t": [(1, 'z')], "u": [(1.0, 'z')]})
+    frame = store.to_dict()["0"]
+    assert [type(frame[name][0]) for name in "abcd"] == [int, bool, float, int], f"❌ 1, True and 1.0 are kept apart: {frame}"
+    assert type(frame["u"][0][0]) is float, "❌ also inside tuples"
+
+    grid = [[1, 2], [3, 4]]
+    store.capture(1, {"grid": grid})
+    grid[0][0] = 1.0
+    store.capture(2, {"grid": grid})
+    grid[0][0] = True
+    store.capture(3, {"grid": grid})
+    assert [type(store[key]["grid"][0][0]) for key in ("1", "2", "3")] == [int, float, bool], "❌ cached rows check types"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_unchanged_versions_are_shared()
+    test_equal_values_of_different_types()
@@ -0,0 +1,156 @@
+import os
+import socketserver
+import tempfile
+import threading
+
+import trace_cache
+from trace_cache import RedisCache, RedisError, SQLiteCache, cache_key
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Minimal Redis stand-in: GET, SET, INCR, INCRBY, MGET, SELECT over RESP."""
+
+    def read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def bulk(self, value):
+        return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            command = args[0].upper()
+            if command == b"GET":
+                reply = self.bulk(store.get(args[1]))
+            elif command == b"SET":
+                store[args[1]] = args[2]
+                reply = b"+OK\r\n"
+            elif command in (b"INCR", b"INCRBY"):
+                step = int(args[2]) if command == b"INCRBY" else 1
+                store[args[1]] = str(int(store.get(args[1], b"0")) + step).encode()
+                reply = b":%s\r\n" % store[args[1]]
+            elif command == b"MGET":
+                reply = b"*%d\r\n" % (len(args) - 1) + b"".join(self.bulk(store.get(k)) for k in args[1:])
+            elif command == b"SELECT":
+                reply = b"+OK\r\n"
+            else:
+                reply = b"-ERR unknown command\r\n"
+            self.wfile.write(reply)
+
+
+def start_fake_redis():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FakeRedisHandler)
+    server.daemon_threads = True
+    server.store = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_cache_key():
+    assert cache_key("x = 1") == cache_key("x = 1"), "❌ key should be deterministic"
+    assert cache_key("x = 1") != cache_key("x = 2"), "❌ source should change the key"
+    assert cache_key("x = 1", {"trace": True}) != cache_key("x = 1", {"trace": False}), "❌ options should change the key"
+    print("✅ PASSED")
+
+
+def test_sqlite_cache_eviction_and_metrics():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.db")
+        cache = SQLiteCache(path, max_bytes=2000)
+        assert cache.get("a") is None, "❌ empty cache should miss"
+        cache.set("a", '{"x": 1}')
+        assert cache.get("a") == '{"x": 1}', "❌ stored value should round-trip"
+
+        # Fill past max_bytes with incompressible values; "a" was used least recently
+        for i in range(10):
+            cache.set(f"k{i}", os.urandom(200).hex())
+        assert cache.get("a") is None, "❌ least recently used entry should be evicted"
+
+        # A second instance (another worker) sees the same entries, and the
+        # counters once the first one has flushed its batch
+        other = SQLiteCache(path)
+        assert other.get("k9") is not None, "❌ entries should be shared across instances"
+        assert other.metrics()["shared"]["misses"] == 0, "❌ counters are batched, not written per lookup"
+        cache.flush()
+        shared = other.metrics()["shared"]
+        assert shared["hits"] == 2 and shared["misses"] == 2, f"❌ shared counters wrong: {shared}"
+
+        # The running size total matches the entries left after eviction
+        conn = other._connection()
+        total = conn.execute("SELECT value FROM stats WHERE name = 'bytes'").fetchone()[0]
+        assert total == conn.execute("SELECT SUM(size) FROM entries").fetchone()[0] <= 2000, f"❌ size total drifted: {total}"
+    print("✅ PASSED")
+
+
+def test_redis_cache_cross_worker_hits():
+    server = start_fake_redis()
+    try:
+        host, port = server.server_address
+        writer = RedisCache(host, port)
+        writer.set("k", '{"structures": []}')
+        assert writer.get("k") == '{"structures": []}', "❌ value should round-trip over RESP"
+
+        # Pretend the entry was written by another worker
+        raw = server.store[b"visualeyes:k"]
+        server.store[b"visualeyes:k"] = b"otherhost:1" + raw[raw.index(b"\n"):]
+        reader = RedisCache(host, port)
+        assert reader.get("k") is not None, "❌ second client should hit"
+        writer.flush()
+        shared = reader.metrics()["shared"]
+        assert shared["hits"] == 2 and shared["crossWorkerHits"] == 1, f"❌ shared counters wrong: {shared}"
+
+        try:
+            reader.pipeline([["BOGUS"], ["INCR", "n"]])
+            assert False, "❌ an error reply should raise"
+        except RedisError:
+            pass
+        assert reader.command("GET", "n") == b"1", "❌ replies after an error must not answer later commands"
+
+        server.store[b"visualeyes:bad"] = b"otherhost:1\nnot zlib"
+        assert reader.get("bad") is None, "❌ a corrupt entry should miss, not raise"
+        assert reader.stats["errors"] == 1 and reader.stats["misses"] == 1, f"❌ and be counted: {reader.stats}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # An unreachable server behaves like an empty cache
+    offline = RedisCache(host, port)
+    assert offline.get("k") is None, "❌ unreachable backend should miss, not raise"
+    assert offline.stats["errors"] >= 1, "❌ backend errors should be counted"
+    print("✅ PASSED")
+
+
+def test_parse_endpoint_uses_cache():
+    import app as server_app
+    with tempfile.TemporaryDirectory() as tmp:
+        previous = server_app.cache
+        server_app.cache = trace_cache.SQLiteCache(os.path.join(tmp, "cache.db"))
+        try:
+            client = server_app.app.test_client()
+            body = {"code": "nums = [1, 2]\nfor n in nums:\n    print(n)\n"}
+            first = client.post('/api/parse', json=body)
+            second = client.post('/api/parse', json=body)
+            assert first.headers['X-Cache'] == 'MISS' and second.headers['X-Cache'] == 'HIT', "❌ second request should hit"
+            assert first.get_json() == second.get_json(), "❌ cached response should match"
+            metrics = client.get('/api/metrics').get_json()["cache"]
+            assert metrics["process"]["hits"] == 1, f"❌ metrics wrong: {metrics}"
+        finally:
+            server_app.cache = previous
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_cache_key()
+    test_sqlite_cache_eviction_and_metrics()
+    test_redis_cache_cross_worker_hits()
+    test_parse_endpoint_uses_cache()
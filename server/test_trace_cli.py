@@ -0,0 +1,47 @@
+import json
+import os
+import tempfile
+
+import trace_cli
+from bench_corpus import TWO_SUM
+
+
+def test_trace_directory_and_resume():
+    with tempfile.TemporaryDirectory() as tmp:
+        src_dir = os.path.join(tmp, 'problems')
+        out_dir = os.path.join(tmp, 'gallery')
+        os.makedirs(os.path.join(src_dir, 'arrays'))
+        with open(os.path.join(src_dir, 'arrays', 'two_sum.py'), 'w') as f:
+            f.write(TWO_SUM)
+
+        assert trace_cli.main([src_dir, '-o', out_dir, '--workers', '1']) == 0
+        trace_path = os.path.join(out_dir, 'arrays', 'two_sum.jsonl')
+        with open(trace_path) as f:
+            lines = [json.loads(line) for line in f]
+
+        assert lines[0]['type'] == 'meta' and lines[0]['source'] == os.path.join('arrays', 'two_sum.py')
+        assert [line['index'] for line in lines[1:]] == [0, 1, 2, 3], "❌ one line per iteration expected"
+        assert lines[2]['output'] == ['1 0'], "❌ iteration 1 should print '1 0'"
+
+        # Second run resumes: the up-to-date trace is left untouched
+        mtime = os.path.getmtime(trace_path)
+        assert trace_cli.main([src_dir, '-o', out_dir, '--workers', '1']) == 0
+        assert os.path.getmtime(trace_path) == mtime, "❌ up-to-date trace should be skipped"
+
+        # A newer parser re-traces files written by an older one
+        version = trace_cli.PARSER_VERSION
+        trace_cli.PARSER_VERSION = version + '-next'
+        try:
+            os.utime(trace_path, (0, 0))
+            assert trace_cli.main([src_dir, '-o', out_dir, '--workers', '1']) == 0
+        finally:
+            trace_cli.PARSER_VERSION = version
+        assert os.path.getmtime(trace_path) != 0, "❌ traces from another parser version should be redone"
+
+        with open(os.path.join(out_dir, 'index.json')) as f:
+            assert json.load(f)[0]['trace'] == os.path.join('arrays', 'two_sum.jsonl')
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_trace_directory_and_resume()
@@ -0,0 +1,51 @@
+from code_parser import CodeParser
+from trace_log import TraceLog
+
+
+def test_line_trace():
+    parser = CodeParser()
+    code = """pair_idx = {}
+nums = [2, 7, 11, 15]
+target = 9
+
+for i, num in enumerate(nums):
+    if target - num in pair_idx:
+        print(i, pair_idx[target - num])
+    pair_idx[num] = i
+"""
+    result = parser.parse(code, trace=True)
+    trace = parser.trace
+
+    assert 'lineTrace' in result, "❌ lineTrace should be returned when trace=True"
+    assert 'iterationState' in result, "❌ iterationState should still be returned"
+
+    events = [trace.event(k) for k in range(len(trace))]
+    assert events[0]['line'] == 1 and events[0]['writes'] == ['pair_idx'], "❌ first event should assign pair_idx"
+
+    # Iteration 1: header, if test, print (reads pair_idx[2]), pair_idx[7] = 1
+    iter1 = [e for e in events if e['iteration'] == 1]
+    assert [e['line'] for e in iter1] == [5, 6, 7, 8], f"❌ wrong lines for iteration 1: {iter1}"
+    assert iter1[0]['writes'] == ['i', 'num'], "❌ loop header should write its targets"
+    assert iter1[2]['indices'] == [['pair_idx', 2]], "❌ print should read pair_idx[2]"
+    assert iter1[3]['indices'] == [['pair_idx', 7]], "❌ assignment should touch pair_idx[7]"
+
+    # Default parse does not pay for tracing
+    assert 'lineTrace' not in parser.parse(code), "❌ lineTrace should be opt-in"
+    print("✅ PASSED")
+
+
+def test_trace_log_is_compact():
+    parser = CodeParser()
+    code = "s = 0\nfor i in range(100):\n    x = i * 2\n    y = x + 1\n" * 200
+    parser.parse(code, trace=True)
+    trace = parser.trace
+
+    assert len(trace) == TraceLog().max_events, "❌ trace should be capped at max_events"
+    assert trace.truncated, "❌ capped trace should be marked truncated"
+    assert trace.nbytes() < 4 * 1024 * 1024, f"❌ 50k events took {trace.nbytes()} bytes"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_line_trace()
+    test_trace_log_is_compact()
@@ -0,0 +1,42 @@
+from code_parser import CodeParser
+
+
+CODE = """nums = [3, 1, 2]
+helper = [0] * 1000
+total = 0
+for num in nums:
+    total += num
+"""
+
+
+def test_watch_list():
+    result = CodeParser().parse(CODE, watch=['nums', 'total'])
+    frame = result['iterationState'].to_dict()['2']
+    assert frame['total'] == 6 and frame['nums'] == [3, 1, 2], f"❌ watched variables should be kept: {frame}"
+    assert frame['helper'] == {"summarized": True, "type": "list", "length": 1000}, f"❌ wrong summary: {frame['helper']}"
+    assert frame['num'] == {"summarized": True, "type": "int", "length": None}, "❌ unwatched scalars are summarized too"
+    print("✅ PASSED")
+
+
+def test_max_bytes():
+    result = CodeParser().parse(CODE, max_bytes=1024)
+    frame = result['iterationState'].to_dict()['0']
+    assert frame['helper']['summarized'] and frame['helper']['length'] == 1000, "❌ large list should be summarized"
+    assert frame['nums'] == [3, 1, 2] and frame['total'] == 3, "❌ small variables should be kept"
+    print("✅ PASSED")
+
+
+def test_parse_endpoint_watch():
+    import app as server_app
+    client = server_app.app.test_client()
+    response = client.post('/api/parse', json={'code': CODE, 'watch': ['total']})
+    frame = response.get_json()['iterationState']['1']
+    assert frame['total'] == 4 and frame['nums']['summarized'], f"❌ endpoint should apply the watch list: {frame}"
+    assert client.post('/api/parse', json={'code': CODE, 'watch': 'total'}).status_code == 400, "❌ bad watch list should be rejected"
+    print("✅ PASSED")
+
+
+if __name__ == "__main__":
+    test_watch_list()
+    test_max_bytes()
+    test_parse_endpoint_watch()
@@ -0,0 +1,367 @@
+"""
+Shared, persistent cache for /api/parse results.
+
+Entries survive restarts and are shared by every worker that points at the
+same backend. Keys are content hashes of the source, the parse options and
+PARSER_VERSION; values are the serialized JSON response, zlib-compressed and
+tagged with the worker that produced it so cross-worker hits can be counted.
+
+Backends:
+    SQLiteCache  local file (WAL + mmap), size-bounded LRU eviction
+    RedisCache   any Redis-protocol server, spoken directly over a socket
+
+Configure with VISUALEYES_CACHE, e.g. "sqlite:////tmp/visualeyes.db" or
+"redis://localhost:6379/0".
+
+A lookup is one read: hit/miss counters (and SQLite's LRU access times) are
+accumulated in the process and written to the backend in one batch every
+STATS_FLUSH_INTERVAL seconds or when metrics() is read.
+"""
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from urllib.parse import urlparse
+
+from code_parser import PARSER_VERSION
+
+STATS = ("hits", "misses", "crossWorkerHits", "sets", "errors")
+
+# Seconds between writes of the batched shared counters
+STATS_FLUSH_INTERVAL = 5.0
+
+
+def cache_key(code, options=None):
+    """Content hash of the source plus everything else that changes the result."""
+    header = json.dumps({"v": PARSER_VERSION, **(options or {})}, sort_keys=True)
+    return hashlib.sha256(f"{header}\n{code}".encode('utf-8')).hexdigest()
+
+
+def _worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class TraceCache:
+    """Base class: compression, writer tagging and metrics.
+
+    Subclasses implement _get/_set on raw bytes and _flush/_read_stats for
+    the shared counters. Backend failures never propagate: a failing cache
+    just behaves like an empty one and is counted in `errors`.
+    """
+
+    def __init__(self, compress_level=6, flush_interval=STATS_FLUSH_INTERVAL):
+        self.compress_level = compress_level
+        self.flush_interval = flush_interval
+        self.stats = dict.fromkeys(STATS, 0)  # This process only
+        self._unflushed = Counter()             # Counted here, not yet added to the shared counters
+        self._flushed_at = time.monotonic()
+        self._stats_lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached JSON text for `key`, or None."""
+        try:
+            raw = self._get(key)
+        except Exception:
+            self._count("errors")
+            return None
+        if raw is None:
+            self._count("misses")
+            return None
+        try:
+            writer, _, payload = raw.partition(b"\n")
+            json_text = zlib.decompress(payload).decode('utf-8')
+            writer = writer.decode()
+        except Exception:  # Corrupt entry: recompute it
+            self._count("errors")
+            self._count("misses")
+            return None
+        self._count("hits")
+        if writer != _worker_id():
+            self._count("crossWorkerHits")
+        return json_text
+
+    def set(self, key, json_text):
+        """Store the JSON text for `key`."""
+        raw = _worker_id().encode() + b"\n" + zlib.compress(json_text.encode('utf-8'), self.compress_level)
+        try:
+            self._set(key, raw)
+            self._count("sets")
+        except Exception:
+            self._count("errors")
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+            self._unflushed[name] += 1
+            due = time.monotonic() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Add the counts accumulated since the last flush to the shared counters."""
+        with self._stats_lock:
+            counts, self._unflushed = self._unflushed, Counter()
+            self._flushed_at = time.monotonic()
+        try:
+            self._flush(counts)
+        except Exception:
+            with self._stats_lock:
+                self.stats["errors"] += 1
+
+    def metrics(self):
+        """Process-local and shared (all workers) counters with hit rates."""
+        self.flush()
+        try:
+            shared = self._read_stats()
+        except Exception:
+            shared = None
+        return {
+            "backend": type(self).__name__,
+            "process": _with_hit_rate(self.stats),
+            "shared": _with_hit_rate(shared) if shared is not None else None,
+        }
+
+    # Backend interface
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, raw):
+        raise NotImplementedError
+
+    def _flush(self, counts):
+        """Add `counts` ({name: n}) to the shared counters."""
+        raise NotImplementedError
+
+    def _read_stats(self):
+        raise NotImplementedError
+
+
+def _with_hit_rate(stats):
+    lookups = stats["hits"] + stats["misses"]
+    return {**stats, "hitRate": stats["hits"] / lookups if lookups else 0.0,
+            "crossWorkerHitRate": stats["crossWorkerHits"] / lookups if lookups else 0.0}
+
+
+class SQLiteCache(TraceCache):
+    """Cache in a local SQLite file, evicting least recently used entries above `max_bytes`.
+
+    WAL mode lets several worker processes read and write concurrently, and
+    the database is memory-mapped so hot entries are served from the page cache.
+    The total size is kept in the stats table (row "bytes") and updated with
+    every write, so a set never scans the entries.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._touched = {}  # key -> last hit time, written with the next flush or set
+
+    def _connection(self):
+        # One connection per process (connections must not cross a fork)
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA mmap_size=268435456")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, size INTEGER, accessed REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+            conn.executemany("INSERT OR IGNORE INTO stats VALUES (?, 0)", [(name,) for name in STATS])
+            # Summed once, when a database first gets the row
+            conn.execute("INSERT OR IGNORE INTO stats SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _get(self, key):
+        with self._lock:
+            row = self._connection().execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = time.time()
+            return bytes(row[0])
+
+    def _set(self, key, raw):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_touched(conn)
+                old = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", (key, raw, len(raw), time.time()))
+                self._add_bytes(conn, len(raw) - (old[0] if old else 0))
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _write_touched(self, conn):
+        touched, self._touched = self._touched, {}
+        conn.executemany("UPDATE entries SET accessed = ? WHERE key = ?", [(t, key) for key, t in touched.items()])
+
+    def _add_bytes(self, conn, delta):
+        conn.execute("UPDATE stats SET value = value + ? WHERE name = 'bytes'", (delta,))
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT value FROM stats WHERE name = 'bytes'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until back under the limit
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        self._add_bytes(conn, -freed)
+
+    def _flush(self, counts):
+        with self._lock:
+            if not counts and not self._touched:
+                return
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("UPDATE stats SET value = value + ? WHERE name = ?",
+                                 [(n, name) for name, n in counts.items()])
+                self._write_touched(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _read_stats(self):
+        with self._lock:
+            rows = self._connection().execute("SELECT name, value FROM stats").fetchall()
+        return {**dict.fromkeys(STATS, 0), **{name: value for name, value in rows if name in STATS}}
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RedisCache(TraceCache):
+    """Cache in a Redis-protocol server (Redis, Valkey, KeyDB, ...).
+
+    Speaks RESP directly over one socket per process, so no client library is
+    needed. Entries expire after `ttl` seconds; overall size is bounded by the
+    server's maxmemory policy.
+    """
+
+    def __init__(self, host='localhost', port=6379, db=0, ttl=7 * 24 * 3600, prefix='visualeyes:',
+                 timeout=1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.host, self.port, self.db = host, port, db
+        self.ttl = ttl
+        self.prefix = prefix
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+        self._pid = None
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock, self._file, self._pid = sock, sock.makefile('rb'), os.getpid()
+        if self.db:
+            self._send("SELECT", self.db)
+
+    def _close(self):
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = self._file = None
+
+    def command(self, *args):
+        """Send one command and return its decoded reply."""
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands):
+        """Send several commands in one round trip; returns their replies in order."""
+        with self._lock:
+            if self._sock is None or self._pid != os.getpid():
+                self._connect()
+            try:
+                return self._send_all(commands)
+            except (OSError, EOFError):
+                self._close()  # Reconnect on next command
+                raise
+
+    def _send(self, *args):
+        return self._send_all([args])[0]
+
+    def _send_all(self, commands):
+        parts = []
+        for args in commands:
+            parts.append(b"*%d\r\n" % len(args))
+            for arg in args:
+                data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+                parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._sock.sendall(b"".join(parts))
+        # Read every reply before raising, or the rest would answer later commands
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def _read_reply(self):
+        line = self._file.readline()
+        if not line:
+            raise EOFError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._file.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise ConnectionError(f"Unexpected reply: {line!r}")  # Out of sync: reconnect
+
+    def _get(self, key):
+        return self.command("GET", self.prefix + key)
+
+    def _set(self, key, raw):
+        self.command("SET", self.prefix + key, raw, "EX", self.ttl)
+
+    def _flush(self, counts):
+        if counts:
+            self.pipeline([("INCRBY", f"{self.prefix}stats:{name}", n) for name, n in counts.items()])
+
+    def _read_stats(self):
+        values = self.command("MGET", *[f"{self.prefix}stats:{name}" for name in STATS])
+        return {name: int(v) if v is not None else 0 for name, v in zip(STATS, values)}
+
+
+def cache_from_url(url):
+    """Build a cache from a URL like sqlite:///path.db or redis://host:port/db (None = disabled)."""
+    if not url:
+        return None
+    parsed = urlparse(url)
+    if parsed.scheme == 'sqlite':
+        return SQLiteCache(parsed.path)
+    if parsed.scheme == 'redis':
+        db = int(parsed.path.lstrip('/') or 0)
+        return RedisCache(parsed.hostname or 'localhost', parsed.port or 6379, db)
+    raise ValueError(f"Unsupported cache URL: {url}")
@@ -0,0 +1,180 @@
+"""
+Offline trace generator: trace many .py files in parallel and write them to disk.
+
+Writes one JSONL trace per source file (optionally gzip-compressed), mirroring
+the input layout under the output directory, plus an index.json manifest, so
+the result can be served as a static gallery. Re-running skips files whose
+trace is already up to date, so an interrupted run resumes where it stopped.
+
+Usage:
+    python trace_cli.py problems/ -o gallery/
+    python trace_cli.py "problems/**/*.py" -o gallery/ --workers 8 --gzip --trace
+
+Trace file format (one JSON object per line):
+    {"type": "meta", "source": ..., "sha256": ..., "options": {...}, "structures": [...], ...}
+    {"type": "iteration", "index": 0, "state": {...}, "output": [...]}
+    ...
+"""
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from batch import BATCH_MAX_STEPS, BATCH_MAX_SECONDS, json_default, parse_program
+from code_parser import PARSER_VERSION
+
+
+def collect_sources(patterns):
+    """Expand directories and glob patterns into (path, relative path) pairs."""
+    sources = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                for name in files:
+                    if name.endswith('.py'):
+                        path = os.path.join(root, name)
+                        sources[os.path.abspath(path)] = os.path.relpath(path, pattern)
+        else:
+            # Paths are made relative to the pattern's directory prefix before the first wildcard
+            prefix = pattern[:min((pattern.find(c) for c in '*?[' if c in pattern), default=len(pattern))]
+            base = os.path.dirname(prefix)
+            for path in glob.glob(pattern, recursive=True):
+                if path.endswith('.py') and os.path.isfile(path):
+                    sources[os.path.abspath(path)] = os.path.relpath(path, base or '.')
+    return sorted(sources.items(), key=lambda item: item[1])
+
+
+def _open(path, mode):
+    return gzip.open(path, mode + 't', encoding='utf-8') if path.endswith('.gz') else open(path, mode, encoding='utf-8')
+
+
+def read_meta(path):
+    """Return the meta line of an existing trace file, or None if missing/corrupt."""
+    try:
+        with _open(path, 'r') as f:
+            meta = json.loads(f.readline())
+        return meta if meta.get("type") == "meta" else None
+    except (OSError, ValueError, EOFError):
+        return None
+
+
+def trace_file(src, dst, rel, options):
+    """Trace one source file and write it to `dst` (runs in a worker process)."""
+    start = time.perf_counter()
+    with open(src, encoding='utf-8') as f:
+        code = f.read()
+    sha = hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+    meta = read_meta(dst)
+    if meta is not None and meta.get("sha256") == sha and meta.get("options") == options:
+        return {"rel": rel, "status": "skipped", "bytes": 0, "seconds": 0.0}
+
+    result = parse_program(code, options["trace"], options["maxSteps"], options["maxSeconds"])
+    iteration_state = result.pop("iterationState", None)
+    iteration_outputs = result.pop("iterationOutputs", {})
+    frames = json_default(iteration_state) if iteration_state is not None else {}
+
+    # Write to a temp file and rename, so an interrupted run never leaves a
+    # truncated trace that would be mistaken for a finished one
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = dst + '.tmp' + ('.gz' if dst.endswith('.gz') else '')
+    with _open(tmp, 'w') as f:
+        meta = {"type": "meta", "source": rel, "sha256": sha, "options": options, **result}
+        f.write(json.dumps(meta, default=json_default) + "\n")
+        for key in sorted(frames, key=int):
+            line = {"type": "iteration", "index": int(key), "state": frames[key],
+                    "output": iteration_outputs.get(key, [])}
+            f.write(json.dumps(line, default=json_default) + "\n")
+    os.replace(tmp, dst)
+
+    status = "budget" if result.get("budgetExceeded") else "traced"
+    return {"rel": rel, "status": status, "bytes": os.path.getsize(dst), "seconds": time.perf_counter() - start}
+
+
+def output_path(out_dir, rel, compress):
+    return os.path.join(out_dir, os.path.splitext(rel)[0] + ('.jsonl.gz' if compress else '.jsonl'))
+
+
+def write_manifest(out_dir):
+    """index.json listing every trace in `out_dir` and its source (for the gallery)."""
+    entries = []
+    for root, _, files in os.walk(out_dir):
+        for name in sorted(files):
+            if name.endswith(('.jsonl', '.jsonl.gz')):
+                dst = os.path.join(root, name)
+                meta = read_meta(dst)
+                if meta is not None:
+                    entries.append({"source": meta["source"], "trace": os.path.relpath(dst, out_dir),
+                                    "sha256": meta["sha256"]})
+    entries.sort(key=lambda entry: entry["trace"])
+    with open(os.path.join(out_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(entries, f, indent=2)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Trace .py files in parallel and write traces to disk.")
+    arg_parser.add_argument('sources', nargs='+', help='directories or glob patterns of .py files')
+    arg_parser.add_argument('-o', '--out-dir', required=True, help='directory to write traces to')
+    arg_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    arg_parser.add_argument('--gzip', action='store_true', help='write .jsonl.gz instead of .jsonl')
+    arg_parser.add_argument('--trace', action='store_true', help='include the statement-level lineTrace')
+    arg_parser.add_argument('--max-steps', type=int, default=BATCH_MAX_STEPS)
+    arg_parser.add_argument('--max-seconds', type=float, default=BATCH_MAX_SECONDS)
+    arg_parser.add_argument('--force', action='store_true', help='re-trace files that are already up to date')
+    args = arg_parser.parse_args(argv)
+
+    sources = collect_sources(args.sources)
+    if not sources:
+        print("No .py files found", file=sys.stderr)
+        return 1
+
+    # The parser version is part of the options, so traces from an older parser are redone
+    options = {"trace": args.trace, "maxSteps": args.max_steps, "maxSeconds": args.max_seconds,
+               "parserVersion": PARSER_VERSION}
+    if args.force:
+        for _, rel in sources:
+            dst = output_path(args.out_dir, rel, args.gzip)
+            if os.path.exists(dst):
+                os.remove(dst)
+
+    counts = {"traced": 0, "skipped": 0, "budget": 0, "failed": 0}
+    total_bytes = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(trace_file, src, output_path(args.out_dir, rel, args.gzip), rel, options): rel
+            for src, rel in sources
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            rel = futures[future]
+            try:
+                stats = future.result()
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"[{done}/{len(sources)}] FAILED {rel}: {e}", file=sys.stderr)
+                continue
+            counts[stats["status"]] += 1
+            total_bytes += stats["bytes"]
+            if stats["status"] != "skipped":
+                print(f"[{done}/{len(sources)}] {stats['status']:<7} {rel} ({stats['seconds'] * 1000:.0f} ms)")
+
+    elapsed = time.perf_counter() - start
+    write_manifest(args.out_dir)
+
+    processed = counts["traced"] + counts["budget"]
+    print()
+    print(f"Files:      {len(sources)} ({counts['traced']} traced, {counts['budget']} over budget, "
+          f"{counts['skipped']} up to date, {counts['failed']} failed)")
+    print(f"Elapsed:    {elapsed:.2f}s with {args.workers} workers")
+    print(f"Throughput: {processed / elapsed if elapsed else 0:.1f} files/s, "
+          f"{total_bytes / elapsed / 1e6 if elapsed else 0:.2f} MB/s written ({total_bytes / 1e6:.2f} MB)")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+from array import array
+
+
+class TraceLog:
+    """
+    Compact statement-level execution log.
+
+    Events are stored column-wise (struct-of-arrays) in typed arrays instead of
+    one dict per step. Variable names and index keys are interned once and
+    referenced by id, and the variable-length "names written" / "indices
+    touched" lists use offset arrays (CSR layout), so a 50k-step trace costs a
+    few MB instead of tens of MB.
+    """
+
+    def __init__(self, max_events=50000):
+        self.max_events = max_events
+        self.truncated = False
+
+        # Interned tables
+        self.names = []
+        self._name_ids = {}
+        self.keys = []
+        self._key_ids = {}
+
+        # One entry per event
+        self.lines = array('i')
+        self.cols = array('i')
+        self.end_lines = array('i')
+        self.end_cols = array('i')
+        self.iterations = array('i')  # Loop iteration the event ran in (-1 = top level)
+
+        # Variable-length columns: event k owns [offsets[k], offsets[k + 1])
+        self.write_offsets = array('I')
+        self.writes = array('I')        # name ids
+        self.index_offsets = array('I')
+        self.index_vars = array('I')    # name ids
+        self.index_keys = array('I')    # key ids
+
+        self._open = False  # Whether the last event still accepts writes/indices
+
+    def __len__(self):
+        return len(self.lines)
+
+    def _intern_name(self, name):
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def _intern_key(self, key):
+        try:
+            key_id = self._key_ids.get(key)
+        except TypeError:  # Unhashable key, fall back to its repr
+            key = repr(key)
+            key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = self._key_ids[key] = len(self.keys)
+            self.keys.append(key)
+        return key_id
+
+    def begin(self, node, iteration=-1):
+        """Start a new event for the statement `node`."""
+        if len(self.lines) >= self.max_events:
+            self.truncated = True
+            self._open = False
+            return
+        self.lines.append(node.lineno)
+        self.cols.append(node.col_offset)
+        self.end_lines.append(getattr(node, 'end_lineno', None) or node.lineno)
+        self.end_cols.append(getattr(node, 'end_col_offset', None) or node.col_offset)
+        self.iterations.append(iteration)
+        self.write_offsets.append(len(self.writes))
+        self.index_offsets.append(len(self.index_vars))
+        self._open = True
+
+    def close(self):
+        """Stop attributing writes/indices to the last event."""
+        self._open = False
+
+    def write(self, name):
+        """Record that the current event assigned `name`."""
+        if self._open:
+            self.writes.append(self._intern_name(name))
+
+    def touch(self, name, key):
+        """Record that the current event read or wrote `name[key]`."""
+        if self._open:
+            self.index_vars.append(self._intern_name(name))
+            self.index_keys.append(self._intern_key(key))
+
+    def event(self, k):
+        """Decode event `k` into a dict (debugging / tests)."""
+        w_end = self.write_offsets[k + 1] if k + 1 < len(self) else len(self.writes)
+        i_end = self.index_offsets[k + 1] if k + 1 < len(self) else len(self.index_vars)
+        i_start = self.index_offsets[k]
+        return {
+            "line": self.lines[k],
+            "col": self.cols[k],
+            "endLine": self.end_lines[k],
+            "endCol": self.end_cols[k],
+            "iteration": self.iterations[k],
+            "writes": [self.names[n] for n in self.writes[self.write_offsets[k]:w_end]],
+            "indices": [
+                [self.names[self.index_vars[j]], self.keys[self.index_keys[j]]]
+                for j in range(i_start, i_end)
+            ],
+        }
+
+    def nbytes(self):
+        """Approximate size of the event columns in bytes."""
+        columns = (self.lines, self.cols, self.end_lines, self.end_cols, self.iterations,
+                   self.write_offsets, self.writes, self.index_offsets, self.index_vars, self.index_keys)
+        return sum(col.itemsize * len(col) for col in columns)
+
+    @staticmethod
+    def _json_key(key):
+        if isinstance(key, tuple):  # Cell of a nested subscript, e.g. dp[i][j]
+            return list(key)
+        if isinstance(key, range):  # Slice, resolved to start/stop/step
+            return {"range": [key.start, key.stop, key.step]}
+        if isinstance(key, (int, float, str, bool)) or key is None:
+            return key
+        return repr(key)
+
+    def to_dict(self):
+        """Serialize as parallel arrays for the frontend."""
+        return {
+            "names": self.names,
+            "keys": [self._json_key(k) for k in self.keys],
+            "line": self.lines.tolist(),
+            "col": self.cols.tolist(),
+            "endLine": self.end_lines.tolist(),
+            "endCol": self.end_cols.tolist(),
+            "iteration": self.iterations.tolist(),
+            "writeOffsets": self.write_offsets.tolist() + [len(self.writes)],
+            "writes": self.writes.tolist(),
+            "indexOffsets": self.index_offsets.tolist() + [len(self.index_vars)],
+            "indexVars": self.index_vars.tolist(),
+            "indexKeys": self.index_keys.tolist(),
+            "truncated": self.truncated,
+        }